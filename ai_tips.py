@@ -0,0 +1,136 @@
+"""
+AI Tips
+-------
+Pool of AI golf tips for /ai-story. Tips are generated in a background
+thread with one shared client and strict timeouts, kept for a limited time
+and served from memory. Concurrent misses share one upstream call, and a
+slow upstream falls back to the most recent tip.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from models import StoryUnavailableError
+
+DEFAULT_BASE_URL = "https://api.x.ai/v1"
+MODEL = "grok-3-mini"
+MESSAGES = [
+    {
+        "role": "system",
+        "content": "You are a pro golfer, quite sarcastic, you stick to one or two sentence answers, "
+                   "ending with an emoji."
+    },
+    {
+        "role": "user",
+        "content": "What should I do to improve my golf - I am just all over the place and I guess "
+                   "the two beers didnt help :-)"
+    },
+]
+
+
+class StoryPool:
+    """Bounded TTL cache of generated tips with single-flight background refresh."""
+
+    def __init__(self, **settings):
+        self._in_flight = None
+        self._last_error = None
+        self._lock = threading.Lock()
+        self.configure(**settings)
+
+    def configure(self, size=5, ttl_seconds=3600, timeout_seconds=8.0, wait_seconds=3.0,
+                  api_key=None, base_url=DEFAULT_BASE_URL):
+        """Apply settings and drop cached tips and the client built with the old settings."""
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.wait_seconds = wait_seconds
+        self.api_key = api_key
+        self.base_url = base_url
+        self._stories = deque(maxlen=size)
+        self._client = None
+
+    def _get_client(self):
+        """One client (and connection pool) per process, created on first use."""
+        if self._client is None:
+            # Imported lazily: the client library is slow to import
+            from openai import OpenAI
+            self._client = OpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout_seconds,
+                max_retries=0,
+            )
+        return self._client
+
+    def _generate(self):
+        completion = self._get_client().chat.completions.create(model=MODEL, messages=MESSAGES)
+        return completion.choices[0].message.content
+
+    def _fresh(self, now):
+        return [text for created, text in self._stories if now - created < self.ttl_seconds]
+
+    def _refresh(self, done):
+        try:
+            story = self._generate()
+            with self._lock:
+                self._stories.append((time.monotonic(), story))
+                self._last_error = None
+        except Exception as e:
+            with self._lock:
+                self._last_error = str(e)
+        finally:
+            with self._lock:
+                self._in_flight = None
+            done.set()
+
+    def _refresh_async(self):
+        """Start one upstream call unless one is already running; return its completion event."""
+        with self._lock:
+            if self._in_flight is None:
+                self._in_flight = threading.Event()
+                threading.Thread(target=self._refresh, args=(self._in_flight,), daemon=True).start()
+            return self._in_flight
+
+    def prefill(self):
+        """Start filling the pool without waiting for the result."""
+        if self.api_key:
+            self._refresh_async()
+
+    def get_story(self):
+        """Return a tip immediately when one is cached, otherwise wait briefly for the shared call."""
+        now = time.monotonic()
+        with self._lock:
+            fresh = self._fresh(now)
+        if fresh:
+            if len(fresh) < self.size:
+                # Top the pool up in the background; viewers never wait for it
+                self._refresh_async()
+            return random.choice(fresh)
+
+        self._refresh_async().wait(self.wait_seconds)
+        with self._lock:
+            fresh = self._fresh(time.monotonic())
+            stale = self._stories[-1][1] if self._stories else None
+            last_error = self._last_error
+        if fresh:
+            return random.choice(fresh)
+        if stale:
+            return stale
+        raise StoryUnavailableError(last_error or "AI-tjenesten svarte ikke i tide")
+
+
+story_pool = StoryPool()
+
+
+def init_ai_tips(app):
+    """Configure the pool from the environment; no client is created until the first request."""
+    story_pool.configure(
+        size=int(os.getenv("AI_STORY_POOL_SIZE", "5")),
+        ttl_seconds=float(os.getenv("AI_STORY_TTL_SECONDS", "3600")),
+        timeout_seconds=float(os.getenv("AI_TIMEOUT_SECONDS", "8")),
+        wait_seconds=float(os.getenv("AI_WAIT_SECONDS", "3")),
+        api_key=os.getenv("XAI_API_KEY"),
+        base_url=os.getenv("XAI_BASE_URL", DEFAULT_BASE_URL),
+    )
@@ -0,0 +1,166 @@
+"""
+JSON API
+--------
+Versioned read-only JSON under /api/v1 for scoreboards, scripts and the
+offline client.
+
+    GET /api/v1/players?fields=id,name
+    GET /api/v1/scores?round_id=3&limit=50&after=120
+
+Lists are paged by id (keyset): a page holds up to `limit` rows (default
+100, at most 500) with ids above `after`, and `next` is the URL of the page
+after it, so every page is one index range scan however deep a client
+reads. `fields` picks the fields of each row. Bodies are compact JSON,
+cached and tagged like the HTML pages (see http_cache.py), so a client
+sending If-None-Match gets 304 until a table behind the list is written.
+"""
+
+import json
+from flask import Blueprint, jsonify, request, url_for
+from database import db, CourseTee, GolfCourse, Player, Round, RoundScore, active_tournament_id
+from db_routing import read_only
+from http_cache import cached_view
+from standings import get_oom_standings
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+JSON_MIMETYPE = "application/json"
+
+PLAYER_FIELDS = ("id", "name", "handicap")
+ROUND_FIELDS = ("id", "tournament_id", "play_date", "course_name", "tee_time", "pick_up", "tee_id")
+SCORE_FIELDS = ("id", "round_id", "player_id", "tournament_id", "score", "holes", "version")
+COURSE_FIELDS = ("id", "name", "facility")
+TEE_FIELDS = ("id", "course_id", "name", "gender", "par", "course_rating", "slope_rating",
+              "hole_pars", "stroke_indexes")
+STANDING_FIELDS = ("rank", "player_id", "name", "total", "avg", "rounds", "scores")
+# As SCORES_TABLES in app.py: a new tournament changes which rows the standings show
+STANDINGS_TABLES = ("players", "rounds", "round_scores", "tournaments")
+
+api = Blueprint("api_v1", __name__, url_prefix="/api/v1")
+
+
+class ApiError(ValueError):
+    """Raised for query parameters the API cannot answer; sent as 400."""
+
+
+@api.errorhandler(ApiError)
+def _bad_request(error):
+    return jsonify({"error": str(error)}), 400
+
+
+def _dump(payload):
+    """Compact JSON; dates as ISO 8601."""
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False,
+                      default=lambda value: value.isoformat())
+
+
+def _fields(allowed):
+    """Fields named in ?fields=, in the order of `allowed`; all of them by default."""
+    value = request.args.get("fields")
+    if not value:
+        return allowed
+    wanted = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = wanted.difference(allowed)
+    if unknown:
+        raise ApiError(f"Ukjente felt: {', '.join(sorted(unknown))}. Gyldige: {', '.join(allowed)}.")
+    return tuple(name for name in allowed if name in wanted)
+
+
+def _int_arg(name, default=None, minimum=0, maximum=None):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(f"{name} må være et heltall.")
+    if number < minimum or maximum is not None and number > maximum:
+        raise ApiError(f"{name} må være mellom {minimum} og {maximum}." if maximum is not None
+                       else f"{name} må være minst {minimum}.")
+    return number
+
+
+def _page(model, allowed, filters=(), scoped=False):
+    """
+    One keyset page of `model` rows as JSON.
+
+    filters are columns that may be matched with ?<column>=<id>; scoped lists
+    only show the active tournament unless ?tournament_id= picks another.
+    """
+    fields = _fields(allowed)
+    limit = _int_arg("limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+    after = _int_arg("after", 0)
+    query = db.session.query(model.id, *(getattr(model, name) for name in fields))
+    for name in filters:
+        value = _int_arg(name)
+        if value is not None:
+            query = query.filter(getattr(model, name) == value)
+    if scoped and "tournament_id" not in request.args:
+        query = query.filter(model.tournament_id == active_tournament_id())
+    # One row past the page tells whether there is a next one
+    rows = query.filter(model.id > after).order_by(model.id).limit(limit + 1).all()
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_url = url_for(request.endpoint, **dict(request.args.items(), after=rows[-1][0]))
+    return _dump({
+        "data": [dict(zip(fields, row[1:])) for row in rows],
+        "next": next_url,
+    })
+
+
+@api.route("/players")
+@read_only
+@cached_view("players", mimetype=JSON_MIMETYPE)
+def players():
+    """Players by id."""
+    return _page(Player, PLAYER_FIELDS)
+
+
+@api.route("/rounds")
+@read_only
+@cached_view("rounds", "tournaments", mimetype=JSON_MIMETYPE)
+def rounds():
+    """Rounds of the active tournament, or of ?tournament_id=."""
+    return _page(Round, ROUND_FIELDS, filters=("tournament_id",), scoped=True)
+
+
+@api.route("/scores")
+@read_only
+@cached_view("round_scores", "tournaments", mimetype=JSON_MIMETYPE)
+def scores():
+    """Round scores, filtered by ?round_id=, ?player_id= or ?tournament_id= (default active)."""
+    return _page(RoundScore, SCORE_FIELDS, filters=("round_id", "player_id", "tournament_id"),
+                 scoped=True)
+
+
+@api.route("/courses")
+@read_only
+@cached_view("golf_courses", mimetype=JSON_MIMETYPE)
+def courses():
+    """Golf courses."""
+    return _page(GolfCourse, COURSE_FIELDS)
+
+
+@api.route("/tees")
+@read_only
+@cached_view("course_tees", mimetype=JSON_MIMETYPE)
+def tees():
+    """Tees with ratings and hole data, filtered by ?course_id=."""
+    return _page(CourseTee, TEE_FIELDS, filters=("course_id",))
+
+
+@api.route("/standings")
+@read_only
+@cached_view(*STANDINGS_TABLES, mimetype=JSON_MIMETYPE)
+def standings():
+    """OOM standings of the active tournament in rank order; one short list, so not paged."""
+    fields = _fields(STANDING_FIELDS)
+    return _dump({
+        "data": [
+            {name: row[name] for name in fields}
+            for row in (dict(row, rank=rank) for rank, row in
+                        enumerate(get_oom_standings(), start=1))
+        ],
+        "next": None,
+    })
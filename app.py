@@ -5,25 +5,41 @@ A Flask web application for managing golf players and rounds.
 Deployed on Render.com: https://golf-app-w497.onrender.com
 """
 
+import time
+
+# Import-to-first-response time is reported on /admin/warmup and /admin/metrics
+IMPORT_STARTED = time.perf_counter()
+
 import os
 from datetime import datetime, date
-import locale
 from sqlalchemy import text
-from sqlalchemy.exc import SQLAlchemyError
-from flask import Flask, render_template, request, redirect, url_for
-from database import db, Player, Round, RoundScore, FinaleScore, GolfCourse, CourseTee
-from models import HandicapError, course_handicap
+from flask import Blueprint, Flask, Response, current_app, jsonify, render_template, request, \
+    redirect, send_from_directory, url_for, stream_with_context
+from database import db, Player, Round, RoundScore, FinaleScore, GolfCourse, CourseTee, Tournament, \
+    HOLES, active_tournament_id, commit_with_retry
+from db_routing import init_db_routing, read_only
+from models import HandicapError, StoryUnavailableError, TEE_GENDERS
+from standings import get_oom_standings
+from finale_service import FinaleError, FinaleService
+from http_cache import cached_view, init_http_cache, DEFAULT_CACHE_SIZE
+import live_feed
+from strokes import MATRIX_TABLES, REFERENCE_HANDICAPS, get_strokes_matrix
+from tournaments import default_name, start_tournament
+from flights import FlightError, flights_by_round, generate_flights, parse_fixed_groups, tee_times
+from handicaps import init_handicaps, recompute, record_scores, round_player_ids
+from scoring import MAX_STROKES, parse_hole_values, save_cards, score_round, validate_tee_holes
+import metrics
+from ai_tips import init_ai_tips, story_pool
+from migrations import db_cli, upgrade
+import bulk_io
+import score_sync
+from api_v1 import api as api_v1
+from assets import init_assets
+from images import init_images
+from static_export import init_static_export
 from dotenv import load_dotenv
-from openai import OpenAI
 
-# Set Norwegian locale for date formatting
-try:
-    locale.setlocale(locale.LC_TIME, 'nb_NO.UTF-8')
-except locale.Error:
-    # Fallback if Norwegian locale is not available
-    locale.setlocale(locale.LC_TIME, '')
-
-# Norwegian weekday names (index 0 = Monday), for display when server locale is not Norwegian
+# Norwegian weekday names (index 0 = Monday), so dates never depend on the server locale
 WEEKDAYS_NO = ['Mandag', 'Tirsdag', 'Onsdag', 'Torsdag', 'Fredag', 'Lørdag', 'Søndag']
 
 def format_date_norwegian(dt):
@@ -31,123 +47,49 @@ def format_date_norwegian(dt):
     return f"{WEEKDAYS_NO[dt.weekday()]} {dt.strftime('%d.%m')}"
 
 
-def get_oom_bonus_by_player_id(players):
-    """Return bonus points based on OOM rank (1-4 => 4/3/2/1)."""
-    oom_rows = []
-    for player in players:
-        scores = RoundScore.query.filter_by(player_id=player.id).all()
-        valid_scores = [score.score for score in scores if score.score]
-        if not valid_scores:
-            continue
-        oom_rows.append({
-            "player_id": player.id,
-            "total": sum(valid_scores),
-            "name": player.name
-        })
-
-    # Deterministic sort for tie handling
-    oom_rows.sort(key=lambda row: (-row["total"], row["name"]))
-
-    bonus_scale = [4, 3, 2, 1]
-    bonus_by_player_id = {player.id: 0 for player in players}
-    rank_by_player_id = {}
-
-    for idx, row in enumerate(oom_rows, start=1):
-        rank_by_player_id[row["player_id"]] = idx
-        if idx <= 4:
-            bonus_by_player_id[row["player_id"]] = bonus_scale[idx - 1]
-
-    return bonus_by_player_id, rank_by_player_id
-
-
-def finale_has_started():
-    """True once at least one finale score has been saved."""
-    return FinaleScore.query.filter(FinaleScore.score.isnot(None)).count() > 0
-
-
-def sync_locked_finale_bonus(players):
-    """Snapshot current OOM bonus for all players when finale starts."""
-    bonus_by_player_id, _ = get_oom_bonus_by_player_id(players)
-    for player in players:
-        row = FinaleScore.query.filter_by(player_id=player.id).first()
-        bonus = bonus_by_player_id.get(player.id, 0)
-        if row:
-            row.bonus = bonus
-        else:
-            db.session.add(FinaleScore(
-                player_id=player.id,
-                bonus=bonus,
-                score=None
-            ))
-
-
-def build_finale_rows(players):
-    """Build finale rows; bonus follows live OOM until the first finale score is saved."""
-    live_bonus_by_player_id, rank_by_player_id = get_oom_bonus_by_player_id(players)
-    finale_score_rows = FinaleScore.query.all()
-    finale_scores_by_player_id = {row.player_id: row for row in finale_score_rows}
-    use_locked_bonus = finale_has_started()
-
-    finale_rows = []
-    for player in players:
-        stored = finale_scores_by_player_id.get(player.id)
-        if use_locked_bonus:
-            bonus = stored.bonus if stored else live_bonus_by_player_id.get(player.id, 0)
-        else:
-            bonus = live_bonus_by_player_id.get(player.id, 0)
-        finale_score = stored.score if stored else None
-        total = (finale_score if finale_score is not None else 0) + bonus
-        finale_rows.append({
-            "player_id": player.id,
-            "name": player.name,
-            "oom_rank": rank_by_player_id.get(player.id, "-"),
-            "bonus": bonus,
-            "finale_score": finale_score,
-            "total": total
-        })
-
-    # Players with score first, then by total desc, then name
-    finale_rows.sort(key=lambda row: (row["finale_score"] is None, -row["total"], row["name"]))
-
-    place = 0
-    previous_total = None
-    for row in finale_rows:
-        if row["finale_score"] is None:
-            row["place"] = None
-            continue
-        if row["total"] != previous_total:
-            place += 1
-            previous_total = row["total"]
-        row["place"] = place
-
-    return finale_rows
-
-
-def ensure_finale_bonus_column():
-    """Add finale_scores.bonus for existing databases missing this column."""
-    try:
-        db.session.execute(text(
-            "ALTER TABLE finale_scores ADD COLUMN IF NOT EXISTS bonus INTEGER DEFAULT 0"
-        ))
-        db.session.commit()
-    except SQLAlchemyError:
-        # Safety fallback: if table does not exist yet (or DB does not support this DDL),
-        # continue startup and let create_all/model usage handle table creation.
-        db.session.rollback()
-
-
-def ensure_course_tee_gender_column():
-    """Add course_tees.gender for existing databases missing this column."""
-    try:
-        db.session.execute(text(
-            "ALTER TABLE course_tees ADD COLUMN IF NOT EXISTS gender VARCHAR(10) DEFAULT 'Herre'"
-        ))
-        db.session.commit()
-    except SQLAlchemyError:
-        db.session.rollback()
-
-
-TEE_GENDERS = ("Herre", "Dame")
+# Tables read by the OOM table and the finale result (cache keys and live feed);
+# a new tournament changes which rows they show
+SCORES_TABLES = ("players", "rounds", "round_scores", "tournaments")
+FINALE_TABLES = SCORES_TABLES + ("finale_scores",)
+FLIGHT_TABLES = ("players", "rounds", "flight_assignments", "tournaments")
+
+
+def _scores_snapshot():
+    """OOM table rows keyed by player id, for the live feed."""
+    standings = get_oom_standings()
+    return {
+        "rows": {
+            str(row["player_id"]): [row["name"], row["total"], row["avg"], row["scores"]]
+            for row in standings
+        },
+        "order": [str(row["player_id"]) for row in standings],
+    }
+
+
+def _finale_snapshot():
+    """Finale result rows keyed by player id, for the live feed."""
+    result_rows = FinaleService().result_rows()
+    return {
+        "rows": {
+            str(row["player_id"]): [
+                row["place"], row["name"], row["total"], row["finale_score"], row["bonus"]
+            ]
+            for row in result_rows
+        },
+        "order": [str(row["player_id"]) for row in result_rows],
+    }
+
+
+def _event_stream(channel, tables, build):
+    """Wrap a live feed channel in a Server-Sent Events response."""
+    if not current_app.config["LIVE_FEED_STREAM"]:
+        # 204 tells EventSource to stop reconnecting
+        return Response(status=204)
+    return Response(
+        stream_with_context(live_feed.stream(channel, tables, build)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 def _parse_tee_rows_from_form(form):
@@ -158,11 +100,16 @@ def _parse_tee_rows_from_form(form):
     tee_pars = form.getlist("tee_par")
     tee_crs = form.getlist("tee_cr")
     tee_slopes = form.getlist("tee_slope")
+    tee_hole_pars = form.getlist("tee_hole_pars")
+    tee_stroke_indexes = form.getlist("tee_stroke_indexes")
 
     rows = []
-    for tee_id, name, gender, par, cr, slope in zip(
-        tee_ids, tee_names, tee_genders, tee_pars, tee_crs, tee_slopes
-    ):
+    for index, (tee_id, name, gender, par, cr, slope) in enumerate(zip(
+        tee_ids, tee_names, tee_genders, tee_pars, tee_crs, tee_slopes,
+    )):
+        # Hole data is optional; a form or client without it leaves it blank
+        hole_pars = tee_hole_pars[index] if index < len(tee_hole_pars) else ""
+        stroke_indexes = tee_stroke_indexes[index] if index < len(tee_stroke_indexes) else ""
         name = (name or "").strip()
         if not name:
             continue
@@ -180,6 +127,16 @@ def _parse_tee_rows_from_form(form):
             })
         except (TypeError, ValueError):
             return None, f"Ugyldige tall for tee «{name}»."
+        try:
+            rows[-1]["hole_pars"] = parse_hole_values(hole_pars)
+            rows[-1]["stroke_indexes"] = parse_hole_values(stroke_indexes)
+        except ValueError as exc:
+            return None, f"Par/indeks per hull for tee «{name}»: {exc}"
+        hole_error = validate_tee_holes(
+            rows[-1]["par"], rows[-1]["hole_pars"], rows[-1]["stroke_indexes"]
+        )
+        if hole_error:
+            return None, f"Tee «{name}»: {hole_error}"
     return rows, None
 
 
@@ -195,6 +152,8 @@ def _apply_tee_rows(course, rows):
             tee.par = row["par"]
             tee.course_rating = row["course_rating"]
             tee.slope_rating = row["slope_rating"]
+            tee.hole_pars = row["hole_pars"]
+            tee.stroke_indexes = row["stroke_indexes"]
         else:
             db.session.add(CourseTee(
                 course_id=course.id,
@@ -203,10 +162,50 @@ def _apply_tee_rows(course, rows):
                 par=row["par"],
                 course_rating=row["course_rating"],
                 slope_rating=row["slope_rating"],
+                hole_pars=row["hole_pars"],
+                stroke_indexes=row["stroke_indexes"],
             ))
 
+def _tee_id_from_form(form):
+    """Selected tee of a round, or None when no tee is chosen."""
+    tee_id = (form.get("tee_id") or "").strip()
+    return int(tee_id) if tee_id.isdigit() else None
+
+
+def _form_versions(form, player_ids):
+    """
+    Row versions the form was rendered with, {player_id: version}; None when a
+    field is missing (an older form), in which case the last save wins.
+    """
+    versions = {}
+    for player_id in player_ids:
+        version = (form.get(f"version_{player_id}") or "").strip()
+        if not version.isdigit():
+            return None
+        versions[player_id] = int(version)
+    return versions
+
+
+def _conflict_message(players, conflicts, show_stored=True):
+    """Tell the marker which scores someone else changed while the form was open."""
+    names = [
+        f"{player.name} (nå {conflicts[player.id]})" if show_stored else player.name
+        for player in players if player.id in conflicts
+    ]
+    return ("Ikke lagret fordi noen andre endret dem i mellomtiden: " + ", ".join(names)
+            + ". Sjekk verdiene og lagre på nytt.")
+
+
+bp = Blueprint("main", __name__, cli_group=None)
+
+
 def create_app():
-    """Create and configure the Flask application."""
+    """
+    Create and configure the Flask application.
+
+    Does no database or network I/O, so it is safe to call in the gunicorn
+    master with --preload; schema changes run through `flask db upgrade`.
+    """
     app = Flask(__name__)
     
     # Environment Configuration
@@ -216,24 +215,54 @@ def create_app():
     # Database Configuration
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool sizing per worker and the optional READ_DATABASE_URL replica
+    init_db_routing(app)
+    # Raise on lazy relationship loads in GET requests (always on in debug mode)
+    app.config['LAZY_LOAD_GUARD'] = os.environ.get('LAZY_LOAD_GUARD') == '1'
     db.init_app(app)
+
+    # Query count and timing per route, exported on /admin/metrics
+    metrics.init_metrics(app)
+
+    # Live feed across gunicorn workers needs LIVE_FEED_BACKEND=postgres; open feeds
+    # need gevent or threaded workers (or LIVE_FEED_STREAM=1), else they stay off
+    live_feed.init_live_feed(app, os.environ.get('LIVE_FEED_BACKEND', 'local'),
+                             live_feed.streaming_supported(os.environ))
+
+    # AI tips are generated in the background; no client is created here
+    init_ai_tips(app)
+
+    # WHS handicap index from rounds on rated tees; HANDICAP_AUTO_UPDATE=1 writes it to the player
+    init_handicaps(app, os.environ.get('HANDICAP_AUTO_UPDATE') == '1')
+
+    # Hashed, precompressed CSS/JS (flask assets build) and gzip for dynamic pages
+    init_assets(app)
+    # Rendered read-only pages kept per worker; ETags and cache keys include the build id
+    init_http_cache(app, int(os.environ.get('HTML_CACHE_SIZE', DEFAULT_CACHE_SIZE)))
+    # Resized WebP/JPEG photos (flask images build) for responsive_image()
+    init_images(app)
+    # `flask site export`: the read-only pages as files for a static host
+    init_static_export(app)
+
+    app.add_template_filter(format_date_norwegian, "norwegian_date")
+    app.register_blueprint(bp)
+    # Read-only JSON under /api/v1
+    app.register_blueprint(api_v1)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(bulk_io.data_cli)
+    metrics.record_startup(app, IMPORT_STARTED)
     
     return app
 
-# Initialize application
-app = create_app()
-
-# Ensure database tables exist
-with app.app_context():
-    db.create_all()
-    ensure_finale_bonus_column()
-    ensure_course_tee_gender_column()
-
 # Basic Routes
-@app.route("/")
+@bp.route("/")
 def home():
     """Display home page with countdown to first tee time."""
-    first_round = Round.query.order_by(Round.play_date.asc()).first()
+    first_round = (
+        Round.query.filter(Round.tournament_id == active_tournament_id())
+        .order_by(Round.play_date.asc())
+        .first()
+    )
     days_until = None
     if first_round:
         today = date.today()
@@ -244,12 +273,12 @@ def home():
     return render_template("home.html", days_until=days_until)
 
 # Player Management Routes
-@app.route("/register", methods=["GET"])
+@bp.route("/register", methods=["GET"])
 def register_player():
     """Display the player registration form."""
     return render_template("register_player.html")
 
-@app.route("/add_player", methods=["POST"])
+@bp.route("/add_player", methods=["POST"])
 def add_player():
     """Handle new player registration with handicap validation."""
     player_name = request.form.get("player_name")
@@ -260,32 +289,33 @@ def add_player():
             player = Player(name=player_name, handicap=handicap)
             db.session.add(player)
             db.session.commit()
-            return redirect(url_for("home"))
+            return redirect(url_for("main.home"))
     except HandicapError as e:
         return render_template("register_player.html", error=str(e))
     
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
-@app.route("/players", methods=["GET"])
+@bp.route("/players", methods=["GET"])
+@cached_view("players", "player_handicaps")
 def list_players():
     """Display list of all players sorted by name."""
-    players = Player.get_all()
+    players = Player.get_all(eager=("handicap_record",))
     return render_template("list_players.html", players=players)
 
-@app.route("/player/<int:player_id>/delete", methods=["POST"])
+@bp.route("/player/<int:player_id>/delete", methods=["POST"])
 def delete_player(player_id):
     """Delete a player."""
     player = Player.get_by_id(player_id)
     if player:
         player.delete()
-    return redirect(url_for("list_players"))
+    return redirect(url_for("main.list_players"))
 
-@app.route("/player/<int:player_id>/update", methods=["GET", "POST"])
+@bp.route("/player/<int:player_id>/update", methods=["GET", "POST"])
 def update_player(player_id):
     """Update a player's information with handicap validation."""
     player = Player.get_by_id(player_id)
     if not player:
-        return redirect(url_for("list_players"))
+        return redirect(url_for("main.list_players"))
     
     if request.method == "POST":
         new_handicap = float(request.form.get("handicap", player.handicap))
@@ -297,12 +327,14 @@ def update_player(player_id):
         player.name = request.form.get("player_name", player.name)
         player.handicap = new_handicap
         db.session.commit()
-        return redirect(url_for("list_players"))
+        return redirect(url_for("main.list_players"))
         
     return render_template("update_player.html", player=player)
 
 # Round Management Routes
-@app.route("/rounds")
+@bp.route("/rounds")
+@read_only
+@cached_view("rounds", "tournaments")
 def list_rounds():
     """Display list of all rounds sorted by date."""
     rounds = Round.get_all()
@@ -310,7 +342,7 @@ def list_rounds():
         r.display_date = format_date_norwegian(r.play_date)
     return render_template("list_rounds.html", rounds=rounds)
 
-@app.route("/round/new", methods=["GET", "POST"])
+@bp.route("/round/new", methods=["GET", "POST"])
 def add_round():
     """Handle new round registration."""
     if request.method == "POST":
@@ -324,205 +356,437 @@ def add_round():
                 course_name=course_name,
                 play_date=play_date,
                 tee_time=tee_time,
-                pick_up=pick_up
+                pick_up=pick_up,
+                tee_id=_tee_id_from_form(request.form),
             )
             db.session.add(round)
             db.session.commit()
-            return redirect(url_for("list_rounds"))
+            return redirect(url_for("main.list_rounds"))
     
-    return render_template("add_round.html")
+    return render_template("add_round.html", tees=CourseTee.get_all_with_course())
 
-@app.route("/round/<int:round_id>/delete", methods=["POST"])
+@bp.route("/round/<int:round_id>/delete", methods=["POST"])
 def delete_round(round_id):
     """Delete a round."""
-    round = Round.get_by_id(round_id)
-    if round:
+    round = Round.get_by_id(round_id, eager=("tournament",), strategy="joined")
+    if round and not round.is_closed:
+        player_ids = round_player_ids(round)
         round.delete()
-    return redirect(url_for("list_rounds"))
+        if player_ids:
+            recompute(player_ids)
+            db.session.commit()
+    return redirect(url_for("main.list_rounds"))
 
-@app.route("/round/<int:round_id>/update", methods=["GET", "POST"])
+@bp.route("/round/<int:round_id>/update", methods=["GET", "POST"])
 def update_round(round_id):
     """Update a round's information."""
-    round = Round.get_by_id(round_id)
-    if not round:
-        return redirect(url_for("list_rounds"))
+    round = Round.get_by_id(round_id, eager=("tournament",), strategy="joined")
+    if not round or round.is_closed:
+        return redirect(url_for("main.list_rounds"))
     
     if request.method == "POST":
         round.course_name = request.form.get("course_name", round.course_name)
+        rated_before = (round.play_date, round.tee_id)
         play_date = request.form.get("play_date")
         if play_date:
             round.play_date = datetime.strptime(play_date, "%Y-%m-%d")
         round.tee_time = request.form.get("tee_time", round.tee_time)
+        round.tee_id = _tee_id_from_form(request.form)
+        if (round.play_date, round.tee_id) != rated_before:
+            # Differentials depend on the tee and on the order of rounds
+            recompute(round_player_ids(round))
         db.session.commit()
-        return redirect(url_for("list_rounds"))
+        return redirect(url_for("main.list_rounds"))
         
-    return render_template("update_round.html", round=round)
+    return render_template("update_round.html", round=round, tees=CourseTee.get_all_with_course())
 
-@app.route("/round/<int:round_id>/scores", methods=["GET", "POST"])
+@bp.route("/round/<int:round_id>/scores", methods=["GET", "POST"])
 def manage_scores(round_id):
     """Manage scores for a round."""
-    round = Round.get_by_id(round_id)
-    if not round:
-        return redirect(url_for("list_rounds"))
+    round = Round.get_by_id(round_id, eager=("tournament",), strategy="joined")
+    if not round or round.is_closed:
+        return redirect(url_for("main.list_rounds"))
     
     players = Player.get_all()
     
     if request.method == "POST":
-        # Update scores
+        # Update or create all submitted scores in one statement
+        scores_by_player_id = {}
         for player in players:
             score = request.form.get(f"score_{player.id}")
             if score:
-                # Update or create score
-                round_score = RoundScore.query.filter_by(
-                    round_id=round.id,
-                    player_id=player.id
-                ).first()
-                
-                if round_score:
-                    round_score.score = int(score)
-                else:
-                    round_score = RoundScore(
-                        round_id=round.id,
-                        player_id=player.id,
-                        score=int(score)
-                    )
-                    db.session.add(round_score)
-        
-        db.session.commit()
-        return redirect(url_for("list_rounds"))
+                scores_by_player_id[player.id] = int(score)
+        versions = _form_versions(request.form, scores_by_player_id)
+
+        def save():
+            conflicts = RoundScore.upsert_scores(
+                round.id, scores_by_player_id, round.tournament_id, versions
+            )
+            record_scores(round, {
+                player_id: score for player_id, score in scores_by_player_id.items()
+                if player_id not in conflicts
+            })
+            return conflicts
+
+        conflicts = commit_with_retry(save)
+        live_feed.publish("scores", "finale")
+        if not conflicts:
+            return redirect(url_for("main.list_rounds"))
+        # The commit expired the loaded players
+        players = Player.get_all()
+        error = _conflict_message(players, conflicts)
+    else:
+        error = None
     
-    return render_template("manage_scores.html", round=round, players=players)
+    return render_template(
+        "manage_scores.html",
+        round=round,
+        players=players,
+        cards=round.get_cards(),
+        error=error,
+    )
+
+@bp.route("/api/sync/scores", methods=["POST"])
+def sync_scores():
+    """Apply a batch of score changes queued offline; answers with one result per change id."""
+    try:
+        changes = score_sync.parse_changes(request.get_json(silent=True))
+    except score_sync.SyncError as e:
+        return jsonify({"error": str(e)}), 400
+    results = commit_with_retry(lambda: score_sync.apply_changes(changes))
+    if any(result["status"] == "applied" for result in results.values()):
+        live_feed.publish("scores", "finale")
+    return jsonify({"results": [dict(results[change["id"]], id=change["id"]) for change in changes]})
+
+@bp.route("/sw.js")
+def service_worker():
+    """The offline service worker; served from the root so its scope covers every page."""
+    response = send_from_directory(os.path.join(current_app.static_folder, "js"), "sw.js")
+    # Browsers check for a new worker on navigation; never let a cache pin an old one
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@bp.route("/round/<int:round_id>/holes", methods=["GET", "POST"])
+def round_holes(round_id):
+    """Enter hole-by-hole scores; Stableford totals are computed for all players at once."""
+    round = Round.get_by_id(round_id, eager=("tee", "tournament"), strategy="joined")
+    if not round or round.is_closed:
+        return redirect(url_for("main.list_rounds"))
+
+    tee = round.tee
+    players = Player.get_all()
+    handicaps = {player.id: player.handicap for player in players}
+    error = None
+
+    if request.method == "POST" and tee is not None and tee.has_holes:
+        cards = {}
+        for player in players:
+            holes = []
+            for hole in range(1, HOLES + 1):
+                value = (request.form.get(f"hole_{player.id}_{hole}") or "").strip()
+                if not value:
+                    holes.append(None)
+                elif value.isdigit() and 1 <= int(value) <= MAX_STROKES:
+                    holes.append(int(value))
+                else:
+                    error = f"Ugyldig antall slag for {player.name} på hull {hole}."
+                    break
+            if error:
+                break
+            # A blank card leaves the player's score untouched
+            if any(strokes is not None for strokes in holes):
+                cards[player.id] = holes
+        if not error:
+            versions = _form_versions(request.form, cards)
+
+            def save():
+                results, conflicts = save_cards(round, tee, cards, handicaps, versions)
+                saved = {player_id: cards[player_id] for player_id in results
+                         if player_id not in conflicts}
+                record_scores(round, {player_id: results[player_id]["points"]
+                                      for player_id in saved}, saved)
+                return conflicts
+
+            conflicts = commit_with_retry(save)
+            live_feed.publish("scores", "finale")
+            if not conflicts:
+                return redirect(url_for("main.list_rounds"))
+            players = Player.get_all()
+            error = _conflict_message(players, conflicts, show_stored=False)
+
+    stored = round.get_cards()
+    cards = {
+        player_id: holes for player_id, (_, holes, _) in stored.items() if holes is not None
+    }
+    results = score_round(tee, cards, handicaps) if tee is not None and tee.has_holes else {}
+    return render_template(
+        "round_holes.html",
+        round=round,
+        tee=tee,
+        players=players,
+        cards=cards,
+        versions={player_id: version for player_id, (_, _, version) in stored.items()},
+        results=results,
+        holes=range(1, HOLES + 1),
+        max_strokes=MAX_STROKES,
+        error=error,
+    )
 
-@app.route("/scores")
+@bp.route("/scores")
+@read_only
+@cached_view(*SCORES_TABLES)
 def list_scores():
     """Display player scores sorted by total score."""
-    players = Player.get_all()
-    
-    # Get scores for each player
-    player_scores = []
-    for player in players:
-        scores = RoundScore.query.filter_by(player_id=player.id).all()
-        if scores:
-            # Filter out zeros and empty scores
-            valid_scores = [score.score for score in scores if score.score]
-            if valid_scores:  # Only process if there are valid scores
-                total_score = sum(valid_scores)
-                avg_score = round(total_score / len(valid_scores), 1)
-                player_scores.append({
-                    'name': player.name,
-                    'total': total_score,
-                    'avg': avg_score,
-                    'scores': valid_scores
-                })
-    
-    # Sort by total score descending
-    player_scores.sort(key=lambda x: x['total'], reverse=True)
+    player_scores = get_oom_standings()
     
     return render_template("list_scores.html", player_scores=player_scores)
 
-@app.route("/scores/reset", methods=["POST"])
-def reset_scores():
-    """Delete all registered scores."""
-    try:
-        RoundScore.query.delete()
-        FinaleScore.query.delete()
-        db.session.commit()
-        return redirect(url_for("list_scores", message="Alle scorer er slettet"))
-    except Exception as e:
-        return redirect(url_for("list_scores", error=f"Kunne ikke slette scorer: {str(e)}"))
+@bp.route("/scores/stream")
+def stream_scores():
+    """Push OOM table changes to viewers as Server-Sent Events."""
+    return _event_stream("scores", SCORES_TABLES, _scores_snapshot)
+
+@bp.route("/turneringer")
+@read_only
+def list_tournaments():
+    """Active and archived tournaments."""
+    return render_template(
+        "tournaments.html",
+        tournaments=Tournament.get_all(),
+        default_name=default_name(),
+        message=request.args.get("message"),
+    )
+
 
+@bp.route("/turneringer/ny", methods=["POST"])
+def new_tournament():
+    """Archive the active tournament and start a new one; no scores are deleted."""
+    name = (request.form.get("name") or "").strip()
+    tournament = start_tournament(name)
+    db.session.commit()
+    live_feed.publish("scores", "finale")
+    return redirect(url_for("main.list_tournaments", message=f"{tournament.name} er startet."))
 
-@app.route("/finale/reset", methods=["POST"])
+
+@bp.route("/turneringer/<int:tournament_id>")
+@read_only
+def view_tournament(tournament_id):
+    """Archived result of a closed tournament."""
+    tournament = Tournament.get_by_id(tournament_id, eager=("results",))
+    if not tournament:
+        return redirect(url_for("main.list_tournaments"))
+    if tournament.closed_at is None:
+        return redirect(url_for("main.list_scores"))
+    return render_template("tournament_results.html", tournament=tournament)
+
+
+@bp.route("/finale/reset", methods=["POST"])
 def reset_finale_scores():
-    """Delete all finale scores and locked bonus for a new tournament."""
+    """Delete the active tournament's finale scores and locked bonus to redo the finale."""
     try:
-        FinaleScore.query.delete()
+        FinaleScore.query.filter(FinaleScore.tournament_id == active_tournament_id()).delete(
+            synchronize_session=False
+        )
         db.session.commit()
-        return redirect(url_for("finale", message="Alle finalescorer er slettet"))
+        live_feed.publish("finale")
+        return redirect(url_for("main.finale", message="Alle finalescorer er slettet"))
     except Exception as e:
-        return redirect(url_for("finale", error=f"Kunne ikke slette finalescorer: {str(e)}"))
+        return redirect(url_for("main.finale", error=f"Kunne ikke slette finalescorer: {str(e)}"))
 
 
-@app.route("/finale", methods=["GET", "POST"])
+@bp.route("/finale", methods=["GET", "POST"])
 def finale():
     """Register finale scores and calculate total with OOM bonus."""
-    players = Player.get_all()
+    service = FinaleService()
 
     if request.method == "POST":
-        scores_to_save = []
-        for player in players:
+        scores_to_save = {}
+        for player in service.players:
             score_input = request.form.get(f"finale_score_{player.id}", "").strip()
             if score_input == "":
                 continue
             try:
-                scores_to_save.append((player, int(score_input)))
+                scores_to_save[player.id] = int(score_input)
             except ValueError:
                 continue
 
-        if scores_to_save and not finale_has_started():
-            sync_locked_finale_bonus(players)
-
-        for player, value in scores_to_save:
-            finale_score = FinaleScore.query.filter_by(player_id=player.id).first()
-            if finale_score:
-                finale_score.score = value
-            else:
-                bonus_by_player_id, _ = get_oom_bonus_by_player_id(players)
-                db.session.add(FinaleScore(
-                    player_id=player.id,
-                    bonus=bonus_by_player_id.get(player.id, 0),
-                    score=value
-                ))
+        versions = _form_versions(request.form, scores_to_save)
+        snapshots = [service]
 
-        db.session.commit()
-        return redirect(url_for("finale"))
+        def save():
+            # A retry takes a fresh snapshot, so it sees a finale someone else started
+            current = snapshots.pop() if snapshots else FinaleService(service.players)
+            return current.save_scores(scores_to_save, versions)
 
-    finale_rows = build_finale_rows(players)
+        try:
+            conflicts = commit_with_retry(save)
+        except FinaleError as exc:
+            db.session.rollback()
+            return redirect(url_for("main.finale", error=str(exc)))
+        live_feed.publish("finale")
+        if conflicts:
+            return redirect(url_for("main.finale", error=_conflict_message(service.players, conflicts)))
+        return redirect(url_for("main.finale"))
 
     return render_template(
         "finale.html",
-        finale_rows=finale_rows,
+        finale_rows=service.rows(),
         message=request.args.get("message"),
         error=request.args.get("error"),
     )
 
 
-@app.route("/finale/resultat")
+@bp.route("/finale/resultat")
+@read_only
+@cached_view(*FINALE_TABLES)
 def finale_resultat():
     """Show read-only final result table."""
-    players = Player.get_all()
-    finale_rows = build_finale_rows(players)
-    ranked_rows = [row for row in finale_rows if row["finale_score"] is not None]
-    return render_template("finale_resultat.html", finale_rows=ranked_rows)
+    return render_template("finale_resultat.html", finale_rows=FinaleService().result_rows())
+
+@bp.route("/finale/stream")
+def stream_finale():
+    """Push finale result changes to viewers as Server-Sent Events."""
+    return _event_stream("finale", FINALE_TABLES, _finale_snapshot)
 
-@app.route("/admin/db/reset", methods=["POST"])
+@bp.route("/admin/db/reset", methods=["POST"])
 def reset_database():
     """Reset and reinitialize the database."""
     try:
-        with app.app_context():
-            db.drop_all()
-            db.create_all()
-        return redirect(url_for("home", message="Database reset successfully"))
+        db.drop_all()
+        upgrade()
+        return redirect(url_for("main.home", message="Database reset successfully"))
     except Exception as e:
-        return redirect(url_for("home", error=f"Database reset failed: {str(e)}"))
+        return redirect(url_for("main.home", error=f"Database reset failed: {str(e)}"))
+
+@bp.route("/admin/import/<kind>", methods=["POST"])
+def bulk_import(kind):
+    """Import players, tees or scores from an uploaded CSV/NDJSON file or the request body."""
+    upload = request.files.get("file")
+    if upload is not None:
+        stream = bulk_io.text_stream(upload.stream)
+        fmt = request.args.get("format") or bulk_io.format_for(upload.filename)
+    else:
+        stream = bulk_io.text_stream(request.stream)
+        fmt = request.args.get("format") or (
+            "ndjson" if request.mimetype == "application/x-ndjson" else "csv"
+        )
+    try:
+        result = bulk_io.import_stream(kind, stream, fmt)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result.to_dict())
+
+
+@bp.route("/admin/export.ndjson")
+@read_only
+def bulk_export():
+    """Stream players, courses, tees, rounds, scores and finale as NDJSON."""
+    return Response(
+        stream_with_context(bulk_io.export_ndjson()),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=turnering.ndjson"},
+    )
+
+
+@bp.route("/admin/export/<kind>.csv")
+@read_only
+def bulk_export_csv(kind):
+    """Stream one table as CSV."""
+    if kind not in bulk_io.EXPORT_KINDS:
+        return jsonify({"error": f"Ukjent type {kind!r}."}), 404
+    return Response(
+        stream_with_context(bulk_io.export_csv(kind)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={kind}.csv"},
+    )
+
+
+@bp.route("/admin/metrics")
+def export_metrics():
+    """Export per-route query and timing metrics in Prometheus text format."""
+    return Response(
+        metrics.render_prometheus(metrics.store.collect()),
+        mimetype="text/plain; version=0.0.4",
+    )
+
+@bp.route("/healthz")
+def healthz():
+    """Liveness check without database access."""
+    return jsonify(status="ok")
 
-@app.route("/flights")
+@bp.route("/admin/warmup")
+def warmup():
+    """Readiness check: open pool connections, compile all templates and start the AI tip pool."""
+    connections = []
+    try:
+        for engine in db.engines.values():
+            for _ in range(engine.pool.size() if hasattr(engine.pool, "size") else 1):
+                connection = engine.connect()
+                connection.execute(text("SELECT 1"))
+                connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+
+    story_pool.prefill()
+
+    env = current_app.jinja_env
+    templates = [name for name in env.list_templates() if name.endswith(".html")]
+    for name in templates:
+        env.get_template(name)
+
+    return jsonify(
+        status="ready",
+        connections=len(connections),
+        templates=len(templates),
+        startup=metrics.startup_times(),
+    )
+
+@bp.route("/flights")
+@read_only
+@cached_view(*FLIGHT_TABLES)
 def show_flights():
-    """Display the flight setup for each day."""
-    return render_template("flight_setup.html")
+    """Display the flights of every round in the active tournament."""
+    rounds = Round.get_all()
+    flights = flights_by_round()
+    return render_template(
+        "flight_setup.html",
+        rounds=[
+            (round, list(zip(tee_times(round.tee_time, len(flights.get(round.id, []))),
+                             flights.get(round.id, []))))
+            for round in rounds
+        ],
+        message=request.args.get("message"),
+        error=request.args.get("error"),
+    )
 
 
-@app.route("/baner")
+@bp.route("/flights", methods=["POST"])
+def setup_flights():
+    """Generate flights for every round without scores, keeping the fixed groups together."""
+    try:
+        groups = parse_fixed_groups(request.form.get("fixed_groups"), Player.get_all())
+        count = generate_flights(groups)
+    except FlightError as exc:
+        db.session.rollback()
+        return redirect(url_for("main.show_flights", error=str(exc)))
+    db.session.commit()
+    return redirect(url_for("main.show_flights", message=f"Flights er satt opp for {count} runder."))
+
+
+@bp.route("/baner")
+@read_only
 def list_golf_courses():
     """List all registered golf courses."""
-    courses = GolfCourse.get_all()
+    courses = GolfCourse.get_all(eager=("tees",))
     return render_template("list_golf_courses.html", courses=courses)
 
 
-@app.route("/baner/mottatte-slag")
+@bp.route("/baner/mottatte-slag")
+@read_only
 def list_course_handicaps():
     """Show received strokes per player for a selected course and tee."""
-    courses = GolfCourse.get_all()
+    courses = GolfCourse.get_all(eager=("tees",))
     course_id = request.args.get("course_id", type=int)
     tee_id = request.args.get("tee_id", type=int)
 
@@ -531,22 +795,11 @@ def list_course_handicaps():
     player_rows = None
 
     if selected_course and tee_id:
-        selected_tee = CourseTee.query.filter_by(
-            id=tee_id, course_id=selected_course.id
-        ).first()
-        if selected_tee:
-            player_rows = [
-                {
-                    "player": player,
-                    "strokes": course_handicap(
-                        player.handicap,
-                        selected_tee.slope_rating,
-                        selected_tee.course_rating,
-                        selected_tee.par,
-                    ),
-                }
-                for player in Player.get_all()
-            ]
+        matrix = get_strokes_matrix()
+        tee = matrix.tee(tee_id)
+        if tee and tee["course_id"] == selected_course.id:
+            selected_tee = tee
+            player_rows = matrix.rows_for_tee(tee_id)
 
     return render_template(
         "mottatte_slag.html",
@@ -559,7 +812,23 @@ def list_course_handicaps():
     )
 
 
-@app.route("/baner/ny", methods=["GET", "POST"])
+@bp.route("/baner/mottatte-slag/alle")
+@read_only
+@cached_view(*MATRIX_TABLES)
+def list_all_course_handicaps():
+    """Show received strokes for every player on every tee."""
+    matrix = get_strokes_matrix()
+    return render_template("mottatte_slag_alle.html", tees=matrix.tees, rows=matrix.rows())
+
+
+@bp.route("/baner/mottatte-slag/alle.json")
+@read_only
+def course_handicaps_json():
+    """Return the full received-strokes matrix as JSON."""
+    return jsonify(get_strokes_matrix().to_dict())
+
+
+@bp.route("/baner/ny", methods=["GET", "POST"])
 def add_golf_course():
     """Register a golf course with tee boxes."""
     error = None
@@ -580,17 +849,17 @@ def add_golf_course():
             db.session.flush()
             _apply_tee_rows(course, rows)
             db.session.commit()
-            return redirect(url_for("view_golf_course", course_id=course.id))
+            return redirect(url_for("main.view_golf_course", course_id=course.id))
 
     return render_template("add_golf_course.html", error=error, tee_genders=TEE_GENDERS)
 
 
-@app.route("/baner/<int:course_id>", methods=["GET", "POST"])
+@bp.route("/baner/<int:course_id>", methods=["GET", "POST"])
 def view_golf_course(course_id):
     """Show and edit course details and tee data."""
-    course = GolfCourse.get_by_id(course_id)
+    course = GolfCourse.get_by_id(course_id, eager=("tees",), strategy="joined")
     if not course:
-        return redirect(url_for("list_golf_courses"))
+        return redirect(url_for("main.list_golf_courses"))
 
     error = None
     message = request.args.get("message")
@@ -612,7 +881,7 @@ def view_golf_course(course_id):
             _apply_tee_rows(course, rows)
             db.session.commit()
             return redirect(url_for(
-                "view_golf_course",
+                "main.view_golf_course",
                 course_id=course.id,
                 message="Banen er oppdatert.",
             ))
@@ -620,58 +889,45 @@ def view_golf_course(course_id):
     return render_template(
         "view_golf_course.html",
         course=course,
-        course_handicap=course_handicap,
+        # Received strokes at the reference handicaps, precomputed with the strokes matrix
+        reference_strokes=get_strokes_matrix().reference_strokes,
+        reference_handicaps=REFERENCE_HANDICAPS,
         tee_genders=TEE_GENDERS,
         error=error,
         message=message,
     )
 
 
-@app.route("/local-rules")
+@bp.route("/local-rules")
 def show_local_rules():
     """Display the local rules for the tournament."""
     return render_template("local_rules.html")
 
-@app.route("/ai-story")
+@bp.route("/ai-story")
 def unicorn_story():
-    """Generate and display an AI story."""
+    """Display an AI story from the background-filled pool."""
     story = None
     error = None
     try:
-        XAI_API_KEY = os.getenv("XAI_API_KEY")
-        client = OpenAI(
-            api_key=XAI_API_KEY,
-            base_url="https://api.x.ai/v1",
-        )
-        completion = client.chat.completions.create(
-            model="grok-3-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a pro golfer, quite sarcastic, you stick to one or two sentence answers, ending with an emoji."
-                },
-                {
-                    "role": "user",
-                    "content": "What should I do to improve my golf - I am just all over the place and I guess the two beers didnt help :-)"
-                },
-            ],
-        )
-        story = completion.choices[0].message.content
-    except Exception as e:
+        story = story_pool.get_story()
+    except StoryUnavailableError as e:
         error = f"Feil ved henting av AI-historie: {str(e)}"
     return render_template("unicorn_story.html", story=story, error=error)
 
 # Error Handlers
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def page_not_found(e):
     """Handle 404 errors."""
     return render_template('404.html'), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def server_error(e):
     """Handle 500 errors."""
     return render_template('500.html'), 500
 
+# Initialize application
+app = create_app()
+
 # Run application
 if __name__ == "__main__":
     app.run(debug=True)
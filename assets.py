@@ -0,0 +1,164 @@
+"""
+Static Assets
+-------------
+Build step and serving for CSS/JS, plus gzip for dynamic responses.
+
+`flask --app app assets build` copies static/css and static/js to
+static/dist under content-hashed names, writes .gz and .br variants next to
+them and records the names in static/dist/manifest.json. Templates link
+assets through asset_url(), which points at the hashed file when a manifest
+exists; those files never change, so they are cached for a year.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+ASSET_DIRS = ("css", "js")
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Dynamic responses worth compressing; SSE streams and files are skipped
+COMPRESS_MIMETYPES = {"text/html", "application/json", "text/plain"}
+COMPRESS_MIN_BYTES = 500
+COMPRESS_LEVEL = 6
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def build_assets(static_folder, echo=None):
+    """Write hashed and precompressed copies of every asset; returns the manifest."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    brotli = _brotli()
+    manifest = {}
+    for asset_dir in ASSET_DIRS:
+        source_dir = os.path.join(static_folder, asset_dir)
+        if not os.path.isdir(source_dir):
+            continue
+        for name in sorted(os.listdir(source_dir)):
+            with open(os.path.join(source_dir, name), "rb") as handle:
+                content = handle.read()
+            stem, ext = os.path.splitext(name)
+            digest = hashlib.sha256(content).hexdigest()[:12]
+            hashed = f"{asset_dir}/{stem}.{digest}{ext}"
+            manifest[f"{asset_dir}/{name}"] = hashed
+
+            target = os.path.join(dist, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            variants = {"": content, ".gz": gzip.compress(content, 9, mtime=0)}
+            if brotli:
+                variants[".br"] = brotli.compress(content, quality=11)
+            for suffix, data in variants.items():
+                with open(target + suffix, "wb") as handle:
+                    handle.write(data)
+            if echo:
+                sizes = ", ".join(f"{suffix or 'raw'} {len(data)} B"
+                                  for suffix, data in variants.items())
+                echo(f"{hashed}: {sizes}")
+
+    _prune(dist, manifest)
+    with open(os.path.join(dist, MANIFEST), "w") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    return manifest
+
+
+def _prune(dist, manifest):
+    """Remove hashed files from earlier builds that no longer match a source."""
+    current = set(manifest.values())
+    for asset_dir in ASSET_DIRS:
+        folder = os.path.join(dist, asset_dir)
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            base = name[:-3] if name.endswith((".gz", ".br")) else name
+            if f"{asset_dir}/{base}" not in current:
+                os.remove(os.path.join(folder, name))
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST)) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(path):
+    """URL of the hashed copy of static/<path>, or the plain static URL without a build."""
+    hashed = current_app.extensions["assets_manifest"].get(path)
+    if hashed is None:
+        return url_for("static", filename=path)
+    return url_for("assets", filename=hashed)
+
+
+def serve_asset(filename):
+    """Serve a hashed asset, using the precompressed variant the client accepts."""
+    dist = os.path.join(current_app.static_folder, DIST_DIR)
+    accepted = request.accept_encodings
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if accepted[encoding] and os.path.isfile(os.path.join(dist, filename + suffix)):
+            response = send_from_directory(dist, filename + suffix, conditional=True)
+            # Keep the asset's own type instead of the one guessed from .gz/.br
+            response.mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(dist, filename, conditional=True)
+    response.headers["Cache-Control"] = IMMUTABLE
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def compress_response(response):
+    """Gzip dynamic text responses for clients that accept it."""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.content_encoding or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    if not request.accept_encodings["gzip"]:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(data, COMPRESS_LEVEL))
+    response.content_encoding = "gzip"
+    # The compressed body differs byte for byte, so the validator becomes weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_assets(app):
+    """Load the manifest once, expose asset_url() and register /assets and compression."""
+    # In debug mode files are served straight from static/ so edits show up without a build
+    manifest = {} if app.debug else load_manifest(app.static_folder)
+    app.extensions["assets_manifest"] = manifest
+    app.add_template_global(asset_url)
+    app.add_url_rule("/assets/<path:filename>", "assets", serve_asset)
+    app.after_request(compress_response)
+    app.cli.add_command(assets_cli)
+
+
+assets_cli = AppGroup("assets", help="Static asset build.")
+
+
+@assets_cli.command("build")
+def build_command():
+    """Fingerprint and precompress static/css and static/js into static/dist."""
+    manifest = build_assets(current_app.static_folder, echo=click.echo)
+    if _brotli() is None:
+        click.echo("brotli is not installed; only .gz variants were written.")
+    click.echo(f"Wrote {len(manifest)} assets to static/{DIST_DIR}/{MANIFEST}.")
@@ -0,0 +1,127 @@
+"""
+AI Tip Pool Check
+-----------------
+Runs ai_tips.StoryPool against the xAI stub (bench/xai_stub.py), started
+in-process on a free port for each scenario.
+
+    python -m bench.ai_pool
+
+Checks that simultaneous requests on an empty pool share one upstream call,
+that a slow upstream is cut off at the client timeout instead of holding
+the request, and that an expired tip is served when the upstream fails.
+Exits with status 1 when any check fails.
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from urllib.request import urlopen
+
+CONCURRENT_REQUESTS = 20
+
+
+def _stub(delay=0.0, fail_after=None):
+    """Start a stub server on a free port; returns (server, base_url)."""
+    from bench.xai_stub import make_handler
+
+    handler = make_handler(delay, False, fail_after)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def _calls(base_url):
+    """Upstream calls the stub has answered so far (GET /stats)."""
+    with urlopen(base_url[:-len("/v1")] + "/stats") as response:
+        return json.load(response)["count"]
+
+
+def _pool(base_url, **settings):
+    from ai_tips import StoryPool
+
+    return StoryPool(api_key="bench", base_url=base_url, **settings)
+
+
+def check_coalescing():
+    """Simultaneous misses wait for one shared upstream call."""
+    server, base_url = _stub(delay=0.3)
+    try:
+        pool = _pool(base_url, wait_seconds=3.0)
+        barrier = threading.Barrier(CONCURRENT_REQUESTS)
+        stories, errors = [], []
+
+        def viewer():
+            barrier.wait()
+            try:
+                stories.append(pool.get_story())
+            except Exception as exc:
+                errors.append(repr(exc))
+
+        threads = [threading.Thread(target=viewer) for _ in range(CONCURRENT_REQUESTS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        calls = _calls(base_url)
+    finally:
+        server.shutdown()
+    print(f"coalescing        {CONCURRENT_REQUESTS} requests  stories {len(stories)}"
+          f"  upstream calls {calls}  errors {len(errors)}")
+    return len(stories) == CONCURRENT_REQUESTS and calls == 1 and not errors
+
+
+def check_timeout():
+    """A slow upstream is abandoned at timeout_seconds, well before it would answer."""
+    from models import StoryUnavailableError
+
+    server, base_url = _stub(delay=2.0)
+    try:
+        pool = _pool(base_url, timeout_seconds=0.5, wait_seconds=3.0)
+        started = time.perf_counter()
+        try:
+            pool.get_story()
+            raised = False
+        except StoryUnavailableError:
+            raised = True
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+    print(f"timeout           upstream 2000 ms  client timeout 500 ms  unavailable {raised}"
+          f"  answered in {elapsed * 1000:.0f} ms")
+    return raised and elapsed < 1.5
+
+
+def check_stale_fallback():
+    """With every tip expired and the upstream failing, the last tip is still served."""
+    server, base_url = _stub(fail_after=1)
+    try:
+        pool = _pool(base_url, size=1, ttl_seconds=0.2, wait_seconds=2.0)
+        first = pool.get_story()
+        time.sleep(0.3)
+        try:
+            again = pool.get_story()
+        except Exception as exc:
+            again = repr(exc)
+        calls = _calls(base_url)
+    finally:
+        server.shutdown()
+    print(f"stale fallback    upstream calls {calls}  same tip served {again == first}")
+    return again == first and calls == 2
+
+
+def main(argv=None):
+    checks = {
+        "coalescing": check_coalescing,
+        "timeout": check_timeout,
+        "stale fallback": check_stale_fallback,
+    }
+    failures = [name for name, check in checks.items() if not check()]
+    for name in failures:
+        print(f"FAILED {name}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Concurrency Benchmark
+---------------------
+Starts gunicorn with each worker class against a seeded SQLite database and
+a slow AI stub, then measures how many concurrent clients one instance serves.
+
+    python -m bench.concurrency                                   # sync vs gevent, 10/50/200 clients
+    python -m bench.concurrency --worker-class gevent --clients 500
+
+For every client count N, N live viewers hold /scores/stream open while N
+page clients load /scores and /ai-story in a loop for --duration seconds.
+A viewer counts as served when its first snapshot arrives within --timeout;
+page requests that time out or fail are reported as errors.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ("/scores", "/ai-story")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with status {process.returncode}")
+        try:
+            urllib.request.urlopen(url, timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up in {timeout} s")
+
+
+def seed_database(path):
+    """Create the schema and a small tournament in a fresh SQLite file."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("FLASK_ENV", "production")
+    import app as app_module
+    from migrations import upgrade
+    from bench.seed import seed_tournament
+    from bench.run import PROFILES
+
+    with app_module.app.app_context():
+        upgrade()
+        seed_tournament(**PROFILES["small"])
+
+
+def _viewer(base_url, timeout, stop, connected):
+    """Hold a live feed open; count it once the first snapshot arrives."""
+    try:
+        response = urllib.request.urlopen(f"{base_url}/scores/stream", timeout=timeout)
+    except OSError:
+        return
+    try:
+        while not stop.is_set():
+            try:
+                line = response.readline()
+            except socket.timeout:
+                continue
+            if not line:
+                return
+            if line.startswith(b"data:"):
+                connected.append(1)
+                break
+        while not stop.is_set():
+            try:
+                if not response.readline():
+                    return
+            except socket.timeout:
+                continue
+    except OSError:
+        return
+    finally:
+        response.close()
+
+
+def _page_client(base_url, timeout, stop, timings, errors):
+    idx = 0
+    while not stop.is_set():
+        path = PAGES[idx % len(PAGES)]
+        idx += 1
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"{base_url}{path}", timeout=timeout) as response:
+                response.read()
+            timings.append((time.perf_counter() - started) * 1000)
+        except OSError:
+            errors.append(1)
+
+
+def measure(base_url, clients, duration, timeout):
+    """Run N viewers and N page clients against a running server."""
+    stop = threading.Event()
+    connected, timings, errors = [], [], []
+    viewers = [
+        threading.Thread(target=_viewer, args=(base_url, timeout, stop, connected), daemon=True)
+        for _ in range(clients)
+    ]
+    for thread in viewers:
+        thread.start()
+    pages = [
+        threading.Thread(target=_page_client, args=(base_url, timeout, stop, timings, errors),
+                         daemon=True)
+        for _ in range(clients)
+    ]
+    for thread in pages:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in pages + viewers:
+        thread.join(timeout + 1)
+
+    ordered = sorted(timings)
+    return {
+        "viewers": len(connected),
+        "requests": len(timings),
+        "errors": len(errors),
+        "rps": round(len(timings) / duration, 1),
+        "p50_ms": round(statistics.median(ordered), 1) if ordered else None,
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1], 1) if ordered else None,
+    }
+
+
+def run_server(worker_class, db_path, clients, args):
+    """Start a fresh server (live feeds pin sync workers until they time out) and measure it."""
+    port, stub_port = _free_port(), _free_port()
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "bench.xai_stub",
+         "--port", str(stub_port), "--delay", str(args.ai_delay)],
+        cwd=ROOT, stdout=subprocess.DEVNULL,
+    )
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(args.workers),
+        GUNICORN_WORKER_CLASS=worker_class,
+        # Serve feeds on sync workers too, to show what they cost there
+        LIVE_FEED_STREAM="1",
+        DATABASE_URL=f"sqlite:///{db_path}",
+        FLASK_ENV="production",
+        XAI_API_KEY="bench",
+        XAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1",
+        # Every /ai-story waits for the (shared) upstream call
+        AI_STORY_TTL_SECONDS="0",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(f"{base_url}/healthz", server)
+        return measure(base_url, clients, args.duration, args.timeout)
+    finally:
+        server.terminate()
+        stub.terminate()
+        server.wait()
+        stub.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare concurrent clients per gunicorn worker class.")
+    parser.add_argument("--worker-class", action="append", choices=["sync", "gevent"],
+                        help="worker class to test (repeatable, default: sync and gevent)")
+    parser.add_argument("--clients", action="append", type=int,
+                        help="concurrent viewers and page clients (repeatable, default: 10, 50, 200)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--ai-delay", type=float, default=0.5, help="seconds per AI upstream call")
+    args = parser.parse_args(argv)
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="golf-concurrency-"), "bench.db")
+    seed_database(db_path)
+
+    for worker_class in args.worker_class or ["sync", "gevent"]:
+        for clients in args.clients or [10, 50, 200]:
+            row = run_server(worker_class, db_path, clients, args)
+            print(f"{worker_class:6} {clients:4} clients  viewers served {row['viewers']:4}"
+                  f"  pages {row['requests']:6} ({row['rps']:7} req/s)  errors {row['errors']:5}"
+                  f"  p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
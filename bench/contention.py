@@ -0,0 +1,171 @@
+"""
+Score Entry Contention
+----------------------
+Many markers submit /round/<id>/scores and /finale at the same moment, each
+from a form loaded before anyone saved, and phones coming back online send
+their queued batches to /api/sync/scores, against a seeded SQLite database.
+
+    python -m bench.contention                  # 16 markers
+    python -m bench.contention --markers 64
+
+Checks that no saved score is lost, that only one of several markers
+changing the same score wins, that the first finale save locks one
+consistent set of bonuses and that a batch sent twice is applied once.
+Exits with status 1 when any check fails.
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+FORM_FIELD = re.compile(r'name="((?:score|finale_score|version)_\d+)"\s*value="([^"]*)"')
+
+
+def _form(client, url):
+    return dict(FORM_FIELD.findall(client.get(url).get_data(as_text=True)))
+
+
+def _race(app, posts):
+    """
+    POST every (url, data) from its own thread at once; returns statuses and the slowest time.
+    A dict with a "changes" key is sent as JSON.
+    """
+    barrier = threading.Barrier(len(posts))
+    statuses, timings, errors = [], [], []
+
+    def marker(url, data):
+        client = app.test_client()
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            if "changes" in data:
+                statuses.append(client.post(url, json=data).status_code)
+            else:
+                statuses.append(client.post(url, data=data).status_code)
+        except Exception as exc:
+            errors.append(repr(exc))
+        timings.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=marker, args=post) for post in posts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses, max(timings), errors
+
+
+def run(app, markers):
+    from database import db, FinaleScore, Player, RoundScore, SyncedChange
+    from finale_service import FinaleService
+    from migrations import upgrade
+    from bench.seed import seed_tournament
+
+    with app.app_context():
+        upgrade()
+        round_id = seed_tournament(players=markers, rounds=2, courses=1)[0]
+        player_ids = [player_id for (player_id,) in db.session.query(Player.id).order_by(Player.id)]
+    client = app.test_client()
+    url = f"/round/{round_id}/scores"
+    failures = []
+
+    # Every marker changes one player but submits the whole (stale) form
+    posts = []
+    for offset, player_id in enumerate(player_ids):
+        data = _form(client, url)
+        data[f"score_{player_id}"] = str(100 + offset)
+        posts.append((url, data))
+    statuses, slowest, errors = _race(app, posts)
+    with app.app_context():
+        stored = dict(db.session.query(RoundScore.player_id, RoundScore.score).filter(
+            RoundScore.round_id == round_id))
+    lost = [player_id for offset, player_id in enumerate(player_ids)
+            if stored[player_id] != 100 + offset]
+    print(f"separate players  {len(posts)} markers  lost {len(lost)}  errors {len(errors)}"
+          f"  slowest {slowest * 1000:.0f} ms")
+    if lost or errors:
+        failures.append("separate players")
+
+    # Every marker changes the same player from the same version
+    form = _form(client, url)
+    player_id = player_ids[0]
+    posts = [
+        (url, {f"score_{player_id}": str(200 + offset),
+               f"version_{player_id}": form[f"version_{player_id}"]})
+        for offset in range(markers)
+    ]
+    statuses, slowest, errors = _race(app, posts)
+    saved = statuses.count(302)
+    print(f"same player       {len(posts)} markers  saved {saved}  conflicts {statuses.count(200)}"
+          f"  errors {len(errors)}  slowest {slowest * 1000:.0f} ms")
+    if saved != 1 or errors:
+        failures.append("same player")
+
+    # First finale scores: the bonus lock must happen once, for everyone
+    posts = []
+    for offset, player_id in enumerate(player_ids):
+        data = _form(client, "/finale")
+        data[f"finale_score_{player_id}"] = str(30 + offset)
+        posts.append(("/finale", data))
+    statuses, slowest, errors = _race(app, posts)
+    with app.app_context():
+        rows = FinaleScore.query.all()
+        live_bonus = FinaleService().live_bonus_by_player_id
+    lost = [row.player_id for row in rows if row.score != 30 + player_ids.index(row.player_id)]
+    wrong_bonus = [row.player_id for row in rows if row.bonus != live_bonus.get(row.player_id, 0)]
+    print(f"finale            {len(posts)} markers  rows {len(rows)}  lost {len(lost)}"
+          f"  wrong bonus {len(wrong_bonus)}  errors {len(errors)}  slowest {slowest * 1000:.0f} ms")
+    if len(rows) != len(player_ids) or lost or wrong_bonus or errors:
+        failures.append("finale")
+
+    # Offline phones send their queued batch, and each sends it again after a lost response
+    round_id = round_id + 1
+    with app.app_context():
+        seen = dict(db.session.query(RoundScore.player_id, RoundScore.version).filter(
+            RoundScore.round_id == round_id))
+    posts = []
+    for offset, player_id in enumerate(player_ids):
+        batch = {"changes": [{"id": f"phone{offset}-{round_id}", "round_id": round_id,
+                              "player_id": player_id, "score": 100 + offset,
+                              "version": seen.get(player_id, 0)}]}
+        posts += [("/api/sync/scores", batch), ("/api/sync/scores", batch)]
+    statuses, slowest, errors = _race(app, posts)
+    with app.app_context():
+        stored = {
+            player_id: (score, version) for player_id, score, version in db.session.query(
+                RoundScore.player_id, RoundScore.score, RoundScore.version
+            ).filter(RoundScore.round_id == round_id)
+        }
+        recorded = SyncedChange.query.count()
+    # Applied exactly once: the new score, written over the version the phone saw
+    wrong = [player_id for offset, player_id in enumerate(player_ids)
+             if stored.get(player_id) != (100 + offset, seen.get(player_id, 0) + 1)]
+    failed = len(errors) + len(posts) - statuses.count(200)
+    print(f"offline sync      {len(posts)} batches  not applied once {len(wrong)}"
+          f"  outcomes {recorded}  errors {failed}  slowest {slowest * 1000:.0f} ms")
+    if wrong or recorded != len(player_ids) or failed:
+        failures.append("offline sync")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent score entry against one database.")
+    parser.add_argument("--markers", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="golf-contention-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("FLASK_ENV", "production")
+    import app as app_module
+
+    failures = run(app_module.app, args.markers)
+    for name in failures:
+        print(f"FAILED {name}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
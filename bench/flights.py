@@ -0,0 +1,63 @@
+"""
+Flight Size Check
+-----------------
+Plans flights for small and larger fields with flights.plan_rounds, with and
+without a fixed group, and checks every flight against the 3–4 rule.
+
+    python -m bench.flights
+
+Five players are one flight of five (they cannot be split into 3s and 4s);
+from six players up every flight must have 3 or 4, and every player must
+play exactly once per round. Exits with status 1 when any check fails.
+"""
+
+import sys
+
+ROUNDS = 3
+# The small fields named in the flight rules, then a spread of larger ones
+FIELDS = (5, 6, 7) + tuple(range(8, 41))
+EXPECTED_SIZES = {5: [5], 6: [3, 3], 7: [4, 3]}
+
+
+def check(players, fixed_groups=()):
+    """Plan ROUNDS rounds for `players` players; returns a list of problems."""
+    from flights import MAX_FLIGHT, MIN_FLIGHT, flight_sizes, plan_rounds
+
+    handicaps = {player_id: player_id * 1.5 for player_id in range(1, players + 1)}
+    problems = []
+    sizes = flight_sizes(players)
+    expected = EXPECTED_SIZES.get(players)
+    if expected is not None and sizes != expected:
+        problems.append(f"flight_sizes {sizes}, expected {expected}")
+    for number, flights in enumerate(plan_rounds(handicaps, ROUNDS, fixed_groups), start=1):
+        placed = sorted(player for flight in flights for player in flight)
+        if placed != sorted(handicaps):
+            problems.append(f"round {number}: players placed {len(placed)} of {players}")
+        allowed = (players,) if players < 2 * MIN_FLIGHT else range(MIN_FLIGHT, MAX_FLIGHT + 1)
+        wrong = [len(flight) for flight in flights if len(flight) not in allowed]
+        if wrong:
+            problems.append(f"round {number}: flights of {wrong}")
+        for group in fixed_groups:
+            if not any(set(group) <= set(flight) for flight in flights):
+                problems.append(f"round {number}: fixed group {list(group)} split")
+    return problems
+
+
+def main(argv=None):
+    failures = []
+    for players in FIELDS:
+        for fixed_groups in ((), ((1, 2),)):
+            problems = check(players, fixed_groups)
+            label = "fixed pair" if fixed_groups else "no groups"
+            if players in EXPECTED_SIZES or problems:
+                print(f"{players:>3} players  {label:<10}  {'; '.join(problems) or 'ok'}")
+            if problems:
+                failures.append(f"{players} players, {label}")
+    print(f"checked {len(FIELDS)} field sizes, {ROUNDS} rounds each")
+    for name in failures:
+        print(f"FAILED {name}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
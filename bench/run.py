@@ -0,0 +1,178 @@
+"""
+Route Benchmarks
+----------------
+Runs the hot routes through the Flask test client against a seeded SQLite
+database and reports latency percentiles and SQL statements per request.
+
+    python -m bench.run                              # small profile, compare with baseline
+    python -m bench.run --profile medium --profile large
+    python -m bench.run --update-baseline            # store current results as the baseline
+
+Exits with status 1 when a route issues more statements than the baseline,
+or its p95 latency exceeds the baseline by more than --latency-tolerance.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+PROFILES = {
+    "small": {"players": 20, "rounds": 5, "courses": 2},
+    "medium": {"players": 200, "rounds": 20, "courses": 5},
+    "large": {"players": 2000, "rounds": 50, "courses": 10},
+}
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _routes(round_id, player_ids):
+    """(name, method, url, form data) for every benchmarked route."""
+    score_form = {f"score_{player_id}": 30 for player_id in player_ids}
+    return [
+        ("scores", "GET", "/scores", None),
+        ("finale", "GET", "/finale", None),
+        ("finale_resultat", "GET", "/finale/resultat", None),
+        ("round_scores_get", "GET", f"/round/{round_id}/scores", None),
+        ("round_scores_post", "POST", f"/round/{round_id}/scores", score_form),
+        ("mottatte_slag", "GET", "/baner/mottatte-slag?course_id=1&tee_id=1", None),
+        ("rounds", "GET", "/rounds", None),
+    ]
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def run_profile(app_module, profile, iterations, warm_cache):
+    """Seed a fresh database for the profile and measure every route."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from database import db, Player
+    from migrations import upgrade
+    from http_cache import html_cache
+    from bench.seed import seed_tournament
+
+    app = app_module.app
+    with app.app_context():
+        db.drop_all()
+        upgrade()
+        round_ids = seed_tournament(**PROFILES[profile])
+        player_ids = [player_id for (player_id,) in db.session.query(Player.id)]
+
+    statements = []
+
+    def count_statement(*args):
+        statements.append(1)
+
+    event.listen(Engine, "before_cursor_execute", count_statement)
+    client = app.test_client()
+    results = {}
+    try:
+        for name, method, url, data in _routes(round_ids[0], player_ids):
+            # Warm-up request so template compilation is not measured
+            client.open(url, method=method, data=data)
+            timings = []
+            query_counts = []
+            for _ in range(iterations):
+                if not warm_cache:
+                    html_cache.clear()
+                statements.clear()
+                started = time.perf_counter()
+                response = client.open(url, method=method, data=data)
+                timings.append((time.perf_counter() - started) * 1000)
+                query_counts.append(len(statements))
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{method} {url} returned {response.status_code}")
+            results[name] = {
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(_percentile(timings, 95), 2),
+                "p99_ms": round(_percentile(timings, 99), 2),
+                "queries": max(query_counts),
+            }
+    finally:
+        event.remove(Engine, "before_cursor_execute", count_statement)
+    return results
+
+
+def compare(results, baseline, latency_tolerance):
+    """Return a list of regression messages against the stored baseline."""
+    regressions = []
+    for profile, routes in results.items():
+        for name, current in routes.items():
+            expected = baseline.get(profile, {}).get(name)
+            if not expected:
+                continue
+            if current["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{profile}/{name}: {current['queries']} queries (baseline {expected['queries']})"
+                )
+            limit = expected["p95_ms"] * (1 + latency_tolerance)
+            if current["p95_ms"] > limit:
+                regressions.append(
+                    f"{profile}/{name}: p95 {current['p95_ms']} ms (baseline {expected['p95_ms']} ms)"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot routes on seeded data.")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                        help="tournament size to seed (repeatable, default: small)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--latency-tolerance", type=float, default=1.0,
+                        help="allowed p95 slowdown as a fraction of the baseline (default 1.0 = 2x)")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="keep the rendered-page cache between iterations")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    # The app reads DATABASE_URL at import, so point it at a scratch SQLite file first
+    db_path = os.path.join(tempfile.mkdtemp(prefix="golf-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("FLASK_ENV", "production")
+    import app as app_module
+
+    profiles = args.profile or ["small"]
+    results = {
+        profile: run_profile(app_module, profile, args.iterations, args.warm_cache)
+        for profile in profiles
+    }
+
+    with open(args.output, "w") as handle:
+        json.dump(results, handle, indent=2, sort_keys=True)
+    for profile, routes in results.items():
+        for name, row in routes.items():
+            print(f"{profile:7} {name:18} p50 {row['p50_ms']:8.2f} ms  p95 {row['p95_ms']:8.2f} ms"
+                  f"  queries {row['queries']}")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as handle:
+                baseline = json.load(handle)
+        baseline.update(results)
+        with open(args.baseline, "w") as handle:
+            json.dump(baseline, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --update-baseline to create one.")
+        return 0
+    with open(args.baseline) as handle:
+        regressions = compare(results, json.load(handle), args.latency_tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
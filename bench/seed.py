@@ -0,0 +1,53 @@
+"""
+Benchmark Seed Data
+-------------------
+Deterministic synthetic tournaments: players, courses with several tees,
+rounds and a Stableford score for every player in every round.
+"""
+
+import random
+from sqlalchemy import insert
+from datetime import datetime, timedelta
+from database import db, Player, Round, RoundScore, GolfCourse, CourseTee
+
+FIRST_NAMES = ["Ola", "Kari", "Per", "Lise", "Nils", "Anne", "Olav", "Helge", "Tore", "Ingrid"]
+TEES = [("61", "Herre", 72.9, 131), ("55", "Herre", 70.6, 126), ("49", "Dame", 72.4, 128)]
+
+
+def seed_tournament(players=20, rounds=5, courses=3, seed=42):
+    """Fill an empty database with a synthetic tournament; returns the round ids."""
+    rng = random.Random(seed)
+
+    db.session.execute(insert(Player), [
+        {"name": f"{FIRST_NAMES[idx % len(FIRST_NAMES)]} {idx:04d}",
+         "handicap": round(rng.uniform(0, 36), 1)}
+        for idx in range(players)
+    ])
+
+    for course_idx in range(courses):
+        course = GolfCourse(name=f"Bane {course_idx + 1}", facility=f"Klubb {course_idx + 1}")
+        db.session.add(course)
+        db.session.flush()
+        db.session.add_all([
+            CourseTee(course_id=course.id, name=name, gender=gender, par=72,
+                      course_rating=rating, slope_rating=slope)
+            for name, gender, rating, slope in TEES
+        ])
+
+    start = datetime(2026, 5, 1)
+    db.session.execute(insert(Round), [
+        {"course_name": f"Bane {idx % courses + 1}", "play_date": start + timedelta(days=idx),
+         "tee_time": "10:00", "pick_up": "09:00"}
+        for idx in range(rounds)
+    ])
+    db.session.flush()
+
+    player_ids = [player_id for (player_id,) in db.session.query(Player.id)]
+    round_ids = [round_id for (round_id,) in db.session.query(Round.id).order_by(Round.id)]
+    db.session.execute(insert(RoundScore), [
+        {"round_id": round_id, "player_id": player_id, "score": rng.randint(18, 42)}
+        for round_id in round_ids
+        for player_id in player_ids
+    ])
+    db.session.commit()
+    return round_ids
@@ -0,0 +1,92 @@
+"""
+xAI API Stub
+------------
+Local stand-in for the chat completions API used by /ai-story.
+
+    python -m bench.xai_stub --port 8099 --delay 0.5
+    XAI_BASE_URL=http://127.0.0.1:8099/v1 XAI_API_KEY=test flask run
+
+--delay simulates a slow upstream, --fail answers every call with HTTP 503
+and --fail-after N answers N calls before failing the rest.
+Every call is counted so coalescing can be checked on GET /stats.
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TIPS = [
+    "Drop the second beer before the first tee, not after. 🍺",
+    "Try hitting the ball where you are aiming; it is a novel approach. 🎯",
+    "Your swing has range, just not in any direction. 🧭",
+]
+
+
+def make_handler(delay, fail, fail_after=None):
+    counter = itertools.count(1)
+    calls = {"count": 0}
+    lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send_json(200, calls)
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            with lock:
+                calls["count"] += 1
+                number = next(counter)
+            time.sleep(delay)
+            if fail or (fail_after is not None and number > fail_after) \
+                    or not self.path.endswith("/chat/completions"):
+                self._send_json(503, {"error": {"message": "stub unavailable"}})
+                return
+            self._send_json(200, {
+                "id": f"stub-{number}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": TIPS[number % len(TIPS)]},
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake chat completions API.")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds before each answer")
+    parser.add_argument("--fail", action="store_true", help="answer every call with 503")
+    parser.add_argument("--fail-after", type=int, metavar="N", help="answer 503 after N calls")
+    args = parser.parse_args(argv)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_handler(args.delay, args.fail, args.fail_after))
+    print(f"xAI stub listening on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
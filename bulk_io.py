@@ -0,0 +1,379 @@
+"""
+Bulk Import/Export
+------------------
+CSV and NDJSON (one JSON object per line) import of players, tees and
+scores, and a streaming export of the whole tournament.
+
+Input is parsed one row at a time and written in batches of BATCH_SIZE rows,
+each batch in its own transaction. Invalid rows are skipped and reported
+with their line number; the rest of the file is still imported. Exports are
+generators over yield_per queries, so no table is held in memory.
+
+    flask --app app data import players spillere.csv
+    flask --app app data import tees baner.ndjson
+    flask --app app data export > turnering.ndjson
+"""
+
+import codecs
+import csv
+import io
+import json
+import sys
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from database import db, Player, Round, RoundScore, FinaleScore, GolfCourse, CourseTee, Tournament
+from models import HandicapError, TEE_GENDERS
+from scoring import parse_hole_values, validate_tee_holes
+import handicaps
+import live_feed
+
+BATCH_SIZE = 500
+EXPORT_CHUNK = 500
+FORMATS = ("csv", "ndjson")
+
+# Columns that must be filled in, per import kind (tees may add hole_pars/stroke_indexes)
+REQUIRED_COLUMNS = {
+    "players": ("name",),
+    "tees": ("course_name", "facility", "tee_name", "gender", "par", "course_rating",
+             "slope_rating"),
+    "scores": ("round_id", "player_id", "score"),
+}
+
+# (record type, columns, select) per exported table, in dependency order; the types
+# are the import kinds where a table can be imported
+EXPORT_TABLES = (
+    ("tournaments", ("id", "name", "created_at", "closed_at"), lambda: select(
+        Tournament.id, Tournament.name, Tournament.created_at,
+        Tournament.closed_at).order_by(Tournament.id)),
+    ("players", ("id", "name", "handicap"), lambda: select(
+        Player.id, Player.name, Player.handicap).order_by(Player.id)),
+    ("courses", ("id", "name", "facility"), lambda: select(
+        GolfCourse.id, GolfCourse.name, GolfCourse.facility).order_by(GolfCourse.id)),
+    # Under the import's column names, so an exported tee file can be imported again
+    ("tees", ("id", "course_name", "facility", "tee_name", "gender", "par", "course_rating",
+              "slope_rating", "hole_pars", "stroke_indexes"), lambda: select(
+        CourseTee.id, GolfCourse.name, GolfCourse.facility, CourseTee.name, CourseTee.gender,
+        CourseTee.par, CourseTee.course_rating, CourseTee.slope_rating, CourseTee.hole_pars,
+        CourseTee.stroke_indexes).join(GolfCourse, CourseTee.course_id == GolfCourse.id)
+        .order_by(CourseTee.id)),
+    ("rounds", ("id", "tournament_id", "course_name", "play_date", "tee_time", "pick_up", "tee_id"),
+     lambda: select(
+        Round.id, Round.tournament_id, Round.course_name, Round.play_date, Round.tee_time,
+        Round.pick_up, Round.tee_id).order_by(Round.id)),
+    ("scores", ("round_id", "player_id", "score", "holes"), lambda: select(
+        RoundScore.round_id, RoundScore.player_id, RoundScore.score,
+        RoundScore.holes).order_by(RoundScore.round_id, RoundScore.player_id)),
+    ("finale", ("tournament_id", "player_id", "score", "bonus"), lambda: select(
+        FinaleScore.tournament_id, FinaleScore.player_id, FinaleScore.score,
+        FinaleScore.bonus).order_by(FinaleScore.tournament_id, FinaleScore.player_id)),
+)
+EXPORT_KINDS = tuple(kind for kind, _, _ in EXPORT_TABLES)
+
+
+class ImportResult:
+    """Rows written and (line, message) for every rejected row."""
+
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+
+    def to_dict(self):
+        return {
+            "imported": self.imported,
+            "errors": [{"line": line, "error": message} for line, message in sorted(self.errors)],
+        }
+
+
+def format_for(filename, default="csv"):
+    """Guess the input format from a file name."""
+    if filename and filename.lower().endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return default
+
+
+def iter_records(stream, fmt):
+    """Yield (line number, dict) from a text stream without reading it all."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None
+            continue
+        yield line_number, record if isinstance(record, dict) else None
+
+
+def _text(record, column):
+    value = record.get(column)
+    return "" if value is None else str(value).strip()
+
+
+def _number(record, column, kind):
+    value = _text(record, column)
+    try:
+        return kind(value)
+    except ValueError:
+        raise ValueError(f"Ugyldig tall i «{column}»: {value!r}.")
+
+
+def _holes(record, column):
+    value = record.get(column)
+    if isinstance(value, list):
+        value = ",".join(str(v) for v in value)
+    try:
+        return parse_hole_values(value)
+    except ValueError as exc:
+        raise ValueError(f"«{column}»: {exc}")
+
+
+def _validate(kind, record):
+    """Typed row for one record, or ValueError with the reason it was rejected."""
+    if record is None:
+        raise ValueError("Linjen er ikke et JSON-objekt.")
+    missing = [column for column in REQUIRED_COLUMNS[kind] if not _text(record, column)]
+    if missing:
+        raise ValueError(f"Mangler {', '.join(missing)}.")
+
+    if kind == "players":
+        handicap = _number(record, "handicap", float) if _text(record, "handicap") else 0.0
+        if handicap > Player.MAX_HANDICAP:
+            raise HandicapError(f"Handicap kan ikke være høyere enn {Player.MAX_HANDICAP}.")
+        return {"name": _text(record, "name"), "handicap": handicap}
+
+    if kind == "tees":
+        gender = _text(record, "gender")
+        if gender not in TEE_GENDERS:
+            raise ValueError(f"Ugyldig kjønn {gender!r}. Velg {' eller '.join(TEE_GENDERS)}.")
+        row = {
+            "course_name": _text(record, "course_name"),
+            "facility": _text(record, "facility"),
+            "name": _text(record, "tee_name"),
+            "gender": gender,
+            "par": _number(record, "par", int),
+            "course_rating": _number(record, "course_rating", float),
+            "slope_rating": _number(record, "slope_rating", int),
+            "hole_pars": _holes(record, "hole_pars"),
+            "stroke_indexes": _holes(record, "stroke_indexes"),
+        }
+        hole_error = validate_tee_holes(row["par"], row["hole_pars"], row["stroke_indexes"])
+        if hole_error:
+            raise ValueError(hole_error)
+        return row
+
+    score = _number(record, "score", int)
+    if score < 0:
+        raise ValueError("Score kan ikke være negativ.")
+    return {
+        "round_id": _number(record, "round_id", int),
+        "player_id": _number(record, "player_id", int),
+        "score": score,
+    }
+
+
+def _write_players(rows):
+    """Update the handicap of players found by name, add the others."""
+    existing = {
+        player.name: player
+        for player in Player.query.filter(Player.name.in_({row["name"] for _, row in rows}))
+    }
+    for _, row in rows:
+        player = existing.get(row["name"])
+        if player is None:
+            player = existing[row["name"]] = Player(name=row["name"], handicap=row["handicap"])
+            db.session.add(player)
+        else:
+            player.handicap = row["handicap"]
+    return len(rows), []
+
+
+def _write_tees(rows):
+    """Create courses and tees by name; a tee with the same name and gender is updated."""
+    courses = {
+        course.name: course
+        for course in GolfCourse.query.filter(
+            GolfCourse.name.in_({row["course_name"] for _, row in rows})
+        )
+    }
+    tees = {
+        (tee.course_id, tee.name, tee.gender): tee
+        for tee in CourseTee.query.filter(
+            CourseTee.course_id.in_([course.id for course in courses.values()])
+        )
+    }
+    tee_columns = ("par", "course_rating", "slope_rating", "hole_pars", "stroke_indexes")
+    for _, row in rows:
+        course = courses.get(row["course_name"])
+        if course is None:
+            course = courses[row["course_name"]] = GolfCourse(
+                name=row["course_name"], facility=row["facility"]
+            )
+            db.session.add(course)
+            db.session.flush()
+        course.facility = row["facility"]
+        key = (course.id, row["name"], row["gender"])
+        tee = tees.get(key)
+        if tee is None:
+            tee = tees[key] = CourseTee(course_id=course.id, name=row["name"], gender=row["gender"])
+            db.session.add(tee)
+        for column in tee_columns:
+            setattr(tee, column, row[column])
+    return len(rows), []
+
+
+def _write_scores(rows):
+    """Upsert scores per round; rows for unknown rounds or players are rejected."""
+    round_ids = {row["round_id"] for _, row in rows}
+    player_ids = {row["player_id"] for _, row in rows}
+    # round_id -> (tournament_id, closed); archived rounds are read-only
+    known_rounds = {
+        round_id: (tournament_id, closed)
+        for round_id, tournament_id, closed in db.session.query(
+            Round.id, Round.tournament_id, Tournament.closed_at.isnot(None)
+        ).outerjoin(Tournament, Round.tournament_id == Tournament.id).filter(Round.id.in_(round_ids))
+    }
+    known_players = {
+        player_id for (player_id,) in db.session.query(Player.id).filter(Player.id.in_(player_ids))
+    }
+    by_round = {}
+    errors = []
+    for line, row in rows:
+        if row["round_id"] not in known_rounds:
+            errors.append((line, f"Runde {row['round_id']} finnes ikke."))
+        elif known_rounds[row["round_id"]][1]:
+            errors.append((line, f"Runde {row['round_id']} hører til en avsluttet turnering."))
+        elif row["player_id"] not in known_players:
+            errors.append((line, f"Spiller {row['player_id']} finnes ikke."))
+        else:
+            by_round.setdefault(row["round_id"], {})[row["player_id"]] = row["score"]
+    for round_id, scores in by_round.items():
+        RoundScore.upsert_scores(round_id, scores, known_rounds[round_id][0])
+    written = sum(len(scores) for scores in by_round.values())
+    if written:
+        # One rebuild per batch instead of one update per row
+        handicaps.recompute({
+            player_id for scores in by_round.values() for player_id in scores
+        })
+    return written, errors
+
+
+WRITERS = {"players": _write_players, "tees": _write_tees, "scores": _write_scores}
+
+
+def import_records(kind, records, batch_size=BATCH_SIZE):
+    """Validate and write (line, record) pairs in batches; returns an ImportResult."""
+    write = WRITERS[kind]
+    result = ImportResult()
+    batch = []
+
+    def flush():
+        try:
+            written, errors = write(batch)
+            db.session.commit()
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            written = 0
+            errors = [(line, f"Lagring feilet: {exc.__class__.__name__}") for line, _ in batch]
+        result.imported += written
+        result.errors.extend(errors)
+        batch.clear()
+
+    for line, record in records:
+        try:
+            batch.append((line, _validate(kind, record)))
+        except ValueError as exc:
+            result.errors.append((line, str(exc)))
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    if kind in ("players", "scores") and result.imported:
+        live_feed.publish("scores", "finale")
+    return result
+
+
+def text_stream(binary):
+    """Decode an uploaded byte stream lazily (a UTF-8 BOM from Excel is dropped)."""
+    return codecs.getreader("utf-8-sig")(binary)
+
+
+def import_stream(kind, stream, fmt):
+    """Import a text stream in csv or ndjson format."""
+    if kind not in WRITERS:
+        raise ValueError(f"Ukjent type {kind!r}.")
+    if fmt not in FORMATS:
+        raise ValueError(f"Ukjent format {fmt!r}.")
+    return import_records(kind, iter_records(stream, fmt))
+
+
+def _rows(query):
+    return db.session.execute(query.execution_options(yield_per=EXPORT_CHUNK))
+
+
+def _json_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def export_ndjson(kinds=EXPORT_KINDS):
+    """Yield the tournament as NDJSON lines, one record per line, tagged with its type."""
+    for kind, columns, query in EXPORT_TABLES:
+        if kind not in kinds:
+            continue
+        for row in _rows(query()):
+            record = {"type": kind}
+            record.update((column, _json_value(value)) for column, value in zip(columns, row))
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def export_csv(kind):
+    """Yield one exported table as CSV, a header line first."""
+    columns, query = next((cols, q) for k, cols, q in EXPORT_TABLES if k == kind)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in _rows(query()):
+        writer.writerow([
+            ",".join(str(v or "") for v in value) if isinstance(value, list) else _json_value(value)
+            for value in row
+        ])
+        if buffer.tell() > 8192:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+data_cli = AppGroup("data", help="Bulk import and export.")
+
+
+@data_cli.command("import")
+@click.argument("kind", type=click.Choice(sorted(WRITERS)))
+@click.argument("source", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default=None,
+              help="Input format (default: from the file name, else csv).")
+def import_command(kind, source, fmt):
+    """Import players, tees or scores from a CSV or NDJSON file ('-' for stdin)."""
+    result = import_stream(kind, source, fmt or format_for(source.name))
+    for line, message in result.errors:
+        click.echo(f"line {line}: {message}", err=True)
+    click.echo(f"Imported {result.imported} rows, {len(result.errors)} rejected.")
+    if result.errors:
+        sys.exit(1)
+
+
+@data_cli.command("export")
+@click.option("--csv", "csv_kind", type=click.Choice(EXPORT_KINDS), default=None,
+              help="Export one table as CSV instead of the whole tournament as NDJSON.")
+def export_command(csv_kind):
+    """Write the tournament to stdout."""
+    chunks = export_csv(csv_kind) if csv_kind else export_ndjson()
+    for chunk in chunks:
+        click.echo(chunk, nl=False)
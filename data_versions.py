@@ -0,0 +1,104 @@
+"""
+Data Versions
+-------------
+Tracks which tables a transaction writes to and bumps their counter in
+data_versions when it commits. Read-only pages use the counters to decide
+whether anything they show has changed.
+"""
+
+from datetime import datetime
+from sqlalchemy import event, update
+from database import db, DataVersion
+
+VERSIONS_TABLE = DataVersion.__tablename__
+
+
+def _changed_tables(session):
+    return session.info.setdefault("changed_tables", set())
+
+
+def _cascaded_tables(table):
+    """Tables the database deletes rows from along with `table` (ON DELETE CASCADE)."""
+    return {
+        other.name
+        for other in table.metadata.sorted_tables
+        for fk in other.foreign_keys
+        if fk.ondelete == "CASCADE" and fk.column.table is table
+    }
+
+
+@event.listens_for(db.session, "before_flush")
+def _track_flush(session, flush_context, instances):
+    """Record tables of new, modified and deleted ORM objects."""
+    changed = _changed_tables(session)
+    for obj in session.new:
+        changed.add(obj.__table__.name)
+    for obj in session.deleted:
+        changed.add(obj.__table__.name)
+        changed.update(_cascaded_tables(obj.__table__))
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            changed.add(obj.__table__.name)
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _track_bulk_statement(orm_execute_state):
+    """Record tables written by bulk INSERT/UPDATE/DELETE statements (upserts, query.delete())."""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update
+            or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name != VERSIONS_TABLE:
+        changed = _changed_tables(orm_execute_state.session)
+        changed.add(table.name)
+        if orm_execute_state.is_delete:
+            changed.update(_cascaded_tables(table))
+
+
+@event.listens_for(db.session, "before_commit")
+def _bump_versions(session):
+    """Bump the counter of every table written in this transaction."""
+    # before_commit runs ahead of the final flush, so flush now to see pending changes
+    session.flush()
+    changed = sorted(session.info.pop("changed_tables", set()) - {VERSIONS_TABLE})
+    if not changed:
+        return
+
+    now = datetime.utcnow()
+    result = session.execute(
+        update(DataVersion)
+        .where(DataVersion.table_name.in_(changed))
+        .values(version=DataVersion.version + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount < len(changed):
+        existing = {
+            name for (name,) in session.query(DataVersion.table_name).filter(
+                DataVersion.table_name.in_(changed)
+            )
+        }
+        # New counters start at the current time in ms, so a dropped and recreated
+        # table never repeats a version that an HTML cache may still hold
+        start = int(now.timestamp() * 1000)
+        session.add_all([
+            DataVersion(table_name=name, version=start, updated_at=now)
+            for name in changed if name not in existing
+        ])
+        session.flush()
+
+
+@event.listens_for(db.session, "after_commit")
+@event.listens_for(db.session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("changed_tables", None)
+
+
+def get_versions(tables=None):
+    """Return {table_name: (version, updated_at)} in one query; unknown tables are (0, None)."""
+    query = db.session.query(DataVersion.table_name, DataVersion.version, DataVersion.updated_at)
+    if tables:
+        query = query.filter(DataVersion.table_name.in_(tables))
+    versions = {name: (version, updated_at) for name, version, updated_at in query}
+    for name in tables or ():
+        versions.setdefault(name, (0, None))
+    return versions
@@ -1,17 +1,244 @@
+import sqlite3
+import time
+from flask import current_app, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import desc
-from typing import List, Optional
+from sqlalchemy import LargeBinary, SmallInteger, and_, desc, event, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.types import TypeDecorator
+from typing import List, Optional, Sequence
 from datetime import datetime
-from models import HandicapError
+from models import HandicapError, LazyLoadError
+from db_routing import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+HOLES = 18
+
+# Loader strategies for the eager variants of get_all/get_by_id
+LOADER_STRATEGIES = {"selectin": selectinload, "joined": joinedload}
+
+# commit_with_retry: attempts per unit of work and the pause before the next one
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 0.05
+
+
+def eager_options(model, eager: Sequence[str], strategy: str = "selectin"):
+    """Loader options that fetch the named relationships up front."""
+    loader = LOADER_STRATEGIES[strategy]
+    return [loader(getattr(model, name)) for name in eager]
+
+
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite only enforces foreign keys (and ON DELETE CASCADE) when asked per connection."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+@event.listens_for(db.session, "do_orm_execute")
+def _guard_lazy_loads(orm_execute_state):
+    """In debug mode, fail GET requests that trigger a lazy relationship load."""
+    if not orm_execute_state.is_select or not has_request_context():
+        return
+    if orm_execute_state.lazy_loaded_from is None:
+        return
+    if request.method not in ("GET", "HEAD"):
+        # Writes may lazy-load children for cascades
+        return
+    if not (current_app.debug or current_app.config.get("LAZY_LOAD_GUARD")):
+        return
+    state = orm_execute_state.lazy_loaded_from
+    raise LazyLoadError(
+        f"Lazy load from {state.class_.__name__} in {request.endpoint}; "
+        f"use an eager get_all/get_by_id variant"
+    )
+
+
+def upsert_rows(model, rows, index_elements, update_columns, unless_set=None, versioned=False):
+    """
+    Insert rows, updating update_columns where index_elements already exist.
+    Uses a single INSERT ... ON CONFLICT statement on Postgres and SQLite.
+    Existing rows where the column named by unless_set is not NULL are left as they are;
+    with no update_columns, existing rows are not touched at all.
+
+    versioned: the model's `version` column counts the writes to each row. If the
+    rows carry a "version" (the one the writer read, 0 for a row it did not see),
+    a row is only written while its stored version still matches and the new
+    values differ (compare-and-set), and the keys of the rows written are
+    returned; without it every write bumps the version.
+    """
+    if not rows:
+        return set()
+    checked = versioned and "version" in rows[0]
+    if checked:
+        rows = [dict(row, version=row["version"] + 1) for row in rows]
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(model.__table__).values(rows)
+        if not update_columns:
+            db.session.execute(stmt.on_conflict_do_nothing(index_elements=index_elements))
+            return None
+        set_ = {column: getattr(stmt.excluded, column) for column in update_columns}
+        conditions = [getattr(model, unless_set).is_(None)] if unless_set else []
+        if checked:
+            set_["version"] = stmt.excluded.version
+            conditions.append(model.version == stmt.excluded.version - 1)
+            # Unchanged fields of a stale form must not bump the version under someone else
+            conditions.append(or_(*(
+                getattr(model, column).is_distinct_from(stmt.excluded[column])
+                for column in update_columns
+            )))
+        elif versioned:
+            set_["version"] = model.version + 1
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_=set_,
+            where=and_(*conditions) if conditions else None,
+        )
+        if not checked:
+            db.session.execute(stmt)
+            return None
+        stmt = stmt.returning(*(model.__table__.c[column] for column in index_elements))
+        return {tuple(row) for row in db.session.execute(stmt)}
+
+    # Generic fallback: one SELECT for existing rows, then ORM add/update
+    key_columns = [getattr(model, column) for column in index_elements]
+    keys = [tuple(row[column] for column in index_elements) for row in rows]
+    existing = {
+        tuple(getattr(obj, column) for column in index_elements): obj
+        for obj in model.query.filter(db.tuple_(*key_columns).in_(keys)).all()
+    }
+    written = set()
+    for key, row in zip(keys, rows):
+        obj = existing.get(key)
+        if obj and (not update_columns or unless_set and getattr(obj, unless_set) is not None):
+            continue
+        if obj and checked and (obj.version != row["version"] - 1 or all(
+                getattr(obj, column) == row[column] for column in update_columns)):
+            continue
+        if obj:
+            for column in update_columns:
+                setattr(obj, column, row[column])
+            if versioned:
+                obj.version = row["version"] if checked else obj.version + 1
+        else:
+            db.session.add(model(**row))
+        written.add(key)
+    return written if checked else None
+
+
+def commit_with_retry(work, attempts=RETRY_ATTEMPTS):
+    """
+    Run work() and commit, returning its result. A write conflict (a locked
+    SQLite file, a Postgres serialization failure or deadlock, a stale ORM
+    version) rolls back and runs work() again, at most `attempts` times.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            result = work()
+            db.session.commit()
+            return result
+        except (OperationalError, StaleDataError):
+            db.session.rollback()
+            if attempt == attempts:
+                raise
+            time.sleep(RETRY_BACKOFF_SECONDS * attempt)
+
+
+class PackedHoles(TypeDecorator):
+    """
+    One small integer per hole, 18 per row: SMALLINT[] on Postgres and
+    18 bytes elsewhere (0 stored for an empty hole).
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.ARRAY(SmallInteger))
+        return dialect.type_descriptor(LargeBinary(HOLES))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        values = list(value)
+        if len(values) != HOLES:
+            raise ValueError(f"Expected {HOLES} holes, got {len(values)}")
+        if dialect.name == "postgresql":
+            return values
+        return bytes(v or 0 for v in values)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == "postgresql":
+            return list(value)
+        return [v or None for v in bytes(value)]
+
+
+class Tournament(db.Model):
+    """One event; rounds, scores and finale rows belong to exactly one."""
+    __tablename__ = 'tournaments'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # NULL while the tournament is active; closed tournaments are read-only
+    closed_at = db.Column(db.DateTime)
+
+    results = db.relationship(
+        'TournamentResult',
+        lazy=True,
+        cascade='all',
+        passive_deletes=True,
+        order_by=lambda: (TournamentResult.finale_place.is_(None), TournamentResult.finale_place,
+                          TournamentResult.oom_rank),
+    )
+
+    @classmethod
+    def get_active(cls) -> Optional['Tournament']:
+        return cls.query.filter(cls.closed_at.is_(None)).order_by(cls.id.desc()).first()
+
+    @classmethod
+    def get_all(cls, eager=(), strategy="selectin"):
+        """Return all tournaments, newest first."""
+        return cls.query.options(*eager_options(cls, eager, strategy)).order_by(cls.id.desc()).all()
+
+    @classmethod
+    def get_by_id(cls, tournament_id, eager=(), strategy="selectin"):
+        return cls.query.options(*eager_options(cls, eager, strategy)).get(tournament_id)
+
+
+def active_tournament_id():
+    """Scalar subquery for the active tournament, so scoping a query costs no extra statement."""
+    return (
+        select(Tournament.id)
+        .where(Tournament.closed_at.is_(None))
+        .order_by(Tournament.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def _tournament_fk(**kwargs):
+    """tournament_id column; new rows default to the active tournament."""
+    return db.Column(db.Integer, db.ForeignKey('tournaments.id', ondelete='CASCADE'),
+                     default=active_tournament_id(), **kwargs)
 
-db = SQLAlchemy()
 
 class Player(db.Model):
     """Player model for PostgreSQL database."""
     __tablename__ = 'players'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(80), nullable=False)
+    name = db.Column(db.String(80), nullable=False, index=True)
     handicap = db.Column(db.Float, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     MAX_HANDICAP = 54.0  # Updated from 36.0
@@ -24,17 +251,18 @@ class Player(db.Model):
         self.handicap = handicap
 
     @classmethod
-    def get_all(cls) -> List['Player']:
-        """Return all players sorted by name."""
-        return cls.query.order_by(cls.name).all()
+    def get_all(cls, eager: Sequence[str] = (), strategy: str = "selectin") -> List['Player']:
+        """Return all players sorted by name, optionally with relationships eager-loaded."""
+        return cls.query.options(*eager_options(cls, eager, strategy)).order_by(cls.name).all()
 
     @classmethod
-    def get_by_id(cls, player_id: int) -> Optional['Player']:
+    def get_by_id(cls, player_id: int, eager: Sequence[str] = (),
+                  strategy: str = "selectin") -> Optional['Player']:
         """Find player by ID."""
-        return cls.query.get(player_id)
+        return cls.query.options(*eager_options(cls, eager, strategy)).get(player_id)
 
     def delete(self):
-        """Delete player from database."""
+        """Delete player from database; scores go with it (ON DELETE CASCADE)."""
         db.session.delete(self)
         db.session.commit()
 
@@ -44,62 +272,227 @@ class Round(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     course_name = db.Column(db.String(100), nullable=False)
-    play_date = db.Column(db.DateTime, nullable=False)
+    play_date = db.Column(db.DateTime, nullable=False, index=True)
     tee_time = db.Column(db.String(5), nullable=False)
     pick_up = db.Column(db.String(12))  # New field
+    # Tee played, for hole-by-hole scoring; optional
+    tee_id = db.Column(db.Integer, db.ForeignKey('course_tees.id', ondelete='SET NULL'), index=True)
+    tournament_id = _tournament_fk(index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    tee = db.relationship('CourseTee')
+    tournament = db.relationship('Tournament')
+
+    @property
+    def is_closed(self):
+        """Rounds of a closed tournament can no longer be edited."""
+        return self.tournament is not None and self.tournament.closed_at is not None
+
     @classmethod
-    def get_all(cls):
-        """Return all rounds sorted by date ascending."""
-        return cls.query.order_by(cls.play_date.asc()).all()
+    def get_all(cls, eager=(), strategy="selectin"):
+        """Return the active tournament's rounds sorted by date ascending."""
+        return (
+            cls.query.options(*eager_options(cls, eager, strategy))
+            .filter(cls.tournament_id == active_tournament_id())
+            .order_by(cls.play_date.asc())
+            .all()
+        )
 
     @classmethod
-    def get_by_id(cls, round_id):
+    def get_by_id(cls, round_id, eager=(), strategy="selectin"):
         """Find round by ID."""
-        return cls.query.get(round_id)
+        return cls.query.options(*eager_options(cls, eager, strategy)).get(round_id)
 
     def delete(self):
-        """Delete round and its scores from database."""
-        RoundScore.query.filter_by(round_id=self.id).delete()
+        """Delete round from database; its scores go with it (ON DELETE CASCADE)."""
         db.session.delete(self)
         db.session.commit()
     
-    def get_player_score(self, player_id):
-        """Get score for a specific player."""
-        score = RoundScore.query.filter_by(
-            round_id=self.id, 
-            player_id=player_id
-        ).first()
-        return score.score if score else None
+    def get_score_map(self):
+        """Return {player_id: score} for all scores in this round."""
+        rows = db.session.query(RoundScore.player_id, RoundScore.score).filter(
+            RoundScore.round_id == self.id
+        )
+        return {player_id: score for player_id, score in rows}
+
+    def get_cards(self):
+        """Return {player_id: (score, holes, version)} for all scores in this round."""
+        rows = db.session.query(
+            RoundScore.player_id, RoundScore.score, RoundScore.holes, RoundScore.version
+        ).filter(RoundScore.round_id == self.id)
+        return {player_id: (score, holes, version) for player_id, score, holes, version in rows}
 
 class RoundScore(db.Model):
     """Model for storing player scores for each round."""
     __tablename__ = 'round_scores'
+    __table_args__ = (
+        db.UniqueConstraint('round_id', 'player_id', name='uq_round_scores_round_player'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    round_id = db.Column(db.Integer, db.ForeignKey('rounds.id'), nullable=False)
-    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
+    # round_id is covered by the leading column of uq_round_scores_round_player
+    round_id = db.Column(db.Integer, db.ForeignKey('rounds.id', ondelete='CASCADE'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id', ondelete='CASCADE'),
+                          nullable=False, index=True)
     score = db.Column(db.Integer)
+    # Gross strokes per hole (None = not played); score is then the Stableford total
+    holes = db.Column(PackedHoles)
+    # Copied from the round, so standings filter on one indexed column without a join
+    tournament_id = _tournament_fk(index=True)
+    # Bumped by every write; forms send it back so a concurrent change is not overwritten
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    # Relationships
-    round = db.relationship('Round', backref=db.backref('scores', lazy=True))
-    player = db.relationship('Player', backref=db.backref('scores', lazy=True))
+    # Relationships; the database deletes scores with their round or player
+    round = db.relationship('Round', backref=db.backref(
+        'scores', lazy=True, cascade='all', passive_deletes=True))
+    player = db.relationship('Player', backref=db.backref(
+        'scores', lazy=True, cascade='all', passive_deletes=True))
+
+    @staticmethod
+    def _round_tournament(round_id, tournament_id):
+        """The round's tournament, looked up inside the INSERT when the caller does not know it."""
+        if tournament_id is not None:
+            return tournament_id
+        return select(Round.tournament_id).where(Round.id == round_id).scalar_subquery()
+
+    @classmethod
+    def _conflicts(cls, round_id, written, values, column):
+        """{player_id: stored value} for rows not written because they now hold something else."""
+        missing = [player_id for player_id in values if (round_id, player_id) not in written]
+        if not missing:
+            return {}
+        rows = db.session.query(cls.player_id, getattr(cls, column)).filter(
+            cls.round_id == round_id, cls.player_id.in_(missing)
+        )
+        return {player_id: stored for player_id, stored in rows if stored != values[player_id]}
+
+    @classmethod
+    def upsert_scores(cls, round_id, scores_by_player_id, tournament_id=None, versions=None):
+        """
+        Save {player_id: score} for a round in one batched upsert.
+
+        versions maps player_id to the row version the writer saw (0 for none);
+        scores changed by someone else since then are kept and returned as
+        {player_id: stored score}.
+        """
+        tournament_id = cls._round_tournament(round_id, tournament_id)
+        rows = [
+            {"round_id": round_id, "player_id": player_id, "score": score,
+             "tournament_id": tournament_id}
+            for player_id, score in scores_by_player_id.items()
+        ]
+        if versions is not None:
+            for row in rows:
+                row["version"] = versions.get(row["player_id"], 0)
+        # Scores entered hole by hole are kept; their total comes from the holes
+        written = upsert_rows(cls, rows, ["round_id", "player_id"], ["score"], unless_set="holes",
+                              versioned=True)
+        if versions is None:
+            return {}
+        return cls._conflicts(round_id, written, scores_by_player_id, "score")
+
+    @classmethod
+    def upsert_cards(cls, round_id, results, tournament_id=None, versions=None):
+        """
+        Save {player_id: (holes, stableford_points)} for a round in one batched upsert.
+
+        With versions, as for upsert_scores; conflicts map player_id to the stored holes.
+        """
+        tournament_id = cls._round_tournament(round_id, tournament_id)
+        rows = [
+            {"round_id": round_id, "player_id": player_id, "holes": holes, "score": points,
+             "tournament_id": tournament_id}
+            for player_id, (holes, points) in results.items()
+        ]
+        if versions is not None:
+            for row in rows:
+                row["version"] = versions.get(row["player_id"], 0)
+        written = upsert_rows(cls, rows, ["round_id", "player_id"], ["holes", "score"],
+                              versioned=True)
+        if versions is None:
+            return {}
+        holes = {player_id: holes for player_id, (holes, _) in results.items()}
+        return cls._conflicts(round_id, written, holes, "holes")
 
 
 class FinaleScore(db.Model):
     """Model for storing one finale score per player."""
     __tablename__ = 'finale_scores'
+    __table_args__ = (
+        db.UniqueConstraint('tournament_id', 'player_id', name='uq_finale_scores_tournament_player'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False, unique=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id', ondelete='CASCADE'),
+                          nullable=False)
     bonus = db.Column(db.Integer, default=0)
     score = db.Column(db.Integer)
+    # Leading column of uq_finale_scores_tournament_player
+    tournament_id = _tournament_fk()
+    # 0 while the row only holds the locked bonus; bumped by every score written
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
-    player = db.relationship('Player', backref=db.backref('finale_score', uselist=False))
+    player = db.relationship('Player', backref=db.backref(
+        'finale_scores', lazy=True, cascade='all', passive_deletes=True))
+
+    @classmethod
+    def get_active(cls):
+        """Finale rows of the active tournament."""
+        return cls.query.filter(cls.tournament_id == active_tournament_id()).all()
+
+
+class TournamentResult(db.Model):
+    """Read-only summary of one player in a closed tournament (see tournaments.py)."""
+    __tablename__ = 'tournament_results'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id', ondelete='CASCADE'),
+                              nullable=False, index=True)
+    # Kept when the player is deleted later; the name is stored with the result
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id', ondelete='SET NULL'))
+    name = db.Column(db.String(80), nullable=False)
+    oom_rank = db.Column(db.Integer)
+    oom_total = db.Column(db.Integer, nullable=False, default=0)
+    oom_rounds = db.Column(db.Integer, nullable=False, default=0)
+    bonus = db.Column(db.Integer, nullable=False, default=0)
+    finale_score = db.Column(db.Integer)
+    finale_place = db.Column(db.Integer)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class FlightAssignment(db.Model):
+    """A player's flight in one round (see flights.py)."""
+    __tablename__ = 'flight_assignments'
+    __table_args__ = (
+        db.UniqueConstraint('round_id', 'player_id', name='uq_flight_assignments_round_player'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # round_id is covered by the leading column of uq_flight_assignments_round_player
+    round_id = db.Column(db.Integer, db.ForeignKey('rounds.id', ondelete='CASCADE'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id', ondelete='CASCADE'),
+                          nullable=False, index=True)
+    # 1 starts at the round's tee time, the next ones at fixed intervals
+    flight = db.Column(db.Integer, nullable=False)
+
+
+class SyncedChange(db.Model):
+    """Outcome of one offline score change, keyed by the id the client gave it (see score_sync.py)."""
+    __tablename__ = 'synced_changes'
+
+    client_id = db.Column(db.String(64), primary_key=True)
+    round_id = db.Column(db.Integer)
+    player_id = db.Column(db.Integer)
+    # applied, conflict or rejected; score and version are what the row held afterwards
+    status = db.Column(db.String(10), nullable=False)
+    score = db.Column(db.Integer)
+    version = db.Column(db.Integer)
+    error = db.Column(db.String(200))
+    # Pruned after score_sync.RETENTION
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
 
 
 class GolfCourse(db.Model):
@@ -116,16 +509,21 @@ class GolfCourse(db.Model):
         backref='course',
         lazy=True,
         cascade='all, delete-orphan',
+        passive_deletes=True,
         order_by=lambda: desc(CourseTee.course_rating),
     )
 
     @classmethod
-    def get_all(cls):
-        return cls.query.order_by(cls.name.asc()).all()
+    def get_all(cls, eager=(), strategy="selectin"):
+        return (
+            cls.query.options(*eager_options(cls, eager, strategy))
+            .order_by(cls.name.asc())
+            .all()
+        )
 
     @classmethod
-    def get_by_id(cls, course_id):
-        return cls.query.get(course_id)
+    def get_by_id(cls, course_id, eager=(), strategy="selectin"):
+        return cls.query.options(*eager_options(cls, eager, strategy)).get(course_id)
 
 
 class CourseTee(db.Model):
@@ -133,10 +531,69 @@ class CourseTee(db.Model):
     __tablename__ = 'course_tees'
 
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('golf_courses.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('golf_courses.id', ondelete='CASCADE'),
+                          nullable=False, index=True)
     name = db.Column(db.String(50), nullable=False)
     gender = db.Column(db.String(10), nullable=False, default='Herre')
     par = db.Column(db.Integer, nullable=False)
     course_rating = db.Column(db.Float, nullable=False)
     slope_rating = db.Column(db.Integer, nullable=False)
+    # Par and stroke index of holes 1-18; both set or both empty
+    hole_pars = db.Column(PackedHoles)
+    stroke_indexes = db.Column(PackedHoles)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def has_holes(self):
+        return self.hole_pars is not None and self.stroke_indexes is not None
+
+    @classmethod
+    def get_all_with_course(cls):
+        """All tees with their course loaded, by course name and then longest tee first."""
+        return (
+            cls.query.join(GolfCourse)
+            .options(contains_eager(cls.course))
+            .order_by(GolfCourse.name.asc(), cls.course_rating.desc())
+            .all()
+        )
+
+
+class PlayerHandicap(db.Model):
+    """WHS handicap index per player, kept up to date by handicaps.py."""
+    __tablename__ = 'player_handicaps'
+
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id', ondelete='CASCADE'),
+                          primary_key=True, autoincrement=False)
+    # None until the player has three rounds on a rated tee
+    handicap_index = db.Column(db.Float)
+    # Index the first round was played off (the hand-entered handicap)
+    base_index = db.Column(db.Float, nullable=False, default=0)
+    # Last 20 rounds, oldest first: [round_id, "YYYY-MM-DD", differential, points]
+    differentials = db.Column(db.JSON, nullable=False, default=list)
+    rounds_counted = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Concurrent updates of one player fail with StaleDataError instead of losing a round
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    player = db.relationship('Player', backref=db.backref(
+        'handicap_record', uselist=False, cascade='all', passive_deletes=True))
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+class DataVersion(db.Model):
+    """Write counter per table, bumped on every commit that changes the table."""
+    __tablename__ = 'data_versions'
+
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class SchemaVersion(db.Model):
+    """One row per applied migration (see migrations.py)."""
+    __tablename__ = 'schema_version'
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,113 @@
+"""
+Database Routing
+----------------
+Engine pool settings sized per gunicorn worker, and an optional read replica.
+
+With READ_DATABASE_URL set, SELECTs from routes marked @read_only go to the
+"read" bind. Any write request sets a short-lived cookie that keeps the
+writer's own reads on the primary, so they always see what they just saved.
+"""
+
+import os
+import time
+from functools import wraps
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+READ_BIND = "read"
+STICKY_COOKIE = "golf_primary_until"
+DEFAULT_STICKY_SECONDS = 10
+# Connections one app instance may hold across all workers (Render's free Postgres allows ~97)
+DEFAULT_MAX_CONNECTIONS = 40
+
+
+def engine_options(url):
+    """
+    Pool settings for one engine in one worker process.
+
+    Each worker needs a connection per thread (or per greenlet under gevent)
+    plus one spare; the total over all workers is kept below
+    DB_MAX_CONNECTIONS unless DB_POOL_SIZE is set. Greenlets beyond the pool
+    wait up to DB_POOL_TIMEOUT seconds for a connection.
+    """
+    options = {
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") == "1",
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "300")),
+    }
+    if not url or url.startswith("sqlite"):
+        # SQLite picks its own pool class; size limits do not apply
+        return options
+
+    workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+    if os.environ.get("GUNICORN_WORKER_CLASS") == "gevent":
+        threads = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "100"))
+    else:
+        threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+    max_overflow = int(os.environ.get("DB_MAX_OVERFLOW", "2"))
+    budget = int(os.environ.get("DB_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)) // max(workers, 1)
+    default_size = max(1, min(threads + 1, budget - max_overflow))
+    options.update(
+        pool_size=int(os.environ.get("DB_POOL_SIZE", default_size)),
+        max_overflow=max_overflow,
+        pool_timeout=int(os.environ.get("DB_POOL_TIMEOUT", "10")),
+    )
+    return options
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs of read-only requests to the read bind when one exists."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause):
+        if not isinstance(clause, Select) or self._flushing:
+            return False
+        if not has_request_context() or not g.get("use_read_replica"):
+            return False
+        # Never read around changes this session has not committed yet
+        return not (self.new or self.dirty or self.deleted)
+
+
+def _is_sticky():
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_only(view):
+    """Serve the view's queries from the read replica, unless this client wrote recently."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_read_replica = not _is_sticky()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_db_routing(app):
+    """Set engine options and the read bind from the environment; call before db.init_app."""
+    primary_url = app.config.get("SQLALCHEMY_DATABASE_URI")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(primary_url)
+
+    read_url = os.environ.get("READ_DATABASE_URL")
+    if not read_url:
+        return
+    app.config["SQLALCHEMY_BINDS"] = {
+        READ_BIND: {"url": read_url, **engine_options(read_url)},
+    }
+    sticky_seconds = int(os.environ.get("READ_STICKY_SECONDS", DEFAULT_STICKY_SECONDS))
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 500:
+            response.set_cookie(
+                STICKY_COOKIE, str(int(time.time()) + sticky_seconds),
+                max_age=sticky_seconds, httponly=True, samesite="Lax",
+            )
+        return response
@@ -0,0 +1,133 @@
+"""
+Finale Service
+--------------
+Request-scoped snapshot of everything the finale pages need: players,
+OOM ranks and bonuses, and stored finale rows, each loaded once.
+"""
+
+from database import Player, FinaleScore, Tournament, upsert_rows
+from standings import get_oom_standings, oom_bonus
+
+
+class FinaleError(ValueError):
+    """Raised when finale scores cannot be saved; nothing is written."""
+
+
+class FinaleService:
+    """Load finale data once per request and serve /finale and /finale/resultat from it."""
+
+    def __init__(self, players=None):
+        self.players = players if players is not None else Player.get_all()
+        self.live_bonus_by_player_id, self.rank_by_player_id = oom_bonus(
+            get_oom_standings(), self.players
+        )
+        self.stored_by_player_id = {row.player_id: row for row in FinaleScore.get_active()}
+
+    @property
+    def has_started(self):
+        """True once at least one finale score has been saved."""
+        return any(row.score is not None for row in self.stored_by_player_id.values())
+
+    def bonus_for(self, player_id):
+        """Locked bonus once the finale has started, live OOM bonus before that."""
+        stored = self.stored_by_player_id.get(player_id)
+        if self.has_started and stored:
+            return stored.bonus
+        return self.live_bonus_by_player_id.get(player_id, 0)
+
+    def rows(self):
+        """Build finale rows; bonus follows live OOM until the first finale score is saved."""
+        finale_rows = []
+        for player in self.players:
+            stored = self.stored_by_player_id.get(player.id)
+            bonus = self.bonus_for(player.id)
+            finale_score = stored.score if stored else None
+            total = (finale_score if finale_score is not None else 0) + bonus
+            finale_rows.append({
+                "player_id": player.id,
+                "version": stored.version if stored else 0,
+                "name": player.name,
+                "oom_rank": self.rank_by_player_id.get(player.id, "-"),
+                "bonus": bonus,
+                "finale_score": finale_score,
+                "total": total
+            })
+
+        # Players with score first, then by total desc, then name
+        finale_rows.sort(key=lambda row: (row["finale_score"] is None, -row["total"], row["name"]))
+
+        place = 0
+        previous_total = None
+        for row in finale_rows:
+            if row["finale_score"] is None:
+                row["place"] = None
+                continue
+            if row["total"] != previous_total:
+                place += 1
+                previous_total = row["total"]
+            row["place"] = place
+
+        return finale_rows
+
+    def result_rows(self):
+        """Ranked rows for the read-only result table (players with a finale score)."""
+        return [row for row in self.rows() if row["finale_score"] is not None]
+
+    def lock_bonuses(self, tournament_id):
+        """
+        Set every finale row without a score to the live OOM bonus, creating the
+        rows that are missing; rows with a score keep their stored bonus.
+
+        save_scores calls this until the first finale score is stored, so a save
+        whose scores all conflicted leaves no stale bonus behind; after that,
+        has_started stops the refresh and the stored bonuses are final. Two
+        markers saving the first scores at once each refresh the unscored rows,
+        and the last one to commit sets their bonus. The version is not bumped,
+        since the score forms never show the bonus.
+        """
+        rows = [
+            {"tournament_id": tournament_id, "player_id": player.id,
+             "bonus": self.live_bonus_by_player_id.get(player.id, 0), "score": None, "version": 0}
+            for player in self.players
+        ]
+        upsert_rows(FinaleScore, rows, ["tournament_id", "player_id"], ["bonus"], unless_set="score")
+
+    def save_scores(self, scores_by_player_id, versions=None):
+        """
+        Save {player_id: score}. The first save also locks the current OOM bonus
+        for every player.
+
+        versions maps player_id to the row version shown in the form (0 for none);
+        scores someone else changed since then are kept and returned as
+        {player_id: stored score}. Raises FinaleError when no tournament is active.
+        """
+        if not scores_by_player_id:
+            return {}
+        tournament = Tournament.get_active()
+        if tournament is None:
+            raise FinaleError("Ingen aktiv turnering. Start en ny turnering før finalen føres.")
+        tournament_id = tournament.id
+        if not self.has_started:
+            self.lock_bonuses(tournament_id)
+
+        rows = [
+            {"tournament_id": tournament_id, "player_id": player_id,
+             "bonus": self.bonus_for(player_id), "score": score}
+            for player_id, score in scores_by_player_id.items()
+        ]
+        if versions is not None:
+            for row in rows:
+                row["version"] = versions.get(row["player_id"], 0)
+        written = upsert_rows(FinaleScore, rows, ["tournament_id", "player_id"], ["score"],
+                              versioned=True)
+        if versions is None:
+            return {}
+        missing = [player_id for player_id in scores_by_player_id
+                   if (tournament_id, player_id) not in written]
+        if not missing:
+            return {}
+        stored = FinaleScore.query.filter(
+            FinaleScore.tournament_id == tournament_id, FinaleScore.player_id.in_(missing)
+        )
+        return {row.player_id: row.score for row in stored
+                if row.score != scores_by_player_id[row.player_id]}
@@ -0,0 +1,254 @@
+"""
+Flights
+-------
+Flights of 3–4 players for every round of the active tournament.
+
+Each round is seeded greedily: fixed groups go first, then the remaining
+players are dealt out in handicap bands, one band member per flight, each to
+the flight they have met least. Random swaps between flights then keep any
+change that lowers the cost:
+    REPEAT_PENALTY × earlier meetings of players in the same flight
+    + per flight, size × (flight average handicap − field average)²
+Rounds that already have scores keep their flights, which count as history
+for the rest.
+"""
+
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert
+from database import db, FlightAssignment, Player, Round, RoundScore, active_tournament_id
+
+MIN_FLIGHT, MAX_FLIGHT = 3, 4
+TEE_INTERVAL_MINUTES = 10
+# One earlier meeting costs as much as a flight average 5 strokes off the field in a four-ball
+REPEAT_PENALTY = 100.0
+SWAP_ATTEMPTS_PER_PLAYER = 25
+# Stop a round early after this many rejected swaps per player in a row
+STALL_PER_PLAYER = 10
+
+
+class FlightError(ValueError):
+    """Raised when the players cannot be split into flights as asked."""
+
+
+def flight_sizes(count):
+    """
+    Flight sizes for `count` players: as few flights as possible, all of 3 or 4 from six up.
+    Five players cannot be split that way and play as one flight of five.
+    """
+    if count < 2 * MIN_FLIGHT:
+        return [count] if count else []
+    flights = -(-count // MAX_FLIGHT)
+    base, extra = divmod(count, flights)
+    return [base + 1] * extra + [base] * (flights - extra)
+
+
+def parse_fixed_groups(text, players):
+    """Player id lists from one group per line, names separated by commas."""
+    by_name = {player.name.strip().lower(): player.id for player in players}
+    groups, seen = [], set()
+    for line in (text or "").splitlines():
+        names = [name.strip() for name in line.split(",") if name.strip()]
+        if len(names) < 2:
+            continue
+        if len(names) > MAX_FLIGHT:
+            raise FlightError(f"En fast gruppe kan ha høyst {MAX_FLIGHT} spillere: {line.strip()}")
+        group = []
+        for name in names:
+            player_id = by_name.get(name.lower())
+            if player_id is None:
+                raise FlightError(f"Fant ingen spiller som heter «{name}».")
+            if player_id in seen:
+                raise FlightError(f"«{name}» står i mer enn én fast gruppe.")
+            seen.add(player_id)
+            group.append(player_id)
+        groups.append(group)
+    return groups
+
+
+def _balance(total, size, field_mean):
+    return (total - size * field_mean) ** 2 / size if size else 0.0
+
+
+def _contacts(members, flight, meetings):
+    """Earlier meetings between `members` and the players of `flight` outside them."""
+    return sum(
+        meetings[player].get(other, 0)
+        for player in members for other in flight if other not in members
+    )
+
+
+def _arrange(units, handicaps, meetings, rng):
+    """
+    Flights for one round as lists of player ids.
+
+    units are tuples of player ids that must share a flight; meetings maps
+    player -> {player: earlier rounds together}.
+    """
+    sizes = flight_sizes(sum(len(unit) for unit in units))
+    room = list(sizes)
+    flights = [[] for _ in sizes]
+    unit_flight = {}
+    field_mean = sum(handicaps[player] for unit in units for player in unit) / max(sum(sizes), 1)
+
+    def place(index, flight_index):
+        unit_flight[index] = flight_index
+        flights[flight_index].extend(units[index])
+        room[flight_index] -= len(units[index])
+
+    # Fixed groups first, largest into the emptiest flight that fits
+    groups = sorted((index for index, unit in enumerate(units) if len(unit) > 1),
+                    key=lambda index: -len(units[index]))
+    for index in groups:
+        candidates = [f for f in range(len(flights)) if room[f] >= len(units[index])]
+        if not candidates:
+            raise FlightError(f"De faste gruppene går ikke opp i flights på {MIN_FLIGHT}–{MAX_FLIGHT}.")
+        place(index, max(candidates, key=lambda f: (room[f], -f)))
+
+    # Everyone else in handicap bands: one band member per open flight
+    singles = sorted((index for index, unit in enumerate(units) if len(unit) == 1),
+                     key=lambda index: handicaps[units[index][0]])
+    position = 0
+    while position < len(singles):
+        open_flights = [f for f in range(len(flights)) if room[f] > 0]
+        band = singles[position:position + len(open_flights)]
+        position += len(band)
+        for index in band:
+            flight_index = min(open_flights, key=lambda f: (
+                _contacts(units[index], flights[f], meetings), -room[f], f
+            ))
+            open_flights.remove(flight_index)
+            place(index, flight_index)
+
+    # Local improvement: swap two same-sized units between flights
+    totals = [sum(handicaps[player] for player in flight) for flight in flights]
+    unit_handicaps = [sum(handicaps[player] for player in unit) for unit in units]
+    by_size = defaultdict(list)
+    for index, unit in enumerate(units):
+        by_size[len(unit)].append(index)
+    swappable = [indexes for indexes in by_size.values() if len(indexes) > 1]
+    attempts = SWAP_ATTEMPTS_PER_PLAYER * len(units) if len(flights) > 1 else 0
+    stall = 0
+    for _ in range(attempts if swappable else 0):
+        if stall > STALL_PER_PLAYER * len(units):
+            break
+        stall += 1
+        first, second = rng.sample(rng.choice(swappable), 2)
+        a, b = unit_flight[first], unit_flight[second]
+        if a == b:
+            continue
+        unit_a, unit_b = units[first], units[second]
+        flight_a = [player for player in flights[a] if player not in unit_a]
+        flight_b = [player for player in flights[b] if player not in unit_b]
+        repeats = (_contacts(unit_a, flight_b, meetings) + _contacts(unit_b, flight_a, meetings)
+                   - _contacts(unit_a, flight_a, meetings) - _contacts(unit_b, flight_b, meetings))
+        shift = unit_handicaps[second] - unit_handicaps[first]
+        balance = (_balance(totals[a] + shift, len(flights[a]), field_mean)
+                   + _balance(totals[b] - shift, len(flights[b]), field_mean)
+                   - _balance(totals[a], len(flights[a]), field_mean)
+                   - _balance(totals[b], len(flights[b]), field_mean))
+        if REPEAT_PENALTY * repeats + balance >= 0:
+            continue
+        flights[a] = flight_a + list(unit_b)
+        flights[b] = flight_b + list(unit_a)
+        totals[a] += shift
+        totals[b] -= shift
+        unit_flight[first], unit_flight[second] = b, a
+        stall = 0
+    return flights
+
+
+def _meet(meetings, flight):
+    for player in flight:
+        for other in flight:
+            if other != player:
+                meetings[player][other] = meetings[player].get(other, 0) + 1
+
+
+def plan_rounds(handicaps, round_count, fixed_groups=(), history=(), seed=0):
+    """
+    Flights for round_count rounds; returns one list of flights per round.
+
+    handicaps maps player_id to handicap; history holds flights already played,
+    whose pairings the new rounds try not to repeat.
+    """
+    grouped = {player for group in fixed_groups for player in group}
+    units = [tuple(group) for group in fixed_groups if all(p in handicaps for p in group)]
+    units += [(player,) for player in handicaps if player not in grouped]
+    meetings = defaultdict(dict)
+    for flight in history:
+        _meet(meetings, flight)
+    rng = random.Random(seed)
+    rounds = []
+    for _ in range(round_count):
+        flights = _arrange(units, handicaps, meetings, rng)
+        for flight in flights:
+            _meet(meetings, flight)
+        rounds.append(flights)
+    return rounds
+
+
+def generate_flights(fixed_groups=(), seed=0):
+    """
+    Store new flights for the active tournament's rounds that have no scores yet.
+
+    Returns the number of rounds that got flights.
+    """
+    players = Player.get_all()
+    rounds = Round.get_all()
+    played = {
+        round_id for (round_id,) in db.session.query(RoundScore.round_id).filter(
+            RoundScore.tournament_id == active_tournament_id()
+        ).distinct()
+    }
+    history = defaultdict(list)
+    for round_id, flight, player_id in db.session.query(
+        FlightAssignment.round_id, FlightAssignment.flight, FlightAssignment.player_id
+    ).filter(FlightAssignment.round_id.in_(played)):
+        history[(round_id, flight)].append(player_id)
+
+    open_rounds = [round.id for round in rounds if round.id not in played]
+    plans = plan_rounds(
+        {player.id: player.handicap or 0 for player in players},
+        len(open_rounds), fixed_groups, history.values(), seed,
+    )
+    db.session.execute(delete(FlightAssignment).where(FlightAssignment.round_id.in_(open_rounds)))
+    rows = [
+        {"round_id": round_id, "player_id": player_id, "flight": number}
+        for round_id, flights in zip(open_rounds, plans)
+        for number, flight in enumerate(flights, start=1)
+        for player_id in flight
+    ]
+    if rows:
+        db.session.execute(insert(FlightAssignment), rows)
+    return len(open_rounds)
+
+
+def tee_times(first, count):
+    """Start time of each flight, TEE_INTERVAL_MINUTES apart; None if first is not HH:MM."""
+    try:
+        start = datetime.strptime(first, "%H:%M")
+    except (TypeError, ValueError):
+        return [None] * count
+    step = timedelta(minutes=TEE_INTERVAL_MINUTES)
+    return [(start + step * number).strftime("%H:%M") for number in range(count)]
+
+
+def flights_by_round():
+    """{round_id: [[(name, handicap), ...] per flight]} for the active tournament, in one query."""
+    rows = (
+        db.session.query(FlightAssignment.round_id, FlightAssignment.flight,
+                         Player.name, Player.handicap)
+        .join(Player, Player.id == FlightAssignment.player_id)
+        .join(Round, Round.id == FlightAssignment.round_id)
+        .filter(Round.tournament_id == active_tournament_id())
+        .order_by(FlightAssignment.round_id, FlightAssignment.flight, Player.name)
+    )
+    result = defaultdict(list)
+    for round_id, flight, name, handicap in rows:
+        flights = result[round_id]
+        while len(flights) < flight:
+            flights.append([])
+        flights[flight - 1].append((name, handicap))
+    return dict(result)
@@ -0,0 +1,40 @@
+"""
+Gunicorn configuration
+----------------------
+The app is imported once in the master (preload) and forked into workers.
+create_app() opens no connections, but any pool created before the fork is
+discarded in each worker so no connection is shared between processes.
+
+GUNICORN_WORKER_CLASS=gevent runs each worker as an event loop serving up to
+GUNICORN_WORKER_CONNECTIONS requests at once. The standard library and
+psycopg2 are patched here, before the app is imported, so the locks, queues
+and threads created at import time are already cooperative.
+"""
+
+import os
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+if worker_class == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+    if not os.environ.get("DATABASE_URL", "").startswith("sqlite"):
+        # psycopg2 waits on the event loop instead of blocking the worker
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "100"))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+# Read by db_routing.engine_options to size each worker's pool
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+
+
+def post_fork(server, worker):
+    from app import app
+    from database import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
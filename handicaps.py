@@ -0,0 +1,205 @@
+"""
+Handicap Index
+--------------
+WHS handicap index per player from the rounds they played on a rated tee.
+
+Each saved score becomes a score differential:
+    113 / Slope × (adjusted gross − Course Rating)
+For a hole-by-hole card the adjusted gross caps every hole at net double
+bogey and counts unplayed holes as net par. A score entered as a total is
+converted from its Stableford points: par + course handicap + 36 − points.
+The index is the
+average of the best 8 of the last 20 differentials, with the WHS table for
+players with fewer rounds.
+
+Saving a score for the player's newest round appends one differential to the
+stored window; anything else (an older round, a changed tee or date) rebuilds
+those players from their history. `flask --app app handicap recompute`
+rebuilds everyone in one ordered pass.
+"""
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select
+from database import db, Player, PlayerHandicap, Round, RoundScore, CourseTee
+from models import course_handicap
+from scoring import stroke_allocation
+
+WINDOW = 20
+# Rounds in the window -> (lowest differentials averaged, adjustment)
+WHS_TABLE = {
+    3: (1, -2.0), 4: (1, -1.0), 5: (1, 0.0), 6: (2, -1.0), 7: (2, 0.0), 8: (2, 0.0),
+    9: (3, 0.0), 10: (3, 0.0), 11: (3, 0.0), 12: (4, 0.0), 13: (4, 0.0), 14: (4, 0.0),
+    15: (5, 0.0), 16: (5, 0.0), 17: (6, 0.0), 18: (6, 0.0), 19: (7, 0.0), 20: (8, 0.0),
+}
+
+
+def adjusted_gross(points, holes, playing_index, tee):
+    """Gross score with net double bogey per hole, from the card or the Stableford total."""
+    playing_handicap = course_handicap(playing_index, tee.slope_rating, tee.course_rating, tee.par)
+    if holes is None or tee.hole_pars is None or tee.stroke_indexes is None:
+        return tee.par + playing_handicap + 36 - points
+    received = stroke_allocation(playing_handicap, tee.stroke_indexes)
+    return sum(
+        hole_par + extra if strokes is None else min(strokes, hole_par + extra + 2)
+        for strokes, hole_par, extra in zip(holes, tee.hole_pars, received)
+    )
+
+
+def score_differential(points, holes, playing_index, tee):
+    """Differential of one round on `tee`, played off playing_index."""
+    gross = adjusted_gross(points, holes, playing_index, tee)
+    return round(113 / tee.slope_rating * (gross - tee.course_rating), 1)
+
+
+def index_from_differentials(differentials):
+    """Handicap index from up to 20 differentials, or None below three rounds."""
+    rule = WHS_TABLE.get(min(len(differentials), WINDOW))
+    if rule is None:
+        return None
+    count, adjustment = rule
+    best = sorted(differentials)[:count]
+    index = round(sum(best) / count + adjustment, 1)
+    return min(index, Player.MAX_HANDICAP)
+
+
+def _playing_index(state):
+    return state.handicap_index if state.handicap_index is not None else state.base_index
+
+
+def _append(state, window, round_id, play_date, points, holes, tee):
+    """Add one round to a window list and refresh the state's index from it."""
+    differential = score_differential(points, holes, _playing_index(state), tee)
+    window.append([round_id, play_date.strftime("%Y-%m-%d"), differential, points])
+    del window[:-WINDOW]
+    state.handicap_index = index_from_differentials([entry[2] for entry in window])
+    state.rounds_counted += 1
+
+
+def _publish(states, players):
+    """Copy computed indexes to Player.handicap when HANDICAP_AUTO_UPDATE is on."""
+    if not current_app.config.get("HANDICAP_AUTO_UPDATE"):
+        return
+    for player in players:
+        state = states.get(player.id)
+        if state is not None and state.handicap_index is not None:
+            player.handicap = state.handicap_index
+
+
+def recompute(player_ids=None):
+    """Rebuild the index of the given players (default: everyone) from their history."""
+    players = Player.query
+    states = PlayerHandicap.query
+    if player_ids is not None:
+        players = players.filter(Player.id.in_(player_ids))
+        states = states.filter(PlayerHandicap.player_id.in_(player_ids))
+    players = players.all()
+    states = {state.player_id: state for state in states}
+
+    history = (
+        select(RoundScore.player_id, Round.id.label("round_id"), Round.play_date,
+               RoundScore.score, RoundScore.holes, CourseTee.par, CourseTee.course_rating,
+               CourseTee.slope_rating, CourseTee.hole_pars, CourseTee.stroke_indexes)
+        .join(Round, RoundScore.round_id == Round.id)
+        .join(CourseTee, Round.tee_id == CourseTee.id)
+        # 0 means "no score", as in the standings
+        .where(RoundScore.score.isnot(None), RoundScore.score != 0)
+        .order_by(RoundScore.player_id, Round.play_date, Round.id)
+    )
+    if player_ids is not None:
+        history = history.where(RoundScore.player_id.in_(player_ids))
+
+    windows = {}
+    for player in players:
+        state = states.get(player.id)
+        if state is None:
+            state = states[player.id] = PlayerHandicap(
+                player_id=player.id, base_index=player.handicap or 0
+            )
+            db.session.add(state)
+        state.handicap_index = None
+        state.rounds_counted = 0
+        windows[player.id] = []
+
+    # Each row carries its tee's ratings, so it is passed as the tee
+    for row in db.session.execute(history):
+        _append(states[row.player_id], windows[row.player_id], row.round_id, row.play_date,
+                row.score, row.holes, row)
+
+    for player_id, window in windows.items():
+        states[player_id].differentials = window
+    _publish(states, players)
+    return states
+
+
+def record_scores(round, scores_by_player_id, cards=None):
+    """
+    Update the index of players who just got a score in `round`; cards maps
+    player_id to the hole-by-hole card where one was entered.
+
+    A score for a player's newest round extends the stored window and an
+    unchanged score is skipped; any other player is rebuilt from history.
+    A 0 is no score: it records nothing, and drops the round if it was counted.
+    """
+    tee = round.tee
+    if tee is None or not scores_by_player_id:
+        return
+    player_ids = list(scores_by_player_id)
+    states = {
+        state.player_id: state
+        for state in PlayerHandicap.query.filter(PlayerHandicap.player_id.in_(player_ids))
+    }
+    play_date = round.play_date.strftime("%Y-%m-%d")
+    rebuild = []
+    for player_id, points in scores_by_player_id.items():
+        state = states.get(player_id)
+        window = list(state.differentials) if state is not None else None
+        saved = next((entry for entry in window or () if entry[0] == round.id), None)
+        if not points:
+            # A round before the window set the playing index of every later differential
+            if saved is not None or window and (window[0][1], window[0][0]) > (play_date, round.id):
+                rebuild.append(player_id)
+            continue
+        if saved is not None and saved[3] == points and cards is None:
+            continue
+        if window is None or saved is not None \
+                or (window and (window[-1][1], window[-1][0]) > (play_date, round.id)):
+            rebuild.append(player_id)
+            continue
+        _append(state, window, round.id, round.play_date, points,
+                (cards or {}).get(player_id), tee)
+        state.differentials = window
+
+    if rebuild:
+        recompute(rebuild)
+    appended = [player_id for player_id in player_ids if player_id not in rebuild]
+    if appended:
+        _publish(states, Player.query.filter(Player.id.in_(appended)))
+
+
+def round_player_ids(round):
+    """Players with a score in `round`, for a rebuild after the round changes."""
+    return [
+        player_id for (player_id,) in db.session.query(RoundScore.player_id).filter(
+            RoundScore.round_id == round.id
+        )
+    ]
+
+
+def init_handicaps(app, auto_update=False):
+    """Register the CLI; with auto_update, computed indexes overwrite Player.handicap."""
+    app.config["HANDICAP_AUTO_UPDATE"] = auto_update
+    app.cli.add_command(handicap_cli)
+
+
+handicap_cli = AppGroup("handicap", help="WHS handicap index.")
+
+
+@handicap_cli.command("recompute")
+def recompute_command():
+    """Rebuild every player's handicap index from all rounds on rated tees."""
+    states = recompute()
+    db.session.commit()
+    computed = sum(1 for state in states.values() if state.handicap_index is not None)
+    click.echo(f"Recomputed {len(states)} players; {computed} have an index.")
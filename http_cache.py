@@ -0,0 +1,129 @@
+"""
+HTTP Cache
+----------
+ETag/Last-Modified handling and a bounded LRU of rendered HTML (or JSON)
+for read-only pages, keyed by route, the data versions of the tables the
+page reads and the build that renders it.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import threading
+from datetime import timezone
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request
+from data_versions import get_versions
+
+DEFAULT_CACHE_SIZE = 128
+
+
+class HtmlCache:
+    """Thread-safe LRU of rendered pages."""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+html_cache = HtmlCache()
+
+
+def build_id(app):
+    """
+    Identifier of the code, templates and assets being served: APP_VERSION or the
+    deployed commit when set, else a hash of the modules, templates and asset manifest.
+    """
+    version = os.environ.get("APP_VERSION") or os.environ.get("RENDER_GIT_COMMIT")
+    if version:
+        return version
+    digest = hashlib.sha1(json.dumps(app.extensions.get("assets_manifest", {}), sort_keys=True).encode())
+    paths = glob.glob(os.path.join(app.root_path, "*.py"))
+    for folder, _, names in os.walk(os.path.join(app.root_path, app.template_folder)):
+        paths.extend(os.path.join(folder, name) for name in names)
+    for path in sorted(paths):
+        with open(path, "rb") as handle:
+            digest.update(path.encode() + handle.read())
+    return digest.hexdigest()[:12]
+
+
+def init_http_cache(app, max_entries=DEFAULT_CACHE_SIZE):
+    """Size the page cache and tag cached pages and ETags with this build (after init_assets)."""
+    html_cache.max_entries = max_entries
+    app.config.setdefault("BUILD_ID", build_id(app))
+
+
+def _not_modified(etag, last_modified):
+    """True if the client's conditional headers match the current version."""
+    if request.if_none_match:
+        # Weak comparison: compressed responses carry the same tag marked W/
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return request.if_modified_since >= last_modified.replace(microsecond=0)
+    return False
+
+
+def cached_view(*tables, mimetype=None):
+    """
+    Cache a read-only view until one of the given tables is written.
+
+    Costs one version query per request; answers 304 when the client already
+    has the current version and serves rendered HTML from the LRU otherwise.
+    A new deploy changes the build id, so pages from the old one are not reused.
+    Views returning another kind of text, such as JSON, pass its mimetype.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = get_versions(tables)
+            key = (current_app.config["BUILD_ID"], request.endpoint, request.full_path,
+                   tuple(versions[table][0] for table in tables))
+            etag = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+            updated = [updated_at for _, updated_at in versions.values() if updated_at]
+            last_modified = max(updated).replace(tzinfo=timezone.utc) if updated else None
+
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                html = html_cache.get(key)
+                if html is None:
+                    html = view(*args, **kwargs)
+                    if not isinstance(html, str):
+                        # Redirects and error responses are not cached
+                        return html
+                    html_cache.set(key, html)
+                response = make_response(html)
+                if mimetype:
+                    response.mimetype = mimetype
+
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            # Clients may keep the page but must revalidate it on every view
+            response.cache_control.no_cache = True
+            return response
+        # The static export regenerates a page when one of these tables changes
+        wrapper.tables = tables
+        return wrapper
+    return decorator
@@ -0,0 +1,168 @@
+"""
+Responsive Images
+-----------------
+Offline derivatives of the tournament photos in static/.
+
+`flask --app app images build` writes each photo in several widths as WebP
+and progressive JPEG to static/img, named by the source's content hash, and
+records them in static/img/manifest.json. Photos whose hash is unchanged are
+skipped, so only new or edited photos are re-encoded. Like the assets, the
+derivatives are build output (the Render build runs it) and not committed;
+Pillow is only needed to build, not to serve.
+
+Templates call responsive_image("IMG_1315.jpeg", "alt text", sizes="...")
+to get a lazy-loaded <picture> with srcset for both formats.
+"""
+
+import hashlib
+import json
+import os
+import click
+from flask import current_app, send_from_directory, url_for
+from flask.cli import AppGroup
+from markupsafe import Markup, escape
+from assets import IMMUTABLE
+
+SOURCE_EXTENSIONS = (".jpeg", ".jpg", ".png")
+IMAGE_DIR = "img"
+MANIFEST = "manifest.json"
+WIDTHS = (320, 640, 960)
+# Encoder settings per output format
+FORMATS = {
+    "webp": {"format": "WEBP", "quality": 75, "method": 6},
+    "jpeg": {"format": "JPEG", "quality": 78, "optimize": True, "progressive": True},
+}
+
+
+def _source_hash(path):
+    with open(path, "rb") as handle:
+        return hashlib.sha256(handle.read()).hexdigest()[:12]
+
+
+def _target_widths(width):
+    """Standard widths below the source width, plus the source itself if it is smaller."""
+    widths = [target for target in WIDTHS if target < width]
+    if width <= WIDTHS[-1]:
+        widths.append(width)
+    return widths or [width]
+
+
+def _render_derivatives(source_path, stem, digest, output_dir):
+    """Encode every width and format of one photo; returns its manifest entry."""
+    # Imported lazily: Pillow is only required for the offline build
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as original:
+        # Apply the phone's rotation flag, then drop EXIF (GPS position included)
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    entry = {"hash": digest, "width": image.width, "height": image.height, "variants": {}}
+    for ext, options in FORMATS.items():
+        variants = []
+        for width in _target_widths(image.width):
+            height = round(image.height * width / image.width)
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            filename = f"{stem}-{width}.{digest}.{ext}"
+            resized.save(os.path.join(output_dir, filename), **options)
+            variants.append([width, filename])
+        entry["variants"][ext] = variants
+    return entry
+
+
+def build_images(static_folder, echo=None):
+    """Create derivatives for new or changed photos and remove those of deleted ones."""
+    output_dir = os.path.join(static_folder, IMAGE_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    previous = load_manifest(static_folder)
+    manifest = {}
+    for name in sorted(os.listdir(static_folder)):
+        source_path = os.path.join(static_folder, name)
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in SOURCE_EXTENSIONS or not os.path.isfile(source_path):
+            continue
+        digest = _source_hash(source_path)
+        entry = previous.get(name)
+        if entry and entry["hash"] == digest and all(
+            os.path.isfile(os.path.join(output_dir, filename))
+            for variants in entry["variants"].values() for _, filename in variants
+        ):
+            manifest[name] = entry
+            continue
+        manifest[name] = _render_derivatives(source_path, stem, digest, output_dir)
+        if echo:
+            echo(f"{name}: {len(manifest[name]['variants']['jpeg'])} widths")
+
+    keep = {
+        filename for entry in manifest.values()
+        for variants in entry["variants"].values() for _, filename in variants
+    }
+    for filename in os.listdir(output_dir):
+        if filename != MANIFEST and filename not in keep:
+            os.remove(os.path.join(output_dir, filename))
+    with open(os.path.join(output_dir, MANIFEST), "w") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, IMAGE_DIR, MANIFEST)) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _srcset(variants):
+    return ", ".join(
+        f"{url_for('images', filename=filename)} {width}w" for width, filename in variants
+    )
+
+
+def responsive_image(name, alt, sizes="100vw", css_class=None):
+    """<picture> with WebP and JPEG srcsets for a photo in static/, loaded lazily."""
+    entry = current_app.extensions["images_manifest"].get(name)
+    class_attr = f' class="{escape(css_class)}"' if css_class else ""
+    if entry is None:
+        return Markup(
+            f'<img src="{url_for("static", filename=name)}" alt="{escape(alt)}"{class_attr} '
+            f'loading="lazy" decoding="async">'
+        )
+    jpeg = entry["variants"]["jpeg"]
+    webp = entry["variants"]["webp"]
+    # Fallback src for browsers without srcset: the middle width
+    fallback = jpeg[len(jpeg) // 2][1]
+    width, _ = jpeg[-1]
+    height = round(entry["height"] * width / entry["width"])
+    return Markup(
+        f'<picture>'
+        f'<source type="image/webp" srcset="{_srcset(webp)}" sizes="{escape(sizes)}">'
+        f'<img src="{url_for("images", filename=fallback)}" srcset="{_srcset(jpeg)}" '
+        f'sizes="{escape(sizes)}" width="{width}" height="{height}" alt="{escape(alt)}"{class_attr} '
+        f'loading="lazy" decoding="async">'
+        f'</picture>'
+    )
+
+
+def serve_image(filename):
+    """Derivative names contain the source hash, so they can be cached for good."""
+    response = send_from_directory(os.path.join(current_app.static_folder, IMAGE_DIR), filename)
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+
+def init_images(app):
+    """Load the derivative manifest and expose responsive_image() to templates."""
+    app.extensions["images_manifest"] = load_manifest(app.static_folder)
+    app.add_template_global(responsive_image)
+    app.add_url_rule(f"/{IMAGE_DIR}/<path:filename>", "images", serve_image)
+    app.cli.add_command(images_cli)
+
+
+images_cli = AppGroup("images", help="Responsive image derivatives.")
+
+
+@images_cli.command("build")
+def build_command():
+    """Resize and re-encode changed photos in static/ into static/img."""
+    manifest = build_images(current_app.static_folder, echo=click.echo)
+    click.echo(f"{len(manifest)} photos in static/{IMAGE_DIR}/{MANIFEST}.")
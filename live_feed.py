@@ -0,0 +1,209 @@
+"""
+Live Feed
+---------
+Server-Sent Events for the OOM table and the finale result.
+
+Routes publish a channel name after they commit. Subscribers wake up, rebuild
+the snapshot (shared between viewers of the same data version) and send a
+compact JSON diff. The default backend fans out inside one process; with
+LIVE_FEED_BACKEND=postgres, messages travel through LISTEN/NOTIFY so every
+gunicorn worker sees them.
+
+An open feed holds its worker for as long as the viewer stays, so feeds are
+only served by workers that handle other requests meanwhile (gevent,
+eventlet or threads). With plain sync workers the stream routes answer 204,
+which tells browsers not to reconnect, and pages leave the feed out.
+"""
+
+import json
+import queue
+import select
+import threading
+from flask import current_app
+from sqlalchemy import text
+from database import db
+from data_versions import get_versions
+
+# Gunicorn worker classes that keep serving while a feed is open
+STREAMING_WORKERS = ("gevent", "eventlet", "gthread")
+NOTIFY_CHANNEL = "golf_live_feed"
+HEARTBEAT_SECONDS = 15
+POLL_SECONDS = 5
+
+
+class LocalBackend:
+    """Deliver messages to subscribers in this process only."""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def start(self):
+        pass
+
+    def publish(self, channel):
+        self.broker.fanout(channel)
+
+
+class PostgresBackend:
+    """Deliver messages to every process through Postgres LISTEN/NOTIFY."""
+
+    def __init__(self, broker, engine):
+        self.broker = broker
+        self.engine = engine
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, daemon=True)
+                self._listener.start()
+
+    def publish(self, channel):
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:name, :payload)"),
+                         {"name": NOTIFY_CHANNEL, "payload": channel})
+            conn.commit()
+
+    def _listen(self):
+        conn = self.engine.raw_connection()
+        try:
+            dbapi_conn = conn.driver_connection
+            dbapi_conn.autocommit = True
+            with dbapi_conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            while True:
+                if select.select([dbapi_conn], [], [], POLL_SECONDS) == ([], [], []):
+                    continue
+                dbapi_conn.poll()
+                while dbapi_conn.notifies:
+                    self.broker.fanout(dbapi_conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+
+class Broker:
+    """In-process pub/sub: one queue per connected viewer."""
+
+    def __init__(self):
+        self.backend = LocalBackend(self)
+        self._subscribers = {}
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def use_backend(self, backend):
+        self.backend = backend
+
+    def subscribe(self, channel):
+        self.backend.start()
+        subscriber = queue.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, channel, subscriber):
+        with self._lock:
+            self._subscribers.get(channel, set()).discard(subscriber)
+
+    def publish(self, channel):
+        self.backend.publish(channel)
+
+    def fanout(self, channel):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(channel)
+            except queue.Full:
+                # A wake-up is already pending; the viewer will read the latest state
+                pass
+
+    def snapshot(self, channel, tables, build):
+        """Return build() for the current data version, shared by all viewers."""
+        versions = get_versions(tables)
+        key = tuple(versions[table][0] for table in tables)
+        with self._lock:
+            cached = self._snapshots.get(channel)
+        if cached and cached[0] == key:
+            return cached[1]
+        rows = build()
+        with self._lock:
+            self._snapshots[channel] = (key, rows)
+        return rows
+
+
+broker = Broker()
+
+
+def _live_feed_context():
+    return {"live_feed": current_app.config.get("LIVE_FEED_STREAM", False)}
+
+
+def streaming_supported(environ):
+    """LIVE_FEED_STREAM=1/0 if set; otherwise whether the gunicorn workers can hold open feeds."""
+    setting = environ.get("LIVE_FEED_STREAM")
+    if setting:
+        return setting == "1"
+    return (environ.get("GUNICORN_WORKER_CLASS") in STREAMING_WORKERS
+            or int(environ.get("GUNICORN_THREADS", "1")) > 1)
+
+
+def init_live_feed(app, backend_name, streaming=True):
+    """
+    Select the pub/sub backend; the Postgres listener starts on first subscriber.
+    Without streaming, templates get live_feed=False and leave the feed out.
+    """
+    app.config["LIVE_FEED_STREAM"] = streaming
+    app.context_processor(_live_feed_context)
+    if backend_name == "postgres":
+        with app.app_context():
+            broker.use_backend(PostgresBackend(broker, db.engine))
+
+
+def publish(*channels):
+    """Tell viewers of the given channels that new data has been committed."""
+    for channel in channels:
+        broker.publish(channel)
+
+
+def diff_rows(previous, current):
+    """Compact diff between two {key: row} snapshots with their display order."""
+    changed = {key: row for key, row in current["rows"].items()
+               if previous["rows"].get(key) != row}
+    removed = [key for key in previous["rows"] if key not in current["rows"]]
+    diff = {}
+    if changed:
+        diff["set"] = changed
+    if removed:
+        diff["del"] = removed
+    if current["order"] != previous["order"]:
+        diff["order"] = current["order"]
+    return diff
+
+
+def _event(payload):
+    return f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+def stream(channel, tables, build):
+    """Yield SSE messages: a full snapshot first, then diffs after each publish."""
+    subscriber = broker.subscribe(channel)
+    try:
+        current = broker.snapshot(channel, tables, build)
+        db.session.close()
+        yield "retry: 3000\n"
+        yield _event({"full": True, **current})
+        while True:
+            try:
+                subscriber.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            previous, current = current, broker.snapshot(channel, tables, build)
+            # Release the connection while the viewer is idle
+            db.session.close()
+            diff = diff_rows(previous, current)
+            if diff:
+                yield _event(diff)
+    finally:
+        broker.unsubscribe(channel, subscriber)
@@ -0,0 +1,231 @@
+"""
+Request Metrics
+---------------
+Query count, DB time, template render time and wall time per endpoint,
+collected with SQLAlchemy engine events and Flask request hooks and exported
+in Prometheus text format.
+
+Each gunicorn worker keeps its own histograms and writes them to
+METRICS_DIR/metrics-<pid>.json; /admin/metrics merges every worker's file.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from flask import current_app, g, has_request_context, request, template_rendered, \
+    before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Histogram buckets: seconds for timings, number of statements for queries
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+HISTOGRAMS = {
+    "golf_request_duration_seconds": ("Wall time per request", TIME_BUCKETS),
+    "golf_request_db_seconds": ("Time spent in SQL per request", TIME_BUCKETS),
+    "golf_request_render_seconds": ("Template render time per request", TIME_BUCKETS),
+    "golf_request_queries": ("SQL statements per request", QUERY_BUCKETS),
+}
+SLOW_QUERIES = "golf_slow_queries_total"
+
+DEFAULT_SLOW_QUERY_MS = 200
+DEFAULT_FLUSH_SECONDS = 5
+
+# Seconds from the start of `import app` until the app is built / the first response is sent
+_startup = {"import": None, "first_response": None}
+
+
+class MetricsStore:
+    """Per-process histograms keyed by metric name and endpoint."""
+
+    def __init__(self):
+        self.directory = None
+        self.flush_seconds = DEFAULT_FLUSH_SECONDS
+        self._data = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def observe(self, name, endpoint, value):
+        buckets = HISTOGRAMS[name][1]
+        with self._lock:
+            series = self._data.setdefault(name, {}).setdefault(
+                endpoint, {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+            )
+            for idx, bound in enumerate(buckets):
+                if value <= bound:
+                    series["buckets"][idx] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def increment(self, name, endpoint):
+        with self._lock:
+            counters = self._data.setdefault(name, {})
+            counters[endpoint] = counters.get(endpoint, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self._data))
+
+    def _path(self):
+        return os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+
+    def maybe_flush(self, force=False):
+        """Write this worker's data to the shared directory, at most every flush_seconds."""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_seconds:
+            return
+        self._last_flush = now
+        path = self._path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Merge the data of every worker (or just this process without a shared directory)."""
+        if not self.directory:
+            return self.snapshot()
+        self.maybe_flush(force=True)
+        merged = {}
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path) as handle:
+                    _merge(merged, json.load(handle))
+            except (OSError, ValueError):
+                continue
+        return merged
+
+
+def _merge(target, data):
+    for name, series_by_endpoint in data.items():
+        merged_series = target.setdefault(name, {})
+        for endpoint, series in series_by_endpoint.items():
+            if name == SLOW_QUERIES:
+                merged_series[endpoint] = merged_series.get(endpoint, 0) + series
+                continue
+            current = merged_series.setdefault(
+                endpoint, {"buckets": [0] * len(series["buckets"]), "sum": 0.0, "count": 0}
+            )
+            current["buckets"] = [a + b for a, b in zip(current["buckets"], series["buckets"])]
+            current["sum"] += series["sum"]
+            current["count"] += series["count"]
+
+
+store = MetricsStore()
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_prometheus(data):
+    """Format merged metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for endpoint, series in sorted(data.get(name, {}).items()):
+            label = f'endpoint="{_label(endpoint)}"'
+            # Stored bucket counts are already cumulative (value <= bound)
+            for bound, count in zip(buckets, series["buckets"]):
+                lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{label},le="+Inf"}} {series["count"]}')
+            lines.append(f"{name}_sum{{{label}}} {series['sum']:.6f}")
+            lines.append(f"{name}_count{{{label}}} {series['count']}")
+    lines.append(f"# HELP {SLOW_QUERIES} SQL statements slower than SLOW_QUERY_MS")
+    lines.append(f"# TYPE {SLOW_QUERIES} counter")
+    for endpoint, count in sorted(data.get(SLOW_QUERIES, {}).items()):
+        lines.append(f'{SLOW_QUERIES}{{endpoint="{_label(endpoint)}"}} {count}')
+    lines.append("# HELP golf_startup_seconds "
+                 "Time from import to app ready / first response (this worker)")
+    lines.append("# TYPE golf_startup_seconds gauge")
+    for phase, seconds in startup_times().items():
+        if seconds is not None:
+            lines.append(f'golf_startup_seconds{{phase="{phase}"}} {seconds:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    if not has_request_context() or "metrics_start" not in g:
+        return
+    g.metrics_queries += 1
+    g.metrics_db_seconds += elapsed
+    if elapsed * 1000 >= current_app.config["SLOW_QUERY_MS"]:
+        endpoint = request.endpoint or "unknown"
+        store.increment(SLOW_QUERIES, endpoint)
+        current_app.logger.warning(
+            "Slow query (%.1f ms) in %s: %s", elapsed * 1000, endpoint, " ".join(statement.split())[:500]
+        )
+
+
+def _before_render(app, template, context, **extra):
+    if has_request_context() and "metrics_start" in g:
+        g.metrics_render_start = time.perf_counter()
+
+
+def _after_render(app, template, context, **extra):
+    if has_request_context() and g.get("metrics_render_start") is not None:
+        g.metrics_render_seconds += time.perf_counter() - g.metrics_render_start
+        g.metrics_render_start = None
+
+
+def init_metrics(app):
+    """Register request hooks; SLOW_QUERY_MS and METRICS_DIR come from the environment."""
+    app.config.setdefault("SLOW_QUERY_MS", float(os.environ.get("SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS)))
+    store.directory = os.environ.get("METRICS_DIR") or None
+    if store.directory:
+        os.makedirs(store.directory, exist_ok=True)
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_db_seconds = 0.0
+        g.metrics_render_seconds = 0.0
+        g.metrics_render_start = None
+
+    @app.after_request
+    def _record_request_metrics(response):
+        if "metrics_start" not in g:
+            return response
+        endpoint = request.endpoint or "unknown"
+        store.observe("golf_request_duration_seconds", endpoint, time.perf_counter() - g.metrics_start)
+        store.observe("golf_request_db_seconds", endpoint, g.metrics_db_seconds)
+        store.observe("golf_request_render_seconds", endpoint, g.metrics_render_seconds)
+        store.observe("golf_request_queries", endpoint, g.metrics_queries)
+        store.maybe_flush()
+        return response
+
+
+def record_startup(app, import_started):
+    """Record import time now and the time of the first response when it is sent."""
+    _startup["import"] = time.perf_counter() - import_started
+
+    @app.after_request
+    def _record_first_response(response):
+        if _startup["first_response"] is None:
+            _startup["first_response"] = time.perf_counter() - import_started
+            app.logger.info(
+                "Startup: import %.3f s, first response %.3f s",
+                _startup["import"], _startup["first_response"],
+            )
+        return response
+
+
+def startup_times():
+    return dict(_startup)
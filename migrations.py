@@ -0,0 +1,470 @@
+"""
+Schema Migrations
+-----------------
+Numbered schema changes, applied in order and recorded in schema_version.
+
+Each migration inspects the live schema before changing it, so one list
+works on Postgres and SQLite, on databases created by older releases and on
+fresh databases, which start from the frozen baseline schema. Every
+migration defines the tables and columns it creates itself, as they were
+at that version, so the history does not change when database.py does.
+
+    flask --app app db upgrade    # apply pending migrations (once per deploy)
+    flask --app app db status     # list applied and pending versions
+"""
+
+import click
+from datetime import datetime
+from flask.cli import AppGroup
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Float, ForeignKey, Integer, MetaData, \
+    String, Table, UniqueConstraint, inspect, insert, select, text
+from database import db, PackedHoles, SchemaVersion
+from tournaments import default_name
+
+# Serialises concurrent `db upgrade` runs on Postgres (arbitrary constant)
+ADVISORY_LOCK_KEY = 7_305_114
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Register a function(connection) as schema version `version`."""
+    def register(func):
+        MIGRATIONS.append((version, name, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return register
+
+
+def _has_column(conn, table, column):
+    return any(col["name"] == column for col in inspect(conn).get_columns(table))
+
+
+def _has_index(conn, table, name):
+    inspector = inspect(conn)
+    names = {index["name"] for index in inspector.get_indexes(table)}
+    names.update(constraint["name"] for constraint in inspector.get_unique_constraints(table))
+    return name in names
+
+
+def _add_column(conn, table, column):
+    """
+    Add a column, as defined by the migration that adds it, to an existing table,
+    typed for this dialect. The column must be nullable or have a server_default,
+    which existing rows then get.
+    """
+    if _has_column(conn, table, column.name):
+        return
+    ddl = f"ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    for fk in column.foreign_keys:
+        referred_table, referred_column = fk.target_fullname.split(".")
+        ddl += f" REFERENCES {referred_table} ({referred_column})"
+        if fk.ondelete:
+            ddl += f" ON DELETE {fk.ondelete}"
+    conn.execute(text(ddl))
+
+
+def _delete_orphans(conn, table):
+    """Remove rows whose parent is gone (SQLite never enforced the foreign keys)."""
+    for fk in table.foreign_keys:
+        conn.execute(text(
+            f"DELETE FROM {table.name} WHERE {fk.parent.name} NOT IN "
+            f"(SELECT {fk.column.name} FROM {fk.column.table.name})"
+        ))
+
+
+def _rebuild_sqlite_table(conn, table):
+    """
+    SQLite cannot alter constraints, so copy the rows into a new table built from the
+    migration's definition, which lists every column the table has at that version,
+    and recreate the indexes the old table had.
+    """
+    indexes = conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"
+    ), {"table": table.name}).scalars().all()
+    new_table = table.to_metadata(table.metadata, name=f"_new_{table.name}")
+    try:
+        new_table.create(conn)
+    finally:
+        table.metadata.remove(new_table)
+    existing = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    columns = ", ".join(col.name for col in table.columns if col.name in existing)
+    conn.execute(text(
+        f"INSERT INTO {new_table.name} ({columns}) SELECT {columns} FROM {table.name}"
+    ))
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"ALTER TABLE {new_table.name} RENAME TO {table.name}"))
+    for ddl in indexes:
+        conn.execute(text(ddl))
+
+
+def _schema(*tables):
+    """
+    MetaData for a migration's table definitions, holding copies of the baseline
+    tables they refer to (only the primary keys of those are used).
+    """
+    metadata = MetaData()
+    for name in tables:
+        BASELINE.tables[name].to_metadata(metadata)
+    return metadata
+
+
+# The schema as the releases before migrations left it. Frozen here instead of taken from
+# database.py, so a fresh database is brought up to date by the same migrations as an old one.
+BASELINE = MetaData()
+
+Table(
+    "players", BASELINE,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(80), nullable=False),
+    Column("handicap", Float),
+    Column("created_at", DateTime),
+)
+Table(
+    "rounds", BASELINE,
+    Column("id", Integer, primary_key=True),
+    Column("course_name", String(100), nullable=False),
+    Column("play_date", DateTime, nullable=False),
+    Column("tee_time", String(5), nullable=False),
+    Column("pick_up", String(12)),
+    Column("created_at", DateTime),
+)
+Table(
+    "round_scores", BASELINE,
+    Column("id", Integer, primary_key=True),
+    Column("round_id", Integer, ForeignKey("rounds.id"), nullable=False),
+    Column("player_id", Integer, ForeignKey("players.id"), nullable=False),
+    Column("score", Integer),
+    Column("created_at", DateTime),
+)
+Table(
+    "finale_scores", BASELINE,
+    Column("id", Integer, primary_key=True),
+    Column("player_id", Integer, ForeignKey("players.id"), nullable=False, unique=True),
+    Column("bonus", Integer),
+    Column("score", Integer),
+    Column("created_at", DateTime),
+)
+Table(
+    "golf_courses", BASELINE,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("facility", String(120), nullable=False),
+    Column("created_at", DateTime),
+)
+Table(
+    "course_tees", BASELINE,
+    Column("id", Integer, primary_key=True),
+    Column("course_id", Integer, ForeignKey("golf_courses.id"), nullable=False),
+    Column("name", String(50), nullable=False),
+    Column("gender", String(10), nullable=False),
+    Column("par", Integer, nullable=False),
+    Column("course_rating", Float, nullable=False),
+    Column("slope_rating", Integer, nullable=False),
+    Column("created_at", DateTime),
+)
+Table(
+    "data_versions", BASELINE,
+    Column("table_name", String(50), primary_key=True),
+    Column("version", BigInteger, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+@migration(1, "baseline")
+def _baseline(conn):
+    """Create missing baseline tables and the columns older releases added at startup."""
+    BASELINE.create_all(conn)
+    if not _has_column(conn, "finale_scores", "bonus"):
+        conn.execute(text("ALTER TABLE finale_scores ADD COLUMN bonus INTEGER DEFAULT 0"))
+    if not _has_column(conn, "course_tees", "gender"):
+        conn.execute(text("ALTER TABLE course_tees ADD COLUMN gender VARCHAR(10) DEFAULT 'Herre'"))
+
+
+@migration(2, "unique round_scores (round_id, player_id)")
+def _round_scores_unique(conn):
+    if _has_index(conn, "round_scores", "uq_round_scores_round_player"):
+        return
+    # Keep the newest row where earlier saves left duplicates behind
+    conn.execute(text(
+        "DELETE FROM round_scores WHERE id NOT IN "
+        "(SELECT MAX(id) FROM round_scores GROUP BY round_id, player_id)"
+    ))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX uq_round_scores_round_player ON round_scores (round_id, player_id)"
+    ))
+
+
+@migration(3, "indexes for listings and joins")
+def _listing_indexes(conn):
+    # round_scores.round_id is the leading column of uq_round_scores_round_player
+    indexes = [
+        ("ix_round_scores_player_id", "round_scores", "player_id"),
+        ("ix_rounds_play_date", "rounds", "play_date"),
+        ("ix_players_name", "players", "name"),
+        ("ix_course_tees_course_id", "course_tees", "course_id"),
+    ]
+    for name, table, column in indexes:
+        if not _has_index(conn, table, name):
+            conn.execute(text(f"CREATE INDEX {name} ON {table} ({column})"))
+
+
+@migration(4, "ON DELETE CASCADE for scores and tees")
+def _cascade_deletes(conn):
+    schema = _schema("players", "rounds", "golf_courses")
+    tables = (
+        Table(
+            "round_scores", schema,
+            Column("id", Integer, primary_key=True),
+            Column("round_id", Integer, ForeignKey("rounds.id", ondelete="CASCADE"), nullable=False),
+            Column("player_id", Integer, ForeignKey("players.id", ondelete="CASCADE"), nullable=False),
+            Column("score", Integer),
+            Column("created_at", DateTime),
+        ),
+        Table(
+            "finale_scores", schema,
+            Column("id", Integer, primary_key=True),
+            Column("player_id", Integer, ForeignKey("players.id", ondelete="CASCADE"), nullable=False,
+                   unique=True),
+            Column("bonus", Integer),
+            Column("score", Integer),
+            Column("created_at", DateTime),
+        ),
+        Table(
+            "course_tees", schema,
+            Column("id", Integer, primary_key=True),
+            Column("course_id", Integer, ForeignKey("golf_courses.id", ondelete="CASCADE"),
+                   nullable=False),
+            Column("name", String(50), nullable=False),
+            Column("gender", String(10), nullable=False),
+            Column("par", Integer, nullable=False),
+            Column("course_rating", Float, nullable=False),
+            Column("slope_rating", Integer, nullable=False),
+            Column("created_at", DateTime),
+        ),
+    )
+    for table in tables:
+        plain = [
+            fk for fk in inspect(conn).get_foreign_keys(table.name)
+            if (fk.get("options") or {}).get("ondelete", "").upper() != "CASCADE"
+        ]
+        if not plain:
+            continue
+        _delete_orphans(conn, table)
+        if conn.dialect.name == "sqlite":
+            _rebuild_sqlite_table(conn, table)
+            continue
+        for fk in plain:
+            columns = ", ".join(fk["constrained_columns"])
+            referred = ", ".join(fk["referred_columns"])
+            conn.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {fk['name']}"))
+            conn.execute(text(
+                f"ALTER TABLE {table.name} ADD CONSTRAINT {fk['name']} FOREIGN KEY ({columns}) "
+                f"REFERENCES {fk['referred_table']} ({referred}) ON DELETE CASCADE"
+            ))
+
+
+@migration(5, "hole-by-hole scores and the tee of a round")
+def _hole_scores(conn):
+    _add_column(conn, "round_scores", Column("holes", PackedHoles))
+    _add_column(conn, "course_tees", Column("hole_pars", PackedHoles))
+    _add_column(conn, "course_tees", Column("stroke_indexes", PackedHoles))
+    _add_column(conn, "rounds", Column(
+        "tee_id", Integer, ForeignKey("course_tees.id", ondelete="SET NULL")))
+    if not _has_index(conn, "rounds", "ix_rounds_tee_id"):
+        conn.execute(text("CREATE INDEX ix_rounds_tee_id ON rounds (tee_id)"))
+
+
+@migration(6, "player handicap index")
+def _player_handicaps(conn):
+    # Filled by `flask handicap recompute` or as scores are saved
+    Table(
+        "player_handicaps", _schema("players"),
+        Column("player_id", Integer, ForeignKey("players.id", ondelete="CASCADE"), primary_key=True,
+               autoincrement=False),
+        Column("handicap_index", Float),
+        Column("base_index", Float, nullable=False),
+        Column("differentials", JSON, nullable=False),
+        Column("rounds_counted", Integer, nullable=False),
+        Column("updated_at", DateTime),
+    ).create(conn, checkfirst=True)
+
+
+@migration(7, "tournaments")
+def _tournaments(conn):
+    schema = _schema("players", "rounds")
+    rounds = schema.tables["rounds"]
+    tournaments = Table(
+        "tournaments", schema,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(100), nullable=False),
+        Column("created_at", DateTime),
+        Column("closed_at", DateTime),
+    )
+    results = Table(
+        "tournament_results", schema,
+        Column("id", Integer, primary_key=True),
+        Column("tournament_id", Integer, ForeignKey("tournaments.id", ondelete="CASCADE"),
+               nullable=False, index=True),
+        Column("player_id", Integer, ForeignKey("players.id", ondelete="SET NULL")),
+        Column("name", String(80), nullable=False),
+        Column("oom_rank", Integer),
+        Column("oom_total", Integer, nullable=False),
+        Column("oom_rounds", Integer, nullable=False),
+        Column("bonus", Integer, nullable=False),
+        Column("finale_score", Integer),
+        Column("finale_place", Integer),
+        Column("total", Integer, nullable=False),
+    )
+    finale_scores = Table(
+        "finale_scores", schema,
+        Column("id", Integer, primary_key=True),
+        Column("player_id", Integer, ForeignKey("players.id", ondelete="CASCADE"), nullable=False),
+        Column("bonus", Integer),
+        Column("score", Integer),
+        Column("tournament_id", Integer, ForeignKey("tournaments.id", ondelete="CASCADE")),
+        Column("created_at", DateTime),
+        UniqueConstraint("tournament_id", "player_id", name="uq_finale_scores_tournament_player"),
+    )
+
+    tournaments.create(conn, checkfirst=True)
+    results.create(conn, checkfirst=True)
+    if conn.execute(select(tournaments.c.id).limit(1)).first() is None:
+        # Everything recorded so far belongs to one tournament
+        first = conn.execute(select(rounds.c.play_date).order_by(rounds.c.play_date).limit(1)).scalar()
+        conn.execute(insert(tournaments).values(name=default_name(first), created_at=datetime.utcnow()))
+    active_id = conn.execute(
+        select(tournaments.c.id).where(tournaments.c.closed_at.is_(None))
+        .order_by(tournaments.c.id.desc())
+    ).scalar()
+
+    for table in ("rounds", "round_scores", "finale_scores"):
+        _add_column(conn, table, Column(
+            "tournament_id", Integer, ForeignKey("tournaments.id", ondelete="CASCADE")))
+        conn.execute(text(
+            f"UPDATE {table} SET tournament_id = :id WHERE tournament_id IS NULL"
+        ), {"id": active_id})
+    for name, table in (("ix_rounds_tournament_id", "rounds"),
+                        ("ix_round_scores_tournament_id", "round_scores")):
+        if not _has_index(conn, table, name):
+            conn.execute(text(f"CREATE INDEX {name} ON {table} (tournament_id)"))
+
+    # One finale row per player and tournament instead of per player
+    if _has_index(conn, "finale_scores", "uq_finale_scores_tournament_player"):
+        return
+    if conn.dialect.name == "sqlite":
+        _rebuild_sqlite_table(conn, finale_scores)
+        return
+    for constraint in inspect(conn).get_unique_constraints("finale_scores"):
+        if constraint["column_names"] == ["player_id"]:
+            conn.execute(text(f"ALTER TABLE finale_scores DROP CONSTRAINT {constraint['name']}"))
+    conn.execute(text(
+        "ALTER TABLE finale_scores ADD CONSTRAINT uq_finale_scores_tournament_player "
+        "UNIQUE (tournament_id, player_id)"
+    ))
+
+
+@migration(8, "flight assignments")
+def _flight_assignments(conn):
+    Table(
+        "flight_assignments", _schema("players", "rounds"),
+        Column("id", Integer, primary_key=True),
+        Column("round_id", Integer, ForeignKey("rounds.id", ondelete="CASCADE"), nullable=False),
+        Column("player_id", Integer, ForeignKey("players.id", ondelete="CASCADE"), nullable=False,
+               index=True),
+        Column("flight", Integer, nullable=False),
+        UniqueConstraint("round_id", "player_id", name="uq_flight_assignments_round_player"),
+    ).create(conn, checkfirst=True)
+
+
+@migration(9, "row versions for concurrent score entry")
+def _row_versions(conn):
+    for table in ("round_scores", "finale_scores", "player_handicaps"):
+        _add_column(conn, table, Column("version", Integer, nullable=False, server_default="1"))
+
+
+@migration(10, "client ids of offline score changes")
+def _synced_changes(conn):
+    Table(
+        "synced_changes", MetaData(),
+        Column("client_id", String(64), primary_key=True),
+        Column("round_id", Integer),
+        Column("player_id", Integer),
+        Column("status", String(10), nullable=False),
+        Column("score", Integer),
+        Column("version", Integer),
+        Column("error", String(200)),
+        Column("created_at", DateTime, nullable=False, index=True),
+    ).create(conn, checkfirst=True)
+
+
+def _applied_versions(conn):
+    SchemaVersion.__table__.create(conn, checkfirst=True)
+    versions = {version for (version,) in conn.execute(select(SchemaVersion.version))}
+    conn.commit()
+    return versions
+
+
+def upgrade(echo=None):
+    """Apply every pending migration, each in its own transaction; returns the versions applied."""
+    applied_now = []
+    with db.engine.connect() as conn:
+        dialect = conn.dialect.name
+        if dialect == "sqlite":
+            # Table rebuilds need foreign keys off; PRAGMA is ignored inside a transaction
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.commit()
+        elif dialect == "postgresql":
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            conn.commit()
+        try:
+            applied = _applied_versions(conn)
+            for version, name, func in MIGRATIONS:
+                if version in applied:
+                    continue
+                with conn.begin():
+                    func(conn)
+                    conn.execute(insert(SchemaVersion).values(
+                        version=version, name=name, applied_at=datetime.utcnow()
+                    ))
+                applied_now.append(version)
+                if echo:
+                    echo(f"Applied {version:03d} {name}")
+        finally:
+            if dialect == "sqlite":
+                conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+            elif dialect == "postgresql":
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            conn.commit()
+    return applied_now
+
+
+def status():
+    """Return [(version, name, applied_at or None)] for every known migration."""
+    with db.engine.connect() as conn:
+        SchemaVersion.__table__.create(conn, checkfirst=True)
+        applied = dict(conn.execute(select(SchemaVersion.version, SchemaVersion.applied_at)).all())
+        conn.commit()
+    return [(version, name, applied.get(version)) for version, name, _ in MIGRATIONS]
+
+
+db_cli = AppGroup("db", help="Database schema migrations.")
+
+
+@db_cli.command("upgrade")
+def upgrade_command():
+    """Apply pending migrations (run once per deploy, not per worker)."""
+    if not upgrade(echo=click.echo):
+        click.echo("Database schema is up to date.")
+
+
+@db_cli.command("status")
+def status_command():
+    """Show applied and pending migrations."""
+    for version, name, applied_at in status():
+        state = applied_at.strftime("%Y-%m-%d %H:%M") if applied_at else "pending"
+        click.echo(f"{version:03d}  {state:16}  {name}")
@@ -1,9 +1,23 @@
 
+# Tee categories a course can be rated for
+TEE_GENDERS = ("Herre", "Dame")
+
+
 class HandicapError(ValueError):
     """Error raised when handicap is invalid."""
     pass
 
 
+class StoryUnavailableError(RuntimeError):
+    """Error raised when no AI tip is cached and upstream did not answer in time."""
+    pass
+
+
+class LazyLoadError(RuntimeError):
+    """Error raised in debug mode when a request lazy-loads a relationship."""
+    pass
+
+
 def course_handicap(handicap_index: float, slope_rating: float, course_rating: float, par: int) -> int:
     """
     WHS Course Handicap (mottatte slag):
@@ -0,0 +1,174 @@
+"""
+Offline Score Sync
+------------------
+Applies score changes that markers queued on their phones while out of
+coverage (static/js/offline-scores.js), many in one transaction.
+
+Each change is {id, round_id, player_id, score, version?}, with an id the
+client made up. The outcome of every change is stored under that id in
+synced_changes, so a batch sent again after a lost response is answered
+from the stored outcomes instead of being applied twice. A change with a
+version is compare-and-set like the score form; one without overwrites.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from database import db, Player, Round, RoundScore, SyncedChange, eager_options, upsert_rows
+from handicaps import record_scores
+
+MAX_CHANGES = 500
+MAX_SCORE = 200
+MAX_ID_LENGTH = 64
+# Outcomes are kept this long; a phone offline for longer sends its changes as new
+RETENTION = timedelta(days=30)
+
+
+class SyncError(ValueError):
+    """Raised for a batch that is not a list of well-formed changes; nothing is applied."""
+
+
+def _integer(change, field, required=True):
+    value = change.get(field)
+    if value is None and not required:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise SyncError(f"Endring {change['id']!r}: {field} må være et heltall.")
+    return value
+
+
+def parse_changes(payload):
+    """Changes from a request body {"changes": [...]}, in order and each id once."""
+    changes = payload.get("changes") if isinstance(payload, dict) else None
+    if not isinstance(changes, list):
+        raise SyncError('Forventet JSON på formen {"changes": [...]}.')
+    if len(changes) > MAX_CHANGES:
+        raise SyncError(f"Høyst {MAX_CHANGES} endringer per forespørsel.")
+    parsed = {}
+    for change in changes:
+        client_id = change.get("id") if isinstance(change, dict) else None
+        if not isinstance(client_id, str) or not 0 < len(client_id) <= MAX_ID_LENGTH:
+            raise SyncError(f"Hver endring trenger en id på 1–{MAX_ID_LENGTH} tegn.")
+        parsed.setdefault(client_id, {
+            "id": client_id,
+            "round_id": _integer(change, "round_id"),
+            "player_id": _integer(change, "player_id"),
+            "score": _integer(change, "score"),
+            "version": _integer(change, "version", required=False),
+        })
+    return list(parsed.values())
+
+
+def _result(status, score, version, error):
+    return {"status": status, "score": score, "version": version, "error": error}
+
+
+def _stored_results(client_ids):
+    """{id: result} of the changes whose outcome is stored in synced_changes."""
+    return {
+        row.client_id: _result(row.status, row.score, row.version, row.error)
+        for row in SyncedChange.query.filter(SyncedChange.client_id.in_(client_ids))
+    }
+
+
+def _rejection(change, rounds, player_ids):
+    round = rounds.get(change["round_id"])
+    if round is None:
+        return "Runden finnes ikke."
+    if round.is_closed:
+        return "Turneringen er avsluttet."
+    if change["player_id"] not in player_ids:
+        return "Spilleren finnes ikke."
+    if not 0 <= change["score"] <= MAX_SCORE:
+        return f"Score må være mellom 0 og {MAX_SCORE}."
+    return None
+
+
+def _save_round(round, changes):
+    """Upsert one round's changes; returns {player_id: (status, score, version, error)}."""
+    checked = {change["player_id"]: change for change in changes if change["version"] is not None}
+    unchecked = {change["player_id"]: change for change in changes if change["version"] is None}
+    if checked:
+        RoundScore.upsert_scores(
+            round.id, {player_id: change["score"] for player_id, change in checked.items()},
+            round.tournament_id,
+            {player_id: change["version"] for player_id, change in checked.items()},
+        )
+    if unchecked:
+        RoundScore.upsert_scores(
+            round.id, {player_id: change["score"] for player_id, change in unchecked.items()},
+            round.tournament_id,
+        )
+    stored = {
+        player_id: (score, holes, version)
+        for player_id, score, holes, version in db.session.query(
+            RoundScore.player_id, RoundScore.score, RoundScore.holes, RoundScore.version
+        ).filter(RoundScore.round_id == round.id,
+                 RoundScore.player_id.in_([change["player_id"] for change in changes]))
+    }
+    outcomes, applied = {}, {}
+    for change in changes:
+        player_id = change["player_id"]
+        score, holes, version = stored[player_id]
+        if score == change["score"]:
+            outcomes[player_id] = ("applied", score, version, None)
+            applied[player_id] = score
+        elif holes is not None:
+            outcomes[player_id] = ("rejected", score, version, "Scoren er ført hull for hull.")
+        else:
+            # Someone else saved this score after the phone loaded the form
+            outcomes[player_id] = ("conflict", score, version, None)
+    record_scores(round, applied)
+    return outcomes
+
+
+def apply_changes(changes):
+    """
+    Apply parsed changes in the current transaction.
+
+    Returns {id: {status, score, version, error}}: status is applied, conflict
+    or rejected, score and version are what the stored row holds now. When a
+    batch changes the same score more than once, the last change wins and the
+    earlier ones report its outcome.
+    """
+    results = _stored_results([change["id"] for change in changes])
+    pending = [change for change in changes if change["id"] not in results]
+    if pending:
+        now = datetime.utcnow()
+        rounds = {
+            round.id: round for round in Round.query.options(
+                *eager_options(Round, ("tournament",), "joined")
+            ).filter(Round.id.in_({change["round_id"] for change in pending}))
+        }
+        player_ids = {
+            player_id for (player_id,) in db.session.query(Player.id).filter(
+                Player.id.in_({change["player_id"] for change in pending}))
+        }
+        outcomes, latest = {}, {}
+        for change in pending:
+            error = _rejection(change, rounds, player_ids)
+            if error:
+                outcomes[change["id"]] = ("rejected", None, None, error)
+            else:
+                latest[(change["round_id"], change["player_id"])] = change
+        by_round = defaultdict(list)
+        for change in latest.values():
+            by_round[change["round_id"]].append(change)
+        for round_id, round_changes in by_round.items():
+            saved = _save_round(rounds[round_id], round_changes)
+            for change in round_changes:
+                outcomes[change["id"]] = saved[change["player_id"]]
+        rows = []
+        for change in pending:
+            key = (change["round_id"], change["player_id"])
+            status, score, version, error = outcomes.get(change["id"]) or outcomes[latest[key]["id"]]
+            rows.append({
+                "client_id": change["id"], "round_id": change["round_id"],
+                "player_id": change["player_id"], "status": status, "score": score,
+                "version": version, "error": error, "created_at": now,
+            })
+        # A concurrent send of the same batch may have stored the ids first; keep its outcomes
+        upsert_rows(SyncedChange, rows, ["client_id"], [])
+        db.session.execute(delete(SyncedChange).where(SyncedChange.created_at < now - RETENTION))
+        results.update(_stored_results([change["id"] for change in pending]))
+    return results
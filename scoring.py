@@ -0,0 +1,108 @@
+"""
+Hole Scoring
+------------
+Gross, net and Stableford points for every player of a round in one pass.
+
+Strokes are allocated from the WHS course handicap (models.course_handicap)
+by stroke index; players who share a course handicap share one allocation.
+"""
+
+from database import HOLES, RoundScore
+from models import course_handicap
+
+MIN_PAR, MAX_PAR = 3, 6
+MAX_STROKES = 20
+
+
+def parse_hole_values(text):
+    """Parse 18 comma- or space-separated integers; blank text gives None."""
+    parts = (text or "").replace(",", " ").split()
+    if not parts:
+        return None
+    values = [int(part) for part in parts]
+    if len(values) != HOLES:
+        raise ValueError(f"Fant {len(values)} tall, forventet {HOLES}.")
+    return values
+
+
+def validate_tee_holes(par, hole_pars, stroke_indexes):
+    """Return an error message if the tee's hole data is inconsistent, otherwise None."""
+    if (hole_pars is None) != (stroke_indexes is None):
+        return "Fyll inn både par og indeks per hull, eller ingen av dem."
+    if hole_pars is None:
+        return None
+    if any(not MIN_PAR <= hole_par <= MAX_PAR for hole_par in hole_pars):
+        return f"Par per hull må være mellom {MIN_PAR} og {MAX_PAR}."
+    if sum(hole_pars) != par:
+        return f"Par per hull summerer til {sum(hole_pars)}, men banens par er {par}."
+    if sorted(stroke_indexes) != list(range(1, HOLES + 1)):
+        return f"Indeks per hull må inneholde hvert tall fra 1 til {HOLES} én gang."
+    return None
+
+
+def stroke_allocation(playing_handicap, stroke_indexes):
+    """Strokes received per hole; plus handicaps give strokes back from index 18 down."""
+    if playing_handicap >= 0:
+        base, extra = divmod(playing_handicap, HOLES)
+        return [base + (1 if index <= extra else 0) for index in stroke_indexes]
+    base, extra = divmod(-playing_handicap, HOLES)
+    return [-(base + (1 if index > HOLES - extra else 0)) for index in stroke_indexes]
+
+
+def score_round(tee, cards, handicaps):
+    """
+    Score all cards of a round on one tee.
+
+    cards maps player_id to 18 gross scores (None = not played), handicaps maps
+    player_id to handicap index. Returns {player_id: {course_handicap, gross,
+    net, points, holes_played, points_by_hole}}.
+    """
+    allocations = {}
+    results = {}
+    for player_id, holes in cards.items():
+        playing_handicap = course_handicap(
+            handicaps.get(player_id) or 0, tee.slope_rating, tee.course_rating, tee.par
+        )
+        received = allocations.get(playing_handicap)
+        if received is None:
+            received = allocations[playing_handicap] = stroke_allocation(
+                playing_handicap, tee.stroke_indexes
+            )
+
+        gross = net = points = played = 0
+        points_by_hole = []
+        for strokes, hole_par, extra in zip(holes, tee.hole_pars, received):
+            if strokes is None:
+                points_by_hole.append(0)
+                continue
+            net_strokes = strokes - extra
+            hole_points = max(0, hole_par + 2 - net_strokes)
+            gross += strokes
+            net += net_strokes
+            points += hole_points
+            played += 1
+            points_by_hole.append(hole_points)
+
+        results[player_id] = {
+            "course_handicap": playing_handicap,
+            "gross": gross,
+            "net": net,
+            "points": points,
+            "holes_played": played,
+            "points_by_hole": points_by_hole,
+        }
+    return results
+
+
+def save_cards(round, tee, cards, handicaps, versions=None):
+    """
+    Score the cards and store holes and Stableford total together.
+
+    Returns the results and the conflicts of RoundScore.upsert_cards (cards
+    someone else changed since the row versions in `versions`).
+    """
+    results = score_round(tee, cards, handicaps)
+    conflicts = RoundScore.upsert_cards(round.id, {
+        player_id: (cards[player_id], result["points"]) for player_id, result in results.items()
+    }, round.tournament_id, versions)
+    return results, conflicts
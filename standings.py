@@ -0,0 +1,102 @@
+"""
+OOM Standings
+-------------
+Order of Merit standings of the active tournament, built from a single aggregate query.
+"""
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from database import db, Player, Round, RoundScore, active_tournament_id
+
+BONUS_SCALE = [4, 3, 2, 1]
+
+
+def _valid_score_filter():
+    """Scores of the active tournament; zeros and empty scores do not count towards the OOM."""
+    return (
+        RoundScore.tournament_id == active_tournament_id(),
+        RoundScore.score.isnot(None),
+        RoundScore.score != 0,
+    )
+
+
+def _aggregate_postgres():
+    """Totals and ordered score lists per player, aggregated by Postgres."""
+    query = (
+        db.session.query(
+            Player.id,
+            Player.name,
+            func.sum(RoundScore.score),
+            func.count(RoundScore.score),
+            func.array_agg(aggregate_order_by(
+                RoundScore.score, Round.play_date.asc(), RoundScore.id.asc()
+            )),
+        )
+        .join(RoundScore, RoundScore.player_id == Player.id)
+        .join(Round, Round.id == RoundScore.round_id)
+        .filter(*_valid_score_filter())
+        .group_by(Player.id, Player.name)
+    )
+    return [
+        (player_id, name, int(total), count, list(scores))
+        for player_id, name, total, count, scores in query
+    ]
+
+
+def _aggregate_python():
+    """Same result as _aggregate_postgres, grouped in Python (used for SQLite)."""
+    query = (
+        db.session.query(Player.id, Player.name, RoundScore.score)
+        .join(RoundScore, RoundScore.player_id == Player.id)
+        .join(Round, Round.id == RoundScore.round_id)
+        .filter(*_valid_score_filter())
+        .order_by(Player.id, Round.play_date.asc(), RoundScore.id.asc())
+    )
+    grouped = {}
+    for player_id, name, score in query:
+        grouped.setdefault(player_id, (name, []))[1].append(score)
+    return [
+        (player_id, name, sum(scores), len(scores), scores)
+        for player_id, (name, scores) in grouped.items()
+    ]
+
+
+def get_oom_standings():
+    """
+    Return OOM rows for every player with at least one valid score.
+
+    Each row has player_id, name, total, avg, rounds and scores (in round order),
+    sorted by total descending and then by name.
+    """
+    if db.engine.dialect.name == "postgresql":
+        aggregated = _aggregate_postgres()
+    else:
+        aggregated = _aggregate_python()
+
+    standings = [
+        {
+            "player_id": player_id,
+            "name": name,
+            "total": total,
+            "avg": round(total / count, 1),
+            "rounds": count,
+            "scores": scores,
+        }
+        for player_id, name, total, count, scores in aggregated
+    ]
+    # Deterministic sort for tie handling
+    standings.sort(key=lambda row: (-row["total"], row["name"]))
+    return standings
+
+
+def oom_bonus(standings, players):
+    """Return (bonus_by_player_id, rank_by_player_id) from OOM rank (1-4 => 4/3/2/1)."""
+    bonus_by_player_id = {player.id: 0 for player in players}
+    rank_by_player_id = {}
+
+    for idx, row in enumerate(standings, start=1):
+        rank_by_player_id[row["player_id"]] = idx
+        if idx <= len(BONUS_SCALE) and row["player_id"] in bonus_by_player_id:
+            bonus_by_player_id[row["player_id"]] = BONUS_SCALE[idx - 1]
+
+    return bonus_by_player_id, rank_by_player_id
@@ -0,0 +1,42 @@
+/*
+ * Keeps a table body in sync with a Server-Sent Events feed.
+ * The first message is a full snapshot ({full, rows, order}); later messages
+ * are diffs ({set, del, order}) keyed by player id.
+ */
+function liveTable(tbodyId, url, renderCells) {
+    var tbody = document.getElementById(tbodyId);
+    if (!tbody || !window.EventSource) return;
+
+    var rows = {};
+    var order = [];
+
+    function escapeHtml(value) {
+        return String(value === null || value === undefined ? '' : value)
+            .replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    }
+
+    function render() {
+        tbody.innerHTML = order.map(function (key) {
+            return '<tr>' + renderCells(rows[key], escapeHtml) + '</tr>';
+        }).join('');
+    }
+
+    var source = new EventSource(url);
+    source.onmessage = function (event) {
+        var message = JSON.parse(event.data);
+        if (message.full) {
+            if (message.order.length && !tbody.children.length) {
+                // Page was rendered without a table; reload to get the full layout
+                window.location.reload();
+                return;
+            }
+            rows = message.rows;
+            order = message.order;
+        } else {
+            Object.keys(message.set || {}).forEach(function (key) { rows[key] = message.set[key]; });
+            (message.del || []).forEach(function (key) { delete rows[key]; });
+            if (message.order) order = message.order;
+        }
+        render();
+    };
+}
@@ -0,0 +1,167 @@
+/*
+ * Score entry that survives lost coverage.
+ * The score form is sent as a JSON batch to /api/sync/scores. Changes that
+ * cannot be sent stay queued in localStorage and go out when the phone is
+ * back online or a page with this script is opened. Each change gets its id
+ * once, so sending a batch twice never applies it twice. Also registers the
+ * service worker (sw.js) that keeps the entry pages available offline.
+ */
+(function () {
+    var QUEUE_KEY = 'golf.pendingScores';
+    var script = document.currentScript;
+    var syncUrl = script.getAttribute('data-sync-url');
+    var form = document.getElementById('score-form');
+    var status = document.getElementById('sync-status');
+    var sending = null;
+
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register(script.getAttribute('data-worker-url'), {scope: '/'})
+            .catch(function () {});
+    }
+    if (!window.fetch || !window.localStorage) return;
+
+    function load() {
+        try {
+            return JSON.parse(localStorage.getItem(QUEUE_KEY)) || [];
+        } catch (e) {
+            return [];
+        }
+    }
+
+    function store(queue) {
+        localStorage.setItem(QUEUE_KEY, JSON.stringify(queue));
+    }
+
+    function newId() {
+        if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+        return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+    }
+
+    function show(text, isError) {
+        if (!status) return;
+        status.textContent = text;
+        status.className = isError ? 'error-message' : 'success-message';
+        status.hidden = !text;
+    }
+
+    function showPending() {
+        var count = load().length;
+        if (count) {
+            show(count + (count === 1 ? ' endring venter' : ' endringer venter') +
+                 ' på dekning og sendes automatisk.', false);
+        }
+    }
+
+    function failed(error) {
+        if (error && error.permanent) show(error.message, true);
+        else showPending();
+    }
+
+    function field(name) {
+        return form ? form.querySelector('[name="' + name + '"]') : null;
+    }
+
+    // Sends every queued change; resolves to one result per change sent
+    function flush() {
+        if (sending) return sending;
+        var queue = load();
+        if (!queue.length) return Promise.resolve([]);
+        var sent = {};
+        queue.forEach(function (change) { sent[change.id] = true; });
+        sending = fetch(syncUrl, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({changes: queue})
+        }).then(function (response) {
+            if (response.status >= 400 && response.status < 500) {
+                // The server will never take this batch; drop it instead of retrying forever
+                store(load().filter(function (change) { return !sent[change.id]; }));
+                return response.json().then(function (body) {
+                    var error = new Error('Endringene ble avvist: ' + body.error);
+                    error.permanent = true;
+                    throw error;
+                });
+            }
+            if (!response.ok) throw new Error('HTTP ' + response.status);
+            return response.json();
+        }).then(function (body) {
+            var results = {};
+            body.results.forEach(function (result) { results[result.id] = result; });
+            // Changes queued while this batch was on its way wait for the next one
+            store(load().filter(function (change) { return !results[change.id]; }));
+            return queue.map(function (change) {
+                results[change.id].change = change;
+                return results[change.id];
+            });
+        });
+        sending.then(function () { sending = null; }, function () { sending = null; });
+        return sending;
+    }
+
+    // Updates the form from the results; returns a line per change that was not saved
+    function report(results) {
+        var roundId = form ? Number(form.getAttribute('data-round-id')) : null;
+        return results.filter(function (result) {
+            var change = result.change;
+            if (change.round_id === roundId && result.score !== null) {
+                var input = field('score_' + change.player_id);
+                var version = field('version_' + change.player_id);
+                if (input) input.value = input.defaultValue = String(result.score);
+                if (version) version.value = String(result.version);
+            }
+            return result.status !== 'applied';
+        }).map(function (result) {
+            return result.change.name + ': ' +
+                (result.error || 'endret av noen andre i mellomtiden, nå ' + result.score);
+        });
+    }
+
+    function sync() {
+        flush().then(function (results) {
+            var problems = report(results);
+            if (problems.length) show('Ikke lagret – ' + problems.join('; '), true);
+            else if (results.length) show('Sendt ' + results.length + ' lagrede endringer.', false);
+        }, failed);
+    }
+
+    if (form) {
+        form.addEventListener('submit', function (event) {
+            event.preventDefault();
+            var roundId = Number(form.getAttribute('data-round-id'));
+            var inputs = form.querySelectorAll('input.score-input[name]');
+            var queue = load();
+            for (var i = 0; i < inputs.length; i++) {
+                var input = inputs[i];
+                if (input.value === '' || input.value === input.defaultValue) continue;
+                if (!/^\d+$/.test(input.value)) {
+                    show('Ugyldig score for ' + input.getAttribute('data-player-name') + '.', true);
+                    return;
+                }
+                var playerId = Number(input.name.slice('score_'.length));
+                var version = field('version_' + playerId);
+                // A newer edit of the same score replaces one that was never sent
+                queue = queue.filter(function (change) {
+                    return change.round_id !== roundId || change.player_id !== playerId;
+                });
+                queue.push({
+                    id: newId(),
+                    round_id: roundId,
+                    player_id: playerId,
+                    score: Number(input.value),
+                    version: version ? Number(version.value) : null,
+                    name: input.getAttribute('data-player-name')
+                });
+                input.defaultValue = input.value;
+            }
+            store(queue);
+            flush().then(function (results) {
+                var problems = report(results);
+                if (problems.length) show('Ikke lagret – ' + problems.join('; '), true);
+                else window.location.href = form.getAttribute('data-done-url');
+            }, failed);
+        });
+    }
+
+    window.addEventListener('online', sync);
+    sync();
+})();
@@ -0,0 +1,109 @@
+/*
+ * Service worker that keeps score entry usable without coverage.
+ * The pages markers need on the course are fetched from the network first and
+ * served from the cache when the network fails or is too slow; every score
+ * form linked from /rounds is cached along with it. Hashed assets never
+ * change, so they come from the cache first. Score edits made offline are
+ * queued and sent by offline-scores.js, not here.
+ */
+var CACHE = 'golf-offline-v1';
+var PAGES = ['/rounds', '/players', '/finale'];
+var OFFLINE_PAGE = /^\/(rounds|players|finale|round\/\d+\/scores)$/;
+var SCORE_FORM_LINK = /href="(\/round\/\d+\/scores)"/g;
+var NETWORK_TIMEOUT_MS = 4000;
+
+function ignore() {}
+
+function offlineResponse() {
+    return new Response('<h1>Ingen dekning</h1><p>Siden er ikke lagret på telefonen ennå.</p>', {
+        status: 503,
+        headers: {'Content-Type': 'text/html; charset=utf-8'}
+    });
+}
+
+function cacheScoreForms(cache, html) {
+    var urls = [];
+    var match;
+    while ((match = SCORE_FORM_LINK.exec(html)) !== null) {
+        if (urls.indexOf(match[1]) < 0) urls.push(match[1]);
+    }
+    return Promise.all(urls.map(function (url) { return cache.add(url).catch(ignore); }));
+}
+
+function networkFirst(event, path) {
+    var network = fetch(event.request).then(function (response) {
+        if (response.ok) {
+            var copy = response.clone();
+            caches.open(CACHE).then(function (cache) {
+                return cache.put(path, copy.clone()).then(function () {
+                    return path === '/rounds' ? copy.text().then(function (html) {
+                        return cacheScoreForms(cache, html);
+                    }) : null;
+                });
+            }).catch(ignore);
+        }
+        return response;
+    });
+    // Let the cache update finish after a slow response was answered from the cache
+    event.waitUntil(network.catch(ignore));
+
+    return new Promise(function (resolve) {
+        function fromCache() {
+            return caches.match(path).then(function (hit) {
+                if (hit) resolve(hit);
+                return hit;
+            });
+        }
+        var timer = setTimeout(fromCache, NETWORK_TIMEOUT_MS);
+        network.then(function (response) {
+            clearTimeout(timer);
+            resolve(response);
+        }, function () {
+            clearTimeout(timer);
+            fromCache().then(function (hit) {
+                if (!hit) resolve(offlineResponse());
+            });
+        });
+    });
+}
+
+function cacheFirst(request) {
+    return caches.match(request).then(function (hit) {
+        return hit || fetch(request).then(function (response) {
+            if (response.ok) {
+                var copy = response.clone();
+                caches.open(CACHE).then(function (cache) { return cache.put(request, copy); });
+            }
+            return response;
+        });
+    });
+}
+
+self.addEventListener('install', function (event) {
+    event.waitUntil(caches.open(CACHE).then(function (cache) {
+        return Promise.all(PAGES.map(function (path) { return cache.add(path).catch(ignore); }));
+    }).then(function () {
+        return self.skipWaiting();
+    }));
+});
+
+self.addEventListener('activate', function (event) {
+    event.waitUntil(caches.keys().then(function (keys) {
+        return Promise.all(keys.filter(function (key) { return key !== CACHE; }).map(function (key) {
+            return caches.delete(key);
+        }));
+    }).then(function () {
+        return self.clients.claim();
+    }));
+});
+
+self.addEventListener('fetch', function (event) {
+    var request = event.request;
+    var url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== self.location.origin) return;
+    if (url.pathname.indexOf('/assets/') === 0) {
+        event.respondWith(cacheFirst(request));
+    } else if (OFFLINE_PAGE.test(url.pathname) || url.pathname.indexOf('/static/') === 0) {
+        event.respondWith(networkFirst(event, url.pathname));
+    }
+});
@@ -0,0 +1,189 @@
+"""
+Static Export
+-------------
+Renders the read-only spectator pages into a plain directory that any
+static host can serve, without the app or the database.
+
+`flask --app app site export build/site` renders each page in PAGES through
+its view and template, points links between exported pages at the exported
+files, copies the fingerprinted CSS/JS it references and sends every other
+link to STATIC_EXPORT_APP_URL. A page is rendered again only when one of the
+tables it reads has a new data version (see data_versions.py) or when the
+templates or assets changed, so a run after a score update rewrites the OOM
+table and the finale result but leaves the course list alone.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import re
+import shutil
+import time
+import click
+from flask import current_app, has_request_context, request, url_for
+from flask.cli import AppGroup
+from assets import DIST_DIR, build_assets
+from data_versions import get_versions
+from database import db
+
+# Endpoint -> file in the export directory; all files sit at the top level
+PAGES = {
+    "main.list_scores": "index.html",
+    "main.finale_resultat": "finale-resultat.html",
+    "main.list_rounds": "rounds.html",
+    "main.show_flights": "flights.html",
+    "main.show_local_rules": "local-rules.html",
+    "main.list_golf_courses": "baner.html",
+}
+# Tables read by pages without @cached_view (cached views carry their own list)
+PAGE_TABLES = {
+    "main.list_golf_courses": ("golf_courses", "course_tees"),
+    "main.show_local_rules": (),
+}
+STATE_FILE = ".static-export.json"
+ENVIRON_KEY = "golf.static_export"
+
+_LINK = re.compile(r'(\s(?:href|src|action)=")(/[^"]*)"')
+
+
+def page_tables(app, endpoint):
+    view = app.view_functions[endpoint]
+    return tuple(getattr(view, "tables", PAGE_TABLES.get(endpoint, ())))
+
+
+def _build_key(app, app_url):
+    """Hash of everything besides data that shows up in a page."""
+    digest = hashlib.sha256(app_url.encode())
+    digest.update(json.dumps(app.extensions["assets_manifest"], sort_keys=True).encode())
+    for folder, _, names in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+        for name in sorted(names):
+            with open(os.path.join(folder, name), "rb") as handle:
+                digest.update(name.encode() + handle.read())
+    return digest.hexdigest()[:20]
+
+
+def _load_state(out_dir):
+    try:
+        with open(os.path.join(out_dir, STATE_FILE)) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_file(path, data):
+    """Replace path in one step, so a host serving the directory never sees half a file."""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as handle:
+        handle.write(data)
+    os.replace(temporary, path)
+
+
+def _copy_asset(app, out_dir, path):
+    """Copy a hashed asset and its .gz/.br variants once; they never change."""
+    target = os.path.join(out_dir, path)
+    if os.path.exists(target):
+        return
+    if path.startswith("assets/"):
+        source = os.path.join(app.static_folder, DIST_DIR, path[len("assets/"):])
+    else:
+        source = os.path.join(app.static_folder, path[len("static/"):])
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    for suffix in ("", ".gz", ".br"):
+        if os.path.isfile(source + suffix):
+            shutil.copyfile(source + suffix, target + suffix)
+
+
+def _relink(app, out_dir, html, page_urls, app_url):
+    """Point root-relative links at exported files, copied assets or the live app."""
+    def replace(match):
+        attribute, url = match.groups()
+        path = url.split("#", 1)[0].split("?", 1)[0]
+        if path in page_urls:
+            return f'{attribute}{page_urls[path]}"'
+        if path.startswith(("/assets/", "/static/")):
+            _copy_asset(app, out_dir, path[1:])
+            return f'{attribute}{url[1:]}"'
+        return f'{attribute}{app_url}{url}"'
+    return _LINK.sub(replace, html)
+
+
+def _render(app, endpoint, path):
+    """Render a page through its view, skipping the HTML cache and HTTP headers."""
+    with app.test_request_context(path, environ_base={ENVIRON_KEY: True}):
+        return inspect.unwrap(app.view_functions[endpoint])()
+
+
+def export_site(out_dir, app_url="", force=False):
+    """
+    Bring the export directory up to date; returns the files that were written.
+
+    Costs one data version query when nothing changed.
+    """
+    app = current_app._get_current_object()
+    if not app.extensions["assets_manifest"]:
+        app.extensions["assets_manifest"] = build_assets(app.static_folder)
+    app_url = app_url.rstrip("/")
+    os.makedirs(out_dir, exist_ok=True)
+
+    tables = {endpoint: page_tables(app, endpoint) for endpoint in PAGES}
+    versions = get_versions(sorted({table for names in tables.values() for table in names}))
+    state = _load_state(out_dir)
+    build = _build_key(app, app_url)
+    if state.get("build") != build:
+        force = True
+    rendered = {} if force else state.get("pages", {})
+
+    with app.test_request_context():
+        paths = {endpoint: url_for(endpoint) for endpoint in PAGES}
+    page_urls = {paths[endpoint]: filename for endpoint, filename in PAGES.items()}
+    written = []
+    for endpoint, filename in PAGES.items():
+        key = [versions[table][0] for table in tables[endpoint]]
+        if rendered.get(filename) == key and os.path.exists(os.path.join(out_dir, filename)):
+            continue
+        html = _render(app, endpoint, paths[endpoint])
+        html = _relink(app, out_dir, html, page_urls, app_url)
+        _write_file(os.path.join(out_dir, filename), html.encode())
+        rendered[filename] = key
+        written.append(filename)
+
+    if written or force:
+        _write_file(os.path.join(out_dir, STATE_FILE),
+                    json.dumps({"build": build, "pages": rendered}, indent=2).encode())
+    return written
+
+
+def _static_export_context():
+    return {"static_export": has_request_context() and request.environ.get(ENVIRON_KEY, False)}
+
+
+def init_static_export(app):
+    """Let templates drop live updates and editing controls from exported pages."""
+    app.context_processor(_static_export_context)
+    app.cli.add_command(site_cli)
+
+
+site_cli = AppGroup("site", help="Static export of the read-only pages.")
+
+
+@site_cli.command("export")
+@click.argument("out_dir", default="build/site")
+@click.option("--all", "force", is_flag=True, help="Render every page, changed or not.")
+@click.option("--app-url", envvar="STATIC_EXPORT_APP_URL", default="",
+              help="Origin of the live app, for links to pages that are not exported.")
+@click.option("--watch", type=float, metavar="SECONDS",
+              help="Keep running and check for changes at this interval.")
+def export_command(out_dir, force, app_url, watch):
+    """Render the read-only pages that changed since the last export into OUT_DIR."""
+    while True:
+        written = export_site(out_dir, app_url, force)
+        # End the transaction so the next pass sees new data versions
+        db.session.remove()
+        if written or not watch:
+            click.echo(f"Wrote {len(written)} of {len(PAGES)} pages to {out_dir}"
+                       + (f": {', '.join(written)}" if written else "."))
+        if not watch:
+            return
+        force = False
+        time.sleep(watch)
@@ -0,0 +1,113 @@
+"""
+Strokes Matrix
+--------------
+Received strokes (mottatte slag) for every player on every tee, computed in
+one pass and kept until a player or tee is changed.
+"""
+
+import threading
+from database import Player, CourseTee
+from models import course_handicap
+from data_versions import get_versions
+
+# A handicap, slope, CR or par change always bumps one of these tables
+MATRIX_TABLES = ("players", "golf_courses", "course_tees")
+# Example handicaps shown next to every tee on the course page
+REFERENCE_HANDICAPS = (18, 24)
+
+
+class StrokesMatrix:
+    """Players × tees table of received strokes, held as plain data."""
+
+    def __init__(self, players, tees):
+        self.players = [
+            {"id": player.id, "name": player.name, "handicap": player.handicap}
+            for player in players
+        ]
+        self.tees = [
+            {
+                "id": tee.id,
+                "course_id": tee.course_id,
+                "course_name": tee.course.name,
+                "name": tee.name,
+                "gender": tee.gender,
+                "par": tee.par,
+                "course_rating": tee.course_rating,
+                "slope_rating": tee.slope_rating,
+            }
+            for tee in tees
+        ]
+        self._tee_index = {tee["id"]: idx for idx, tee in enumerate(self.tees)}
+
+        # Players often share a handicap, so each (handicap, tee) pair is computed once
+        computed = {}
+        self.strokes = []
+        for player in self.players:
+            row = []
+            for tee in self.tees:
+                key = (player["handicap"] or 0, tee["id"])
+                if key not in computed:
+                    computed[key] = course_handicap(
+                        key[0], tee["slope_rating"], tee["course_rating"], tee["par"]
+                    )
+                row.append(computed[key])
+            self.strokes.append(row)
+        # {tee_id: {handicap: strokes}} for REFERENCE_HANDICAPS
+        self.reference_strokes = {}
+        for tee in self.tees:
+            strokes = {}
+            for handicap in REFERENCE_HANDICAPS:
+                key = (handicap, tee["id"])
+                if key not in computed:
+                    computed[key] = course_handicap(
+                        handicap, tee["slope_rating"], tee["course_rating"], tee["par"]
+                    )
+                strokes[handicap] = computed[key]
+            self.reference_strokes[tee["id"]] = strokes
+
+    def tee(self, tee_id):
+        idx = self._tee_index.get(tee_id)
+        return self.tees[idx] if idx is not None else None
+
+    def rows_for_tee(self, tee_id):
+        """Rows of {player, strokes} for one tee, in player name order."""
+        idx = self._tee_index[tee_id]
+        return [
+            {"player": player, "strokes": strokes[idx]}
+            for player, strokes in zip(self.players, self.strokes)
+        ]
+
+    def rows(self):
+        """Rows of {player, strokes} with strokes listed in tee order."""
+        return [
+            {"player": player, "strokes": strokes}
+            for player, strokes in zip(self.players, self.strokes)
+        ]
+
+    def to_dict(self):
+        return {
+            "tees": self.tees,
+            "players": [
+                {**player, "strokes": strokes}
+                for player, strokes in zip(self.players, self.strokes)
+            ],
+        }
+
+
+_cache = {"key": None, "matrix": None}
+_cache_lock = threading.Lock()
+
+
+def get_strokes_matrix():
+    """Return the matrix for the current players and tees, rebuilding it only after a change."""
+    versions = get_versions(MATRIX_TABLES)
+    key = tuple(versions[table][0] for table in MATRIX_TABLES)
+    with _cache_lock:
+        if _cache["key"] == key:
+            return _cache["matrix"]
+
+    matrix = StrokesMatrix(Player.get_all(), CourseTee.get_all_with_course())
+    with _cache_lock:
+        _cache["key"] = key
+        _cache["matrix"] = matrix
+    return matrix
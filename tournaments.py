@@ -0,0 +1,59 @@
+"""
+Tournaments
+-----------
+Rounds, scores and finale rows belong to a tournament. Pages show the active
+one; starting a new tournament closes it instead of deleting anything.
+
+Closing stores one TournamentResult row per player (OOM rank and total,
+finale score, bonus and place). Archived tournaments are shown from those
+rows alone, so history never makes the live queries slower. The detailed
+rounds and scores stay, since the handicap index spans tournaments.
+"""
+
+from datetime import datetime
+from database import db, Tournament, TournamentResult
+from finale_service import FinaleService
+from standings import get_oom_standings
+
+
+def default_name(now=None):
+    return f"Turnering {(now or datetime.utcnow()).year}"
+
+
+def archive_results(tournament):
+    """Summary rows for the active tournament, built from the live OOM and finale."""
+    standings = get_oom_standings()
+    service = FinaleService()
+    oom_by_player_id = {row["player_id"]: row for row in standings}
+    results = []
+    for row in service.rows():
+        oom = oom_by_player_id.get(row["player_id"])
+        if oom is None and row["finale_score"] is None:
+            continue
+        results.append(TournamentResult(
+            tournament_id=tournament.id,
+            player_id=row["player_id"],
+            name=row["name"],
+            oom_rank=service.rank_by_player_id.get(row["player_id"]),
+            oom_total=oom["total"] if oom else 0,
+            oom_rounds=oom["rounds"] if oom else 0,
+            bonus=row["bonus"],
+            finale_score=row["finale_score"],
+            finale_place=row["place"],
+            total=row["total"],
+        ))
+    return results
+
+
+def start_tournament(name):
+    """Close the active tournament (archiving its results) and make a new one active."""
+    active = Tournament.get_active()
+    if active is not None:
+        db.session.add_all(archive_results(active))
+        active.closed_at = datetime.utcnow()
+        # The new tournament must not become visible before the old one is closed
+        db.session.flush()
+    tournament = Tournament(name=name or default_name())
+    db.session.add(tournament)
+    db.session.flush()
+    return tournament